@@ -33,7 +33,7 @@ This Streamlit app serves as a prototype decision-support tool, allowing users t
 st.markdown("""
 ### What does this app do?
 
-This prototype app allows you to interact with our Early Warning System model through four main sections:
+This prototype app allows you to interact with our Early Warning System model through six main sections:
 
 #### 1. School Explorer
 Select any California public high school—or generate a random one—and instantly view its key indicators (attendance, academic, and demographic inputs) alongside the model’s predicted graduation-risk classification. This section shows how the model behaves using real school data.
@@ -54,6 +54,12 @@ This view highlights which indicators drive predictions the most.
 
 #### 4. Data Dictionary
 Browse detailed definitions for every feature used in the model, including source datasets, calculation notes, and how each variable fits into the ABCS framework.
+
+#### 5. Scenario Simulator
+Draw thousands of input combinations at once—across the slider ranges or resampled from real schools—and see how the model's risk is distributed and which indicators move it the most.
+
+#### 6. Policy Simulator
+Apply the same change (e.g., cut chronic absenteeism by 5 points) to every school in a county, district, or the whole state, and see how many schools would flip between At Risk and On Track, broken down by county and district.
 """)
 
 st.divider()
@@ -1,26 +1,43 @@
+import altair as alt
+import pandas as pd
 import streamlit as st 
-import pandas as pd 
-import joblib 
 
-from utils.paths import get_paths 
+from utils.counterfactual import describe_change, find_counterfactuals
+from utils.explanations import shap_contributions, stored_contributions
+from utils.ice import ice_chart
+from utils.inference import describe_uncertainty
 from utils.feature_config import (
     slider_settings, 
     get_slider_step,
 )
+from utils.registry import (
+    load_baseline_scores,
+    load_compiled_model,
+    load_explainer,
+    load_explanation_cache,
+    load_explanations,
+    load_ice_engine,
+    load_model_hash,
+    load_prediction_cache,
+    load_risk_threshold,
+    load_school_data,
+    load_school_index,
+    load_top_features,
+)
+
+# get models and dataset (loaded once per server process, shared across reruns)
+model = load_compiled_model()
+df_full = load_school_data()
 
-# set paths
-paths = get_paths()
-MODELS_DIR = paths["MODELS_DIR"]
-DATA_DIR = paths["DATA_DIR"]
-MODEL_PATH = MODELS_DIR / "random_forest_ews.pkl"
-FINAL_DATASET_PATH = DATA_DIR / "06_top15_features_w_ids_and_target.pkl"
+# predictions for every school's actual values (computed once at startup)
+baseline_scores = load_baseline_scores()
+prediction_cache = load_prediction_cache()
 
-# get models and dataset
-model = joblib.load(MODEL_PATH)
-df_full = pd.read_pickle(FINAL_DATASET_PATH)
+# saved at-risk cutoff and calibration (code_library/thresholds.py)
+risk = load_risk_threshold()
 
 # load top 15 features (model importance order)
-TOP_FEATURES = joblib.load(MODELS_DIR / "top_features.pkl")
+TOP_FEATURES = load_top_features()
 
 # set page config
 st.set_page_config(
@@ -39,42 +56,53 @@ the actual graduation outcome, and adjust inputs interactively.
 ordered_features = [f for f in TOP_FEATURES if f in slider_settings]
 
 
-# ---- School list + initial state ----
-school_list = df_full["school"].sort_values().unique().tolist()
+# ---- School index + initial state ----
+# prebuilt cdscode index (names repeat across districts, so select by cdscode)
+school_index = load_school_index()
 
 # Initialize the school selector ONCE
 if "school_selector" not in st.session_state:
-    st.session_state["school_selector"] = school_list[0]
+    st.session_state["school_selector"] = school_index.codes[0]
 
 # Track last selected school for slider initialization
 if "last_selected_school" not in st.session_state:
     st.session_state["last_selected_school"] = st.session_state["school_selector"]
 
-# ---- UI: Select a school + Random School button ----
+# ---- UI: Search + select a school + Random School button ----
 st.markdown("### **Select a School:**")
 
-current_school = st.session_state["school_selector"]
-current_idx = school_list.index(current_school)
+current_code = st.session_state["school_selector"]
+
+query = st.text_input(
+    "Search by school, district, or county",
+    placeholder="e.g. Lincoln, Fresno Unified, San Diego",
+)
+options = school_index.search(query) if query else school_index.codes
+if not options:
+    st.warning("No schools match your search.")
+if current_code not in options:
+    options = [current_code] + options
 
 # Full-width selectbox with index (no key)
-selected_school = st.selectbox(
+selected_code = st.selectbox(
     "",
-    school_list,
-    index=current_idx,
+    options,
+    index=options.index(current_code),
+    format_func=school_index.label,
 )
 
 # Update state from manual selection
-st.session_state["school_selector"] = selected_school
+st.session_state["school_selector"] = selected_code
 
 # Random School button (below, left-aligned)
 if st.button("🎲 Random School"):
     random_school = df_full.sample(1).iloc[0]
-    st.session_state["school_selector"] = random_school["school"]
+    st.session_state["school_selector"] = random_school["cdscode"]
     st.rerun()
 
 # ---- Use the *current* school from session_state ----
 current_school = st.session_state["school_selector"]
-school_row = df_full[df_full["school"] == current_school].iloc[0]
+school_row = school_index.row(current_school)
 
 # If user selected a different school (manual or random), reset slider defaults
 if st.session_state["last_selected_school"] != current_school:
@@ -93,10 +121,18 @@ st.divider()
 # sliders
 st.subheader("Feature Inputs")
 
+show_curves = st.toggle(
+    "📈 Show risk curves",
+    value=True,
+    help="How the risk probability changes across each feature's full range, "
+    "holding the other inputs at their current values.",
+)
+
 col1, col2, col3 = st.columns(3)
 cols = [col1, col2, col3]
 
 feature_values = {}
+curve_slots = {}
 
 for i, feature in enumerate(ordered_features):
     col_idx = i // 5
@@ -117,22 +153,48 @@ for i, feature in enumerate(ordered_features):
         )
 
         feature_values[feature] = value
+        curve_slots[feature] = st.empty()   # filled once all inputs are known
 
 
 # Model prediction
-# Build input in the exact order the model expects
-features_for_model = [f for f in TOP_FEATURES if f in feature_values]
+# Build input in the exact order the model expects; the engine, caches and
+# ICE curves index these values by position, so a model feature without a
+# slider must raise here (KeyError) rather than shift the other columns
+features_for_model = list(model.feature_names)
 
-input_df = pd.DataFrame(
-    [[feature_values[f] for f in features_for_model]],
-    columns=features_for_model,
-)
+input_values = [feature_values[f] for f in features_for_model]
+baseline_values = [school_row[f] for f in features_for_model]
+
+# ICE curves under each slider (one batched prediction, cached per curve)
+if show_curves:
+    ice_curves = load_ice_engine().curves(input_values)
+    for feature, slot in curve_slots.items():
+        grid, probs = ice_curves[feature]
+        slot.altair_chart(ice_chart(grid, probs, feature_values[feature]), use_container_width=True)
 
 st.divider()
 
 # Model prediction
-prediction = model.predict(input_df)[0]
-probability = model.predict_proba(input_df)[0][1]
+def score_inputs():
+    # one compiled pass gives the probability and the tree spread
+    _, proba, spread = model.predict_with_uncertainty([input_values])
+    return proba[0, 1], {k: v[0] for k, v in spread.items()}
+
+at_baseline = prediction_cache.key(input_values) == prediction_cache.key(baseline_values)
+
+if at_baseline:
+    # sliders untouched: use the precomputed prediction for this school
+    baseline = baseline_scores.loc[school_row.name]
+    prediction, probability = baseline["prediction"], baseline["risk_probability"]
+    spread = {
+        "lower": baseline["risk_p05"],
+        "upper": baseline["risk_p95"],
+        "vote_share": baseline["vote_share"],
+    }
+else:
+    # what-if inputs: revisited slider positions come from the cache
+    probability, spread = prediction_cache.get_or_compute(input_values, score_inputs)
+    prediction = int(risk.classify(probability))
 risk_label = "At Risk" if prediction == 1 else "On Track"
 
 # ---- Actual outcome from dataset ----
@@ -147,6 +209,15 @@ with col_pred:
     st.subheader("Model Prediction")
     st.metric("Status", risk_label)
     st.write(f"Risk Probability: {round(probability * 100, 1)}%")
+    if risk.calibrated:
+        st.write(f"Calibrated Risk: {round(float(risk.calibrate(probability)) * 100, 1)}%")
+    st.caption(risk.describe())
+    agreement, spread_text = describe_uncertainty(
+        prediction, spread["vote_share"], spread["lower"], spread["upper"]
+    )
+    st.caption(spread_text)
+    if agreement == "Low":
+        st.warning(f"⚠️ Shaky call: the model's trees are split on whether this school is {risk_label}.")
 
 with col_actual:
     st.subheader("Actual Outcome")
@@ -158,4 +229,88 @@ if risk_label == actual_label:
 else:
     st.error("❌ Model prediction does NOT match the actual outcome for this school.")
 
+# ---- Counterfactuals: smallest changes that reach "On Track" ----
+if prediction == 1:
+    with st.expander("🧭 What would move this school to On Track?"):
+        st.caption(
+            "Smallest changes to actionable features (within the slider ranges) that "
+            f"bring the predicted risk to {risk.threshold:.1%} or below, cheapest first."
+        )
+        if st.button("Find changes"):
+            solutions = find_counterfactuals(
+                model, dict(zip(features_for_model, input_values)), threshold=risk.threshold
+            )
+            if not solutions:
+                st.info("No combination of up to two actionable changes reaches On Track.")
+            for k, sol in enumerate(solutions, start=1):
+                st.markdown(
+                    f"**Option {k}** — new risk {sol['risk_probability'] * 100:.1f}%\n"
+                    + "\n".join(
+                        f"- {describe_change(f, old, new)}"
+                        for f, (old, new) in sol["changes"].items()
+                    )
+                )
+
+with st.expander("⚙️ Prediction cache"):
+    stats = prediction_cache.stats()
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Hits", stats["hits"])
+    c2.metric("Misses", stats["misses"])
+    c3.metric("Hit rate", f"{stats['hit_rate']:.0%}")
+    c4.metric("Entries", f"{stats['size']} / {stats['maxsize']}")
+    st.caption(f"Evictions: {stats['evictions']}")
+
+# ---- Why this prediction? (per-school SHAP contributions) ----
+st.subheader("Why this prediction?")
+
+def explain_inputs():
+    X = pd.DataFrame([input_values], columns=features_for_model)
+    base, values = shap_contributions(load_explainer(), X)
+    return base, pd.Series(values[0], index=features_for_model)
+
+explanation_store, explanation_meta = load_explanations()
+contributions = None
+if at_baseline:
+    # precomputed by `python -m utils.explanations`
+    contributions = stored_contributions(
+        explanation_store, explanation_meta, current_school, school_row, load_model_hash()
+    )
+    base_value = explanation_meta.get("base_value")
+if contributions is None:
+    # slider-modified (or not yet precomputed): exact TreeSHAP, cached
+    base_value, contributions = load_explanation_cache().get_or_compute(
+        input_values, explain_inputs
+    )
+
+contrib_df = pd.DataFrame({
+    "feature": [slider_settings.get(f, {}).get("label", f) for f in contributions.index],
+    "contribution": contributions.to_numpy() * 100,
+})
+contrib_df["effect"] = contrib_df["contribution"].map(
+    lambda v: "Raises risk" if v > 0 else "Lowers risk"
+)
+contrib_df = contrib_df.reindex(
+    contrib_df["contribution"].abs().sort_values(ascending=False).index
+)
+
+chart = (
+    alt.Chart(contrib_df)
+    .mark_bar()
+    .encode(
+        x=alt.X("contribution:Q", title="Change in risk probability (percentage points)"),
+        y=alt.Y("feature:N", sort=None, title=None),
+        color=alt.Color(
+            "effect:N",
+            scale=alt.Scale(domain=["Raises risk", "Lowers risk"], range=["#d62728", "#2ca02c"]),
+            legend=alt.Legend(title=None, orient="bottom"),
+        ),
+        tooltip=["feature", alt.Tooltip("contribution:Q", format="+.2f")],
+    )
+)
+st.altair_chart(chart, use_container_width=True)
+st.caption(
+    f"Starting from the model's average risk of {base_value * 100:.1f}%, each bar shows "
+    "how much a feature moves this school's risk probability (SHAP values)."
+)
+
 st.divider()
@@ -1,22 +1,17 @@
 # import libraries 
 import streamlit as st
-import joblib 
 import pandas as pd 
 
-from pathlib import Path 
-from utils.paths import get_paths
 from utils.feature_config import slider_settings
+from utils.ice import ice_chart
+from utils.inference import describe_uncertainty
 from utils.randomizer import randomize_feature_values
+from utils.registry import load_compiled_model, load_ice_engine, load_risk_threshold, load_top_features
 
-paths = get_paths()
-MODELS_DIR = paths["MODELS_DIR"]
-
-MODEL_PATH = MODELS_DIR / "random_forest_ews.pkl"
-FEATURE_PATH = MODELS_DIR / "top_features.pkl"
-
-# load models/features
-top_features = joblib.load(FEATURE_PATH)
-model = joblib.load(MODEL_PATH)
+# load models/features (shared across reruns and sessions)
+top_features = load_top_features()
+model = load_compiled_model()
+risk = load_risk_threshold()
 
 st.set_page_config(
     page_title="ABCS by Feature Importance",
@@ -58,8 +53,16 @@ with col_btn:
 col1, col2, col3 = st.columns(3)
 cols = [col1, col2, col3]
 
+show_curves = st.toggle(
+    "📈 Show risk curves",
+    value=True,
+    help="How the risk probability changes across each feature's full range, "
+    "holding the other inputs at their current values.",
+)
+
 # dict to store slider values
 feature_values = {}
+curve_slots = {}
 
 # Render sliders (session_state owns the value)
 for i, feature in enumerate(ordered_features):
@@ -80,6 +83,7 @@ for i, feature in enumerate(ordered_features):
         )
 
         feature_values[feature] = value
+        curve_slots[feature] = st.empty()   # filled once all inputs are known
 
 # ----- Model prediction -----
 
@@ -92,13 +96,31 @@ input_df = pd.DataFrame({
 # reorder features according to the model
 input_df = input_df.reindex(columns=top_features)
 
+# ICE curves under each slider (one batched prediction, cached per curve)
+if show_curves:
+    ice_curves = load_ice_engine().curves(input_df.iloc[0].tolist())
+    for feature, slot in curve_slots.items():
+        grid, probs = ice_curves[feature]
+        slot.altair_chart(ice_chart(grid, probs, feature_values[feature]), use_container_width=True)
+
 st.divider()
 
-prediction = model.predict(input_df)[0]
+# one compiled pass gives the probability and the tree spread
+_, proba, spread = model.predict_with_uncertainty(input_df)
+probability = proba[0, 1]
+prediction = int(risk.classify(probability))
 risk_label = "At Risk" if prediction == 1 else "On Track"
 st.subheader(f"Model Prediction: {risk_label}")
 
-probability = model.predict_proba(input_df)[0][1]
 st.write(f"Risk Probability: {round(probability * 100, 1)}%")
+if risk.calibrated:
+    st.write(f"Calibrated Risk: {round(float(risk.calibrate(probability)) * 100, 1)}%")
+st.caption(risk.describe())
+agreement, spread_text = describe_uncertainty(
+    prediction, spread["vote_share"][0], spread["lower"][0], spread["upper"][0]
+)
+st.caption(spread_text)
+if agreement == "Low":
+    st.warning(f"⚠️ Shaky call: the model's trees are split on whether these inputs are {risk_label}.")
 
 st.divider()
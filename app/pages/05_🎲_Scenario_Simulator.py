@@ -0,0 +1,155 @@
+# import libraries
+import altair as alt
+import pandas as pd
+import streamlit as st
+
+from utils.feature_config import slider_settings
+from utils.registry import load_compiled_model, load_risk_threshold, load_school_data
+from utils.scenarios import run_scenarios
+
+# load model/data (shared across reruns and sessions)
+model = load_compiled_model()
+risk = load_risk_threshold()
+
+st.set_page_config(
+    page_title="Scenario Simulator",
+    page_icon="🎲",
+    layout="wide",
+)
+
+st.title("🎲 Scenario Simulator")
+st.markdown(
+    "Instead of one random school at a time, draw thousands of input "
+    "combinations at once and see how the model's risk is distributed across "
+    "them, and which indicators move it the most."
+)
+
+# --- Simulation settings ---
+col_mode, col_n, col_seed = st.columns([2, 2, 1])
+
+with col_mode:
+    mode = st.radio(
+        "Sample inputs from",
+        options=["uniform", "empirical"],
+        format_func=lambda m: {
+            "uniform": "Slider ranges (uniform)",
+            "empirical": "Real schools (resampled rows)",
+        }[m],
+        horizontal=True,
+        help=(
+            "Slider ranges draws every indicator independently across its slider. "
+            "Real schools resamples whole school rows from the dataset, so "
+            "indicators keep their real-world correlations."
+        ),
+    )
+
+with col_n:
+    n_samples = st.select_slider(
+        "Scenarios",
+        options=[1_000, 5_000, 10_000, 20_000, 50_000],
+        value=10_000,
+        format_func=lambda n: f"{n:,}",
+    )
+
+with col_seed:
+    seed = st.number_input("Seed", min_value=0, value=42, step=1)
+
+if st.button("▶️ Run scenarios", type="primary") or "scenario_summary" not in st.session_state:
+    X_data = model.to_array(load_school_data()) if mode == "empirical" else None
+    with st.spinner(f"Scoring {n_samples:,} scenarios..."):
+        summary, elapsed = run_scenarios(
+            model, n_samples=n_samples, mode=mode, X_data=X_data, seed=int(seed),
+            threshold=risk.threshold,
+        )
+    st.session_state["scenario_summary"] = (summary, elapsed, mode)
+
+summary, elapsed, run_mode = st.session_state["scenario_summary"]
+stats = summary.stats()
+
+st.divider()
+
+# --- Headline numbers ---
+m1, m2, m3, m4 = st.columns(4)
+m1.metric("Scenarios", f"{stats['samples']:,}")
+m2.metric("Mean risk", f"{stats['mean_risk'] * 100:.1f}%")
+m3.metric("Predicted At Risk", f"{stats['at_risk_share'] * 100:.1f}%")
+m4.metric("Scored in", f"{elapsed * 1000:,.0f} ms")
+st.caption(risk.describe())
+
+left, right = st.columns(2)
+
+# --- Risk distribution ---
+with left:
+    st.subheader("Risk distribution")
+    start, end, count, at_risk = summary.histogram()
+    hist_df = pd.DataFrame(
+        {"start": start * 100, "end": end * 100, "count": count, "at_risk": at_risk}
+    )
+    hist = (
+        alt.Chart(hist_df)
+        .mark_bar()
+        .encode(
+            x=alt.X("start:Q", bin="binned", title="Risk probability (%)"),
+            x2="end:Q",
+            y=alt.Y("count:Q", title="Scenarios"),
+            color=alt.condition(
+                alt.datum.at_risk,
+                alt.value("#d62728"),
+                alt.value("#1f77b4"),
+            ),
+            tooltip=[
+                alt.Tooltip("start:Q", title="From %", format=".0f"),
+                alt.Tooltip("end:Q", title="To %", format=".0f"),
+                alt.Tooltip("count:Q", title="Scenarios", format=","),
+            ],
+        )
+        .properties(height=320)
+    )
+    st.altair_chart(hist, use_container_width=True)
+
+# --- Sensitivity ---
+with right:
+    st.subheader("Which indicators move risk the most?")
+    sens = summary.sensitivity()
+    sens_df = pd.DataFrame(
+        [
+            {
+                "feature": slider_settings.get(f, {}).get("label", f),
+                "swing": s["swing"] * 100,
+                "correlation": s["correlation"],
+            }
+            for f, s in sens.items()
+        ]
+    ).sort_values("swing", ascending=False)
+    sens_chart = (
+        alt.Chart(sens_df)
+        .mark_bar()
+        .encode(
+            x=alt.X("swing:Q", title="Risk swing across the range (pct. points)"),
+            y=alt.Y("feature:N", sort="-x", title=None),
+            color=alt.condition(
+                alt.datum.correlation > 0,
+                alt.value("#d62728"),   # higher value -> higher risk
+                alt.value("#2ca02c"),   # higher value -> lower risk
+            ),
+            tooltip=[
+                alt.Tooltip("feature:N", title="Indicator"),
+                alt.Tooltip("swing:Q", title="Swing (pts)", format=".1f"),
+                alt.Tooltip("correlation:Q", title="Correlation", format=".2f"),
+            ],
+        )
+        .properties(height=320)
+    )
+    st.altair_chart(sens_chart, use_container_width=True)
+
+st.caption(
+    "Swing is the gap between the highest and lowest average risk across ten "
+    "bins of each indicator's range. Red bars: risk rises with the indicator; "
+    "green bars: risk falls. "
+    + (
+        "In real-school mode indicators move together, so swing also reflects "
+        "correlated indicators."
+        if run_mode == "empirical"
+        else ""
+    )
+)
@@ -0,0 +1,206 @@
+# import libraries
+import pandas as pd
+import streamlit as st
+
+from utils.feature_config import slider_settings
+from utils.policy import OPERATIONS, load_policy_simulator
+from utils.registry import load_risk_threshold
+
+# shared simulator (model, school table and policy cache loaded once)
+sim = load_policy_simulator()
+
+st.set_page_config(
+    page_title="Policy Simulator",
+    page_icon="🏛️",
+    layout="wide",
+)
+
+st.title("🏛️ Policy Simulator")
+st.markdown(
+    "Apply the same change to every school in a county, district, or the whole "
+    "state, and see how many schools the model would move between **At Risk** "
+    "and **On Track**. For example: *every school in Fresno County cuts chronic "
+    "absenteeism by 5 points*."
+)
+
+# --- Which schools ---
+st.subheader("1. Which schools?")
+col_county, col_district = st.columns(2)
+with col_county:
+    counties = st.multiselect(
+        "Counties", sim.counties(), placeholder="All counties (statewide)"
+    )
+with col_district:
+    districts = st.multiselect(
+        "Districts", sim.districts(counties), placeholder="All districts in the selection"
+    )
+
+# --- What changes ---
+st.subheader("2. What changes?")
+n_changes = st.number_input("Number of changes", min_value=1, max_value=5, value=1, step=1)
+
+features = list(slider_settings)
+transforms = []
+for i in range(int(n_changes)):
+    c_feat, c_op, c_val = st.columns([3, 2, 2])
+    with c_feat:
+        feature = st.selectbox(
+            "Indicator",
+            features,
+            index=features.index("chronicabsenteeismrate") if i == 0 else i % len(features),
+            format_func=lambda f: slider_settings[f]["label"],
+            key=f"policy_feature_{i}",
+        )
+    with c_op:
+        op = st.selectbox(
+            "Change",
+            list(OPERATIONS),
+            format_func=OPERATIONS.get,
+            key=f"policy_op_{i}",
+        )
+    s = slider_settings[feature]
+    with c_val:
+        if op == "add":
+            value = st.number_input("Amount", value=-5.0, step=1.0, key=f"policy_add_{i}")
+        elif op == "multiply":
+            value = st.number_input(
+                "Factor", value=0.9, min_value=0.0, step=0.05, key=f"policy_mul_{i}"
+            )
+        else:
+            value = st.slider(
+                "Range",
+                min_value=float(s["min"]),
+                max_value=float(s["max"]),
+                value=(float(s["min"]), float(s["max"])),
+                key=f"policy_clamp_{i}",
+            )
+    transforms.append((feature, op, value))
+
+st.caption(
+    "Changed values always stay within each indicator's slider range "
+    "(a school already outside the range keeps its own value as the limit)."
+)
+
+result = sim.simulate(transforms, counties=counties, districts=districts)
+summary = result["summary"]
+
+st.divider()
+
+# --- Results ---
+st.subheader("3. Impact")
+m1, m2, m3, m4 = st.columns(4)
+m1.metric("Schools affected", f"{summary['schools']:,}")
+m2.metric(
+    "Predicted At Risk",
+    f"{summary['at_risk_after']:,}",
+    delta=summary["at_risk_after"] - summary["at_risk_before"],
+    delta_color="inverse",
+)
+m3.metric("Flip to On Track", f"{summary['flipped_to_on_track']:,}")
+m4.metric("Mean risk change", f"{summary['mean_delta'] * 100:+.1f} pts")
+st.caption(load_risk_threshold().describe())
+
+if summary["flipped_to_at_risk"]:
+    st.warning(f"⚠️ {summary['flipped_to_at_risk']:,} schools flip from On Track to At Risk.")
+
+
+def _format_groups(table):
+    out = table.reset_index()
+    out["mean_delta"] = out["mean_delta"] * 100
+    out["min_delta"] = out["min_delta"] * 100
+    return out.rename(
+        columns={
+            "county": "County",
+            "district": "District",
+            "schools": "Schools",
+            "at_risk_before": "At Risk (now)",
+            "at_risk_after": "At Risk (policy)",
+            "flipped_to_on_track": "→ On Track",
+            "flipped_to_at_risk": "→ At Risk",
+            "mean_delta": "Mean change (pts)",
+            "min_delta": "Largest drop (pts)",
+        }
+    )
+
+
+number_format = {"Mean change (pts)": "{:+.1f}", "Largest drop (pts)": "{:+.1f}"}
+tab_county, tab_district, tab_schools = st.tabs(["By county", "By district", "Schools that flip"])
+
+with tab_county:
+    st.dataframe(
+        _format_groups(result["by_county"]).style.format(number_format),
+        use_container_width=True,
+        hide_index=True,
+    )
+
+with tab_district:
+    st.dataframe(
+        _format_groups(result["by_district"]).style.format(number_format),
+        use_container_width=True,
+        hide_index=True,
+    )
+
+with tab_schools:
+    schools = result["schools"]
+    flipped = schools[schools["flipped_to_on_track"] | schools["flipped_to_at_risk"]]
+    if flipped.empty:
+        st.info("ℹ️ No school changes category under this policy.")
+    else:
+        st.dataframe(
+            pd.DataFrame(
+                {
+                    "School": flipped["school"],
+                    "District": flipped["district"],
+                    "County": flipped["county"],
+                    "Risk now (%)": flipped["risk_before"] * 100,
+                    "Risk under policy (%)": flipped["risk_after"] * 100,
+                    "Flip": flipped["flipped_to_on_track"].map(
+                        {True: "→ On Track", False: "→ At Risk"}
+                    ),
+                }
+            ).sort_values("Risk under policy (%)"),
+            use_container_width=True,
+            hide_index=True,
+        )
+
+# --- Compare policies ---
+st.divider()
+st.subheader("Compare policies")
+st.markdown("Save policies as you go to compare them side by side.")
+
+saved = st.session_state.setdefault("saved_policies", {})
+col_name, col_save, col_clear = st.columns([3, 1, 1])
+with col_name:
+    name = st.text_input("Policy name", value=f"Policy {len(saved) + 1}")
+with col_save:
+    st.write("")
+    if st.button("💾 Save policy"):
+        saved[name] = {"transforms": transforms, "counties": counties, "districts": districts}
+with col_clear:
+    st.write("")
+    if st.button("🗑️ Clear"):
+        saved.clear()
+
+if saved:
+    comparison = sim.compare(saved)
+    comparison["mean_delta"] = comparison["mean_delta"] * 100
+    st.dataframe(
+        comparison.rename(
+            columns={
+                "schools": "Schools",
+                "at_risk_before": "At Risk (now)",
+                "at_risk_after": "At Risk (policy)",
+                "flipped_to_on_track": "→ On Track",
+                "flipped_to_at_risk": "→ At Risk",
+                "mean_delta": "Mean change (pts)",
+            }
+        ).style.format({"Mean change (pts)": "{:+.1f}"}),
+        use_container_width=True,
+    )
+
+with st.expander("⚙️ Policy cache"):
+    stats = sim.cache.stats()
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Policies cached", f"{stats['size']:,} / {stats['maxsize']:,}")
+    c2.metric("Hit rate", f"{stats['hit_rate'] * 100:.0f}%")
+    c3.metric("Hits / misses", f"{stats['hits']:,} / {stats['misses']:,}")
@@ -0,0 +1,261 @@
+"""
+Statewide batch scoring for the EWS model.
+
+Scores every school in the final dataset (or a new year's file with the same
+feature columns) with the compiled forest, labels it at the saved risk cutoff
+(``utils.thresholds``), ranks schools by risk statewide,
+within their county and within their district, and lists the features that
+pushed each school's risk up the most. Those come from the precomputed TreeSHAP
+store (``utils.explanations``), the same values School Explorer shows; schools
+not in the store, or whose features changed since it was built, fall back to
+Saabas path contributions from the compiled forest, and the
+'contribution_method' column says which was used. Rows are scored in chunks,
+so memory stays bounded for multi-year inputs, and chunks are spread over all
+CPU cores.
+
+Usage (from ``app/``):
+
+    python -m utils.batch_scoring
+    python -m utils.batch_scoring --input ../data/new_year.parquet --output scores.csv
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils.explanations import stored_contribution_matrix
+from utils.inference import agreement_level
+from utils.paths import get_paths
+from utils.registry import (
+    FINAL_DATASET_PATH,
+    load_compiled_model,
+    load_explanations,
+    load_model_hash,
+    load_risk_threshold,
+)
+
+paths = get_paths()
+DATA_DIR = paths["DATA_DIR"]
+
+DEFAULT_OUTPUT = DATA_DIR / "risk_scores.parquet"
+
+ID_COLS = ["cdscode", "county", "district", "school"]
+
+RISK_LABELS = {0: "On Track", 1: "At Risk"}
+
+
+# --- I/O -----------------------------------------------------------------------
+
+
+def read_input(path):
+    """
+    Read a school feature file (.pkl, .parquet, .feather or .csv).
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".pkl":
+        return pd.read_pickle(path)
+    if suffix == ".parquet":
+        return pd.read_parquet(path)
+    if suffix == ".feather":
+        return pd.read_feather(path)
+    if suffix == ".csv":
+        return pd.read_csv(path, dtype={"cdscode": str})
+    raise ValueError(f"Unsupported input format '{suffix}'. Use .pkl, .parquet, .feather or .csv.")
+
+
+def write_scores(scores, path):
+    """
+    Write scores to Parquet or CSV, chosen by the file extension.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix.lower() == ".csv":
+        scores.to_csv(path, index=False)
+    else:
+        scores.to_parquet(path, index=False)
+    return path
+
+
+# --- Scoring -------------------------------------------------------------------
+
+# compiled model and risk cutoff held by each worker process (set once by _init_worker)
+_worker_engine = None
+_worker_risk = None
+
+
+def _init_worker(engine, risk):
+    global _worker_engine, _worker_risk
+    _worker_engine, _worker_risk = engine, risk
+
+
+def _score_chunk(X, top_k, shap=None, engine=None, risk=None):
+    """
+    Score one chunk of rows: probability, label at the cutoff, spread across
+    trees and top contributing features.
+
+    ``shap`` holds stored TreeSHAP values for the chunk (NaN rows where none
+    are available); only those rows get Saabas contributions instead.
+    """
+    engine = engine or _worker_engine
+    risk = risk or _worker_risk
+    _, proba, spread = engine.predict_with_uncertainty(X)
+
+    contrib = np.full(X.shape, np.nan) if shap is None else shap.copy()
+    saabas = np.isnan(contrib).any(axis=1)
+    if saabas.any():
+        _, contrib[saabas] = engine.contributions(X[saabas])
+
+    # largest positive contributions first (features raising the risk)
+    top = np.argsort(-contrib, axis=1, kind="stable")[:, :top_k]
+    names = np.asarray(engine.feature_names, dtype=object)
+
+    out = {
+        "risk_probability": proba[:, 1],
+        "calibrated_probability": risk.calibrate(proba[:, 1]),
+        "prediction": risk.classify(proba[:, 1]),
+        "risk_std": spread["std"],
+        "risk_p05": spread["lower"],
+        "risk_p95": spread["upper"],
+        "vote_share": spread["vote_share"],
+        "contribution_method": np.where(saabas, "Saabas", "TreeSHAP"),
+    }
+    for k in range(top_k):
+        out[f"top_feature_{k + 1}"] = names[top[:, k]]
+        out[f"top_contribution_{k + 1}"] = np.take_along_axis(
+            contrib, top[:, [k]], axis=1
+        )[:, 0]
+    return pd.DataFrame(out)
+
+
+def score_schools(
+    df, engine=None, risk=None, top_k=3, chunk_size=5_000, jobs=None, explanations=None
+):
+    """
+    Score every row of a school feature table.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Must contain the model features; ID columns are carried through.
+    engine : utils.inference.CompiledForest, optional
+        Compiled model. Defaults to the registry's compiled EWS model.
+    risk : utils.thresholds.RiskThreshold, optional
+        At-risk cutoff and calibration. Defaults to the registry's saved
+        cutoff.
+    top_k : int, optional
+        Number of top contributing features to report. Defaults to 3.
+    chunk_size : int, optional
+        Rows scored per chunk. Defaults to 5,000.
+    jobs : int, optional
+        Worker processes. Defaults to the number of CPU cores; chunks are
+        scored in-process when there is only one chunk or ``jobs=1``.
+    explanations : tuple, optional
+        ``(store, meta, model_hash)`` of precomputed TreeSHAP values, as
+        from ``utils.explanations.read_store`` plus the served model's hash.
+        Defaults to the registry's store when ``engine`` is also the
+        registry's; otherwise every school gets Saabas contributions.
+
+    Returns
+    -------
+    pandas.DataFrame
+        ID columns, risk probability (raw and calibrated), prediction and
+        risk label at the cutoff, tree
+        agreement with the call, spread across trees (std, 5th/95th
+        percentile, share of trees voting At Risk), statewide, county and
+        district ranks (1 = highest risk), the top features with their
+        contributions and the 'contribution_method' ('TreeSHAP' or
+        'Saabas') they came from.
+    """
+    if explanations is None and engine is None:
+        explanations = (*load_explanations(), load_model_hash())
+    engine = engine or load_compiled_model()
+    risk = risk or load_risk_threshold()
+    X = engine.to_array(df)
+    shap = (
+        stored_contribution_matrix(*explanations[:2], df, engine.feature_names, explanations[2])
+        if explanations is not None
+        else np.full(X.shape, np.nan)
+    )
+    starts = range(0, len(X), chunk_size)
+    chunks = [X[i:i + chunk_size] for i in starts]
+    shap_chunks = [shap[i:i + chunk_size] for i in starts]
+    jobs = jobs or os.cpu_count() or 1
+
+    if jobs == 1 or len(chunks) <= 1:
+        parts = [
+            _score_chunk(chunk, top_k, values, engine, risk)
+            for chunk, values in zip(chunks, shap_chunks)
+        ]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=min(jobs, len(chunks)),
+            initializer=_init_worker,
+            initargs=(engine, risk),
+        ) as pool:
+            parts = list(pool.map(_score_chunk, chunks, [top_k] * len(chunks), shap_chunks))
+
+    scored = (
+        pd.concat(parts, ignore_index=True) if parts else _score_chunk(X, top_k, shap, engine, risk)
+    )
+    scored.insert(3, "risk_label", scored["prediction"].map(RISK_LABELS))
+    # how firmly the trees back the call; 'Low' marks shaky predictions
+    agreement = np.where(scored["prediction"] == 1, scored["vote_share"], 1 - scored["vote_share"])
+    scored.insert(4, "agreement", [agreement_level(a) for a in agreement])
+
+    ids = df[[c for c in ID_COLS if c in df.columns]].reset_index(drop=True)
+    scores = pd.concat([ids, scored], axis=1)
+    return add_ranks(scores)
+
+
+def add_ranks(scores, prob_col="risk_probability"):
+    """
+    Add statewide, county and district risk ranks (1 = highest probability).
+
+    Ties share the best rank. County/district ranks are only added when the
+    column is present.
+    """
+    scores = scores.copy()
+    scores["state_rank"] = scores[prob_col].rank(ascending=False, method="min").astype(int)
+    for col in ["county", "district"]:
+        if col in scores.columns:
+            scores[f"{col}_rank"] = (
+                scores.groupby(col, observed=True)[prob_col]
+                .rank(ascending=False, method="min")
+                .astype("Int64")
+            )
+    return scores.sort_values("state_rank", kind="stable").reset_index(drop=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score every school with the EWS model.")
+    parser.add_argument("--input", type=Path, default=FINAL_DATASET_PATH, help="school feature file")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT, help=".parquet or .csv")
+    parser.add_argument("--top-k", type=int, default=3, help="top contributing features per school")
+    parser.add_argument("--chunk-size", type=int, default=5_000, help="rows per chunk")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: all cores)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    df = read_input(args.input)
+    scores = score_schools(
+        df, top_k=args.top_k, chunk_size=args.chunk_size, jobs=args.jobs
+    )
+    out = write_scores(scores, args.output)
+
+    n_risk = int((scores["prediction"] == 1).sum())
+    print(
+        f"✅ Scored {len(scores):,} schools ({n_risk:,} at risk) "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
+    print(f"ℹ️ {load_risk_threshold().describe()}")
+    print(f"[saved] {out}")
+
+
+if __name__ == "__main__":
+    main()
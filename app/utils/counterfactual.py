@@ -0,0 +1,334 @@
+"""
+Counterfactual search: the smallest changes that move a school to "On Track".
+
+For an at-risk school, candidate changes to one, two or three actionable
+features (``feature_config.actionable_features``) are generated on a grid
+inside each feature's slider bounds. Each candidate is costed by its
+normalized L1 distance: the change in each feature as a share of its slider
+range, summed. Candidates are scored in cost order, in growing vectorized
+batches. Once a feature set reaches "On Track", its remaining candidates and
+all of its supersets are pruned. The search stops at the requested number of
+solutions, because every remaining candidate costs at least as much.
+
+Usage (from ``app/``), for every at-risk school statewide:
+
+    python -m utils.counterfactual
+    python -m utils.counterfactual --max-changes 3 --output ../data/counterfactuals.csv
+"""
+
+import argparse
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils.batch_scoring import ID_COLS, read_input, write_scores
+from utils.feature_config import actionable_features, slider_settings
+from utils.ice import feature_grid
+from utils.paths import get_paths
+from utils.registry import FINAL_DATASET_PATH, load_compiled_model, load_risk_threshold
+
+paths = get_paths()
+DATA_DIR = paths["DATA_DIR"]
+
+DEFAULT_OUTPUT = DATA_DIR / "counterfactuals.parquet"
+
+# columns of counterfactuals_for_schools after the ID columns
+RESULT_COLS = [
+    "risk_probability",
+    "solution",
+    "features_changed",
+    "changes",
+    "cost",
+    "new_risk_probability",
+]
+
+# grid points per feature, by number of features changed together; larger
+# combinations use coarser grids to keep the candidate count bounded
+GRID_POINTS = {1: 41, 2: 21, 3: 11}
+
+
+def generate_candidates(x, feature_idx, feature_names, max_changes=2):
+    """
+    Enumerate candidate inputs that change up to ``max_changes`` features.
+
+    Parameters
+    ----------
+    x : numpy.ndarray
+        Current input vector in model order.
+    feature_idx : list of int
+        Positions of the actionable features.
+    feature_names : list of str
+        Model feature names (for slider settings).
+    max_changes : int, optional
+        Most features changed at once. Defaults to 2.
+
+    Returns
+    -------
+    X : numpy.ndarray
+        Candidate inputs, shape (n_candidates, n_features).
+    cost : numpy.ndarray
+        Normalized L1 cost of each candidate.
+    combo : numpy.ndarray
+        Index into ``combos`` of the feature set each candidate changes.
+    combos : list of tuple
+        Feature positions changed by each combination.
+    """
+    span = {
+        j: float(slider_settings[feature_names[j]]["max"] - slider_settings[feature_names[j]]["min"])
+        for j in feature_idx
+    }
+
+    blocks, costs, combo_ids, combos = [], [], [], []
+    for size in range(1, max_changes + 1):
+        grids = {}
+        for j in feature_idx:
+            grid = feature_grid(feature_names[j], GRID_POINTS.get(size, 11))
+            grids[j] = grid[~np.isclose(grid, x[j])]
+
+        for combo in itertools.combinations(feature_idx, size):
+            mesh = np.meshgrid(*(grids[j] for j in combo), indexing="ij")
+            values = np.column_stack([m.ravel() for m in mesh])
+            if not len(values):
+                continue
+            block = np.repeat(x[None, :], len(values), axis=0)
+            block[:, combo] = values
+            cost = sum(np.abs(values[:, k] - x[j]) / span[j] for k, j in enumerate(combo))
+
+            blocks.append(block)
+            costs.append(cost)
+            combo_ids.append(np.full(len(values), len(combos)))
+            combos.append(combo)
+
+    if not blocks:
+        n = len(x)
+        return np.empty((0, n)), np.empty(0), np.empty(0, dtype=int), combos
+    return np.vstack(blocks), np.concatenate(costs), np.concatenate(combo_ids), combos
+
+
+def find_counterfactuals(
+    engine,
+    x,
+    threshold=None,
+    max_changes=2,
+    n_solutions=3,
+    batch_size=4096,
+    features=None,
+):
+    """
+    Smallest-cost changes that bring a school's risk to or below ``threshold``.
+
+    Parameters
+    ----------
+    engine : utils.inference.CompiledForest
+        Compiled EWS model.
+    x : dict, pandas.Series or array-like
+        The school's current inputs (model features).
+    threshold : float, optional
+        Risk probability at or below which a school is "On Track".
+        Defaults to the saved risk cutoff (``registry.load_risk_threshold``).
+    max_changes : int, optional
+        Most features changed at once (1–3). Defaults to 2.
+    n_solutions : int, optional
+        Solutions to return, each changing a different set of features.
+        Defaults to 3.
+    batch_size : int, optional
+        Most candidates scored per model call (batches start at 512 and
+        double). Defaults to 4096.
+    features : list of str, optional
+        Features the search may change. Defaults to
+        ``feature_config.actionable_features``.
+
+    Returns
+    -------
+    list of dict
+        Cheapest first. Each has 'changes' ({feature: (current, new)}),
+        'cost' and 'risk_probability'. Empty if no candidate crosses the
+        threshold.
+    """
+    threshold = load_risk_threshold().threshold if threshold is None else threshold
+    x = engine.to_array(x)[0]
+    names = engine.feature_names
+    features = actionable_features if features is None else features
+    feature_idx = [names.index(f) for f in features if f in names and f in slider_settings]
+
+    X, cost, combo, combos = generate_candidates(x, feature_idx, names, max_changes)
+    order = np.argsort(cost, kind="stable")
+
+    solutions = []
+    # feature sets still worth scoring: once a set is solved, it and every
+    # superset of it are pruned (any extra change would be unnecessary)
+    alive = np.ones(len(combos), dtype=bool)
+    combo_sets = [set(c) for c in combos]
+
+    start, size = 0, min(512, batch_size)
+    while start < len(order):
+        idx = order[start:start + size]
+        start += size
+        size = min(size * 2, batch_size)   # small first batches exit cheap cases early
+
+        idx = idx[alive[combo[idx]]]
+        if not len(idx):
+            continue
+        probs = engine.predict_proba(X[idx])[:, 1]
+
+        # candidates are in cost order, so the first hit per feature set is
+        # its cheapest; stop once enough distinct sets are found
+        for i in np.flatnonzero(probs <= threshold):
+            c = combo[idx[i]]
+            if not alive[c]:
+                continue
+            alive &= [not combo_sets[c] <= other for other in combo_sets]
+            row = X[idx[i]]
+            solutions.append(
+                {
+                    "changes": {names[j]: (float(x[j]), float(row[j])) for j in combos[c]},
+                    "cost": float(cost[idx[i]]),
+                    "risk_probability": float(probs[i]),
+                }
+            )
+            if len(solutions) == n_solutions:
+                return solutions
+
+    return solutions
+
+
+def describe_change(feature, old, new):
+    """
+    Human-readable change, e.g. 'Chronic Absenteeism (%): 24.0 → 15.5'.
+    """
+    label = slider_settings.get(feature, {}).get("label", feature)
+    return f"{label}: {old:,.2f} → {new:,.2f}"
+
+
+# --- Statewide job ---------------------------------------------------------------
+
+# compiled model held by each worker process (set once by _init_worker)
+_worker_engine = None
+
+
+def _init_worker(engine):
+    global _worker_engine
+    _worker_engine = engine
+
+
+def _search_one(args):
+    x, kwargs = args
+    return find_counterfactuals(_worker_engine, x, **kwargs)
+
+
+def counterfactuals_for_schools(df, engine=None, jobs=None, threshold=None, **kwargs):
+    """
+    Run the search for every at-risk school in ``df``.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        School inputs with ID columns.
+    engine : utils.inference.CompiledForest, optional
+        Compiled model. Defaults to the registry's compiled EWS model.
+    jobs : int, optional
+        Worker processes. Defaults to the number of CPU cores.
+    threshold : float, optional
+        Risk probability above which a school is at risk. Defaults to the
+        saved risk cutoff.
+    **kwargs
+        Passed to ``find_counterfactuals`` (max_changes, n_solutions, ...).
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per (school, solution) with the changes, cost and new risk;
+        at-risk schools without a solution get one row with an empty change.
+        Empty (with the same columns) when no school is above the cutoff.
+    """
+    engine = engine or load_compiled_model()
+    threshold = load_risk_threshold().threshold if threshold is None else threshold
+    _, proba = engine.predict(df)
+    at_risk = df.loc[proba[:, 1] > threshold].reset_index(drop=True)
+    risk = proba[proba[:, 1] > threshold, 1]
+
+    X = engine.to_array(at_risk)
+    tasks = [(row, dict(kwargs, threshold=threshold)) for row in X]
+    jobs = jobs or os.cpu_count() or 1
+
+    if jobs == 1 or len(tasks) <= 1:
+        _init_worker(engine)
+        results = [_search_one(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=jobs, initializer=_init_worker, initargs=(engine,)
+        ) as pool:
+            results = list(pool.map(_search_one, tasks, chunksize=8))
+
+    ids = at_risk[[c for c in ID_COLS if c in at_risk.columns]]
+    rows = []
+    for i, solutions in enumerate(results):
+        base = dict(ids.iloc[i]) if len(ids.columns) else {}
+        base["risk_probability"] = float(risk[i])
+        if not solutions:
+            rows.append({**base, "solution": None, "changes": None, "cost": np.nan,
+                         "new_risk_probability": np.nan})
+        for k, sol in enumerate(solutions, start=1):
+            rows.append(
+                {
+                    **base,
+                    "solution": k,
+                    "features_changed": ", ".join(sol["changes"]),
+                    "changes": "; ".join(
+                        describe_change(f, old, new) for f, (old, new) in sol["changes"].items()
+                    ),
+                    "cost": sol["cost"],
+                    "new_risk_probability": sol["risk_probability"],
+                }
+            )
+    ids_cols = list(ids.columns)
+    return pd.DataFrame(rows, columns=ids_cols + RESULT_COLS)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Find minimal changes that move each at-risk school to On Track."
+    )
+    parser.add_argument("--input", type=Path, default=FINAL_DATASET_PATH, help="school feature file")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT, help=".parquet or .csv")
+    parser.add_argument("--max-changes", type=int, default=2, help="features changed at once (1-3)")
+    parser.add_argument("--solutions", type=int, default=3, help="solutions per school")
+    parser.add_argument(
+        "--threshold", type=float, default=None, help="at-risk probability threshold (default: saved cutoff)"
+    )
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: all cores)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    df = read_input(args.input)
+    results = counterfactuals_for_schools(
+        df,
+        jobs=args.jobs,
+        threshold=args.threshold,
+        max_changes=args.max_changes,
+        n_solutions=args.solutions,
+    )
+    out = write_scores(results, args.output)
+
+    if results.empty:
+        print(f"ℹ️ No at-risk schools to search in {time.perf_counter() - start:.1f}s")
+        print(f"[saved] {out}")
+        return
+
+    # one row per school has solution 1 (or None when nothing was found)
+    n_schools = int((results["solution"].isna() | (results["solution"] == 1)).sum())
+    n_solved = int((results["solution"] == 1).sum())
+    print(
+        f"✅ {n_schools:,} at-risk schools searched ({n_solved:,} with a solution) "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
+    print(f"[saved] {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""
+Per-school TreeSHAP contributions.
+
+Exact TreeSHAP for the 400-tree forest takes a few seconds for the whole
+dataset: fine as a precomputation step, but too slow to run for every school
+on every rerun. This module precomputes contributions for every school in the
+06 dataset and stores them as Parquet next to it. It then serves them by
+cdscode and computes contributions on demand only for slider-modified inputs.
+
+The store is incremental. Each row records a hash of its feature values and
+the file records a hash of the model, so a rebuild only recomputes schools
+whose features changed (or everything, after retraining).
+
+Usage (from ``app/``):
+
+    python -m utils.explanations            # build / update the store
+    python -m utils.explanations --force    # recompute every school
+"""
+
+import argparse
+import hashlib
+import json
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from utils.paths import get_paths
+
+paths = get_paths()
+DATA_DIR = paths["DATA_DIR"]
+
+EXPLANATIONS_PATH = DATA_DIR / "06_top15_shap_values.parquet"
+
+# Parquet schema metadata key holding the store's model hash and base value
+META_KEY = b"ews_explanations"
+
+
+def model_hash(model_path):
+    """
+    SHA-256 of the model file; contributions are only reused for the same model.
+    """
+    digest = hashlib.sha256()
+    with open(model_path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def row_hashes(df, features):
+    """
+    Hash of each row's feature values (uint64, stable across runs).
+
+    Values are hashed as float64 so a single dataset row (often object dtype
+    once pulled out of the table) hashes the same as in the full table.
+    """
+    values = df[features].astype(np.float64)
+    return pd.util.hash_pandas_object(values, index=False).to_numpy()
+
+
+def make_explainer(model):
+    """
+    Exact TreeSHAP explainer for the Random Forest (imports ``shap`` lazily).
+    """
+    import shap
+
+    return shap.TreeExplainer(model)
+
+
+def shap_contributions(explainer, X, class_index=1):
+    """
+    TreeSHAP contributions toward ``class_index`` (at risk).
+
+    Returns
+    -------
+    base_value : float
+        Expected model output for the class.
+    values : numpy.ndarray
+        Shape (n_rows, n_features); ``base_value + values.sum(axis=1)``
+        equals the predicted probability.
+    """
+    values = explainer.shap_values(X)
+    if isinstance(values, list):  # older shap: one array per class
+        values = values[class_index]
+    elif values.ndim == 3:
+        values = values[:, :, class_index]
+    base = np.atleast_1d(explainer.expected_value)
+    return float(base[class_index] if base.size > 1 else base[0]), values
+
+
+# --- Store -----------------------------------------------------------------------
+
+
+def read_store(path=EXPLANATIONS_PATH):
+    """
+    Read the contribution store.
+
+    Returns
+    -------
+    values : pandas.DataFrame or None
+        Indexed by cdscode: 'row_hash' plus one column per feature. None if
+        the store does not exist yet.
+    meta : dict
+        'model_hash', 'base_value' and 'features' of the stored values.
+    """
+    if not path.exists():
+        return None, {}
+    table = pq.read_table(path)
+    meta = json.loads((table.schema.metadata or {}).get(META_KEY, b"{}"))
+    return table.to_pandas().set_index("cdscode"), meta
+
+
+def _write_store(values, meta, path):
+    table = pa.Table.from_pandas(values.reset_index(), preserve_index=False)
+    table = table.replace_schema_metadata(
+        {**(table.schema.metadata or {}), META_KEY: json.dumps(meta).encode("utf-8")}
+    )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pq.write_table(table, path)
+
+
+def build_store(df, model, model_path, path=EXPLANATIONS_PATH, force=False):
+    """
+    Create or update the contribution store for every school in ``df``.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        06 dataset ('cdscode' plus the model features).
+    model : sklearn.ensemble.RandomForestClassifier
+        Trained EWS model.
+    model_path : pathlib.Path
+        Model file, hashed to detect retraining.
+    path : pathlib.Path, optional
+        Parquet store. Defaults to ``data/06_top15_shap_values.parquet``.
+    force : bool, optional
+        Recompute every school even if unchanged. Defaults to False.
+
+    Returns
+    -------
+    dict
+        Counts of 'reused' and 'computed' rows.
+    """
+    features = list(model.feature_names_in_)
+    current = pd.DataFrame(
+        {"row_hash": row_hashes(df, features)},
+        index=pd.Index(df["cdscode"].astype(str), name="cdscode"),
+    )
+    m_hash = model_hash(model_path)
+
+    stored, meta = read_store(path)
+    reusable = (
+        not force
+        and stored is not None
+        and meta.get("model_hash") == m_hash
+        and meta.get("features") == features
+    )
+
+    if reusable:
+        prev = stored["row_hash"].reindex(current.index)
+        stale = (prev != current["row_hash"]).to_numpy()
+    else:
+        stale = np.ones(len(current), dtype=bool)
+
+    parts = [stored.loc[current.index[~stale]]] if reusable else []
+    base_value = meta.get("base_value")
+    if stale.any():
+        base_value, values = shap_contributions(
+            make_explainer(model), df.loc[stale, features]
+        )
+        fresh = pd.DataFrame(values, columns=features, index=current.index[stale])
+        fresh.insert(0, "row_hash", current["row_hash"][stale])
+        parts.append(fresh)
+
+    values = pd.concat(parts).reindex(current.index)
+
+    _write_store(
+        values,
+        {"model_hash": m_hash, "base_value": base_value, "features": features},
+        path,
+    )
+    return {"reused": int((~stale).sum()), "computed": int(stale.sum())}
+
+
+def stored_contributions(store, meta, cdscode, row, current_model_hash):
+    """
+    Precomputed contributions for one school, if still valid.
+
+    Parameters
+    ----------
+    store, meta : pandas.DataFrame, dict
+        Output of ``read_store``.
+    cdscode : str
+        School to look up.
+    row : pandas.Series
+        The school's current dataset row (to detect changed features).
+    current_model_hash : str
+        Hash of the model in use.
+
+    Returns
+    -------
+    pandas.Series or None
+        Contribution per feature, or None if the school is not in the store,
+        its features changed, or the model was retrained since the build.
+    """
+    if store is None or meta.get("model_hash") != current_model_hash:
+        return None
+    if cdscode not in store.index:
+        return None
+    features = meta["features"]
+    stored = store.loc[cdscode]
+    if stored["row_hash"] != row_hashes(row.to_frame().T, features)[0]:
+        return None
+    return stored[features].astype(float)
+
+
+def stored_contribution_matrix(store, meta, df, features, current_model_hash):
+    """
+    Precomputed contributions for many schools at once, where still valid.
+
+    The batch counterpart of ``stored_contributions``: rows are matched by
+    cdscode and checked against their stored feature hash.
+
+    Parameters
+    ----------
+    store, meta : pandas.DataFrame, dict
+        Output of ``read_store``.
+    df : pandas.DataFrame
+        'cdscode' plus the model features.
+    features : list of str
+        Column order of the returned matrix.
+    current_model_hash : str
+        Hash of the model in use.
+
+    Returns
+    -------
+    numpy.ndarray
+        Shape (n_rows, n_features); rows without valid stored contributions
+        (not in the store, changed features, or a retrained model) are NaN.
+    """
+    values = np.full((len(df), len(features)), np.nan)
+    if (
+        store is None
+        or "cdscode" not in df.columns
+        or meta.get("model_hash") != current_model_hash
+        or set(meta.get("features", [])) != set(features)
+    ):
+        return values
+    # positions rather than reindex: a missing school would turn the uint64
+    # hashes into floats
+    pos = store.index.get_indexer(df["cdscode"].astype(str))
+    found = pos >= 0
+    hashes = store["row_hash"].to_numpy()[pos[found]]
+    valid = np.flatnonzero(found)[hashes == row_hashes(df, meta["features"])[found]]
+    values[valid] = store[features].to_numpy(dtype=np.float64)[pos[valid]]
+    return values
+
+
+def main(argv=None):
+    from utils.registry import MODEL_PATH, load_model, load_school_data
+
+    parser = argparse.ArgumentParser(description="Precompute per-school SHAP contributions.")
+    parser.add_argument("--force", action="store_true", help="recompute every school")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    counts = build_store(load_school_data(), load_model(), MODEL_PATH, force=args.force)
+    print(
+        f"✅ {counts['computed']:,} schools computed, {counts['reused']:,} reused "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
+    print(f"[saved] {EXPLANATIONS_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -45,6 +45,19 @@ all_features = (
     + support_features
 )
 
+# Features a school can act on (used by the counterfactual search); the rest
+# describe the student population or cohort and are held fixed
+actionable_features = [
+    "chronicabsenteeismrate",
+    "unexcused_absences_percent",
+    "still_enrolled_rate",
+    "met_uccsu_grad_reqs_rate",
+    "stu_psv_ratio",
+    "stu_adm_ratio",
+    "stu_tch_ratio",
+    "pct_experienced",
+]
+
 # --- Slider Settings --------------------------------------------------------
 
 
@@ -0,0 +1,187 @@
+"""
+Individual conditional expectation (ICE) curves for the slider features.
+
+For the current inputs, an ICE curve shows how the risk probability changes
+as one feature sweeps its full ``slider_settings`` range while the others
+stay put. All curves are built as one batched prediction matrix (features ×
+grid points rows) and scored in a single compiled-forest call instead of
+hundreds of one-row ``predict_proba`` calls.
+
+A feature's curve depends only on the *other* features, so curves are cached
+per feature on the quantized values of the rest. Moving one slider reuses
+that slider's own curve and recomputes only the curves it affects.
+"""
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+from utils.feature_config import get_slider_step, slider_settings
+from utils.prediction_cache import QuantizedLRUCache
+
+
+def feature_grid(feature, n_points=25):
+    """
+    Evenly spaced values over a feature's slider range (integers for integer
+    sliders).
+    """
+    s = slider_settings[feature]
+    grid = np.linspace(s["min"], s["max"], n_points)
+    if not isinstance(s["default"], float):
+        grid = np.unique(np.round(grid))
+    return grid
+
+
+def build_grid_matrix(base, grids):
+    """
+    Stack the ICE rows for one input vector.
+
+    Parameters
+    ----------
+    base : numpy.ndarray
+        Input vector in model order, shape (n_features,).
+    grids : dict
+        {feature position: grid values}.
+
+    Returns
+    -------
+    X : numpy.ndarray
+        One row per (feature, grid point): ``base`` with that feature set to
+        the grid value.
+    slices : dict
+        {feature position: slice of X rows holding its curve}.
+    """
+    sizes = [len(g) for g in grids.values()]
+    X = np.repeat(np.asarray(base, dtype=np.float64)[None, :], sum(sizes), axis=0)
+    slices, start = {}, 0
+    for (j, grid), size in zip(grids.items(), sizes):
+        X[start:start + size, j] = grid
+        slices[j] = slice(start, start + size)
+        start += size
+    return X, slices
+
+
+class IceEngine:
+    """
+    Cached ICE curves for a compiled model.
+
+    Parameters
+    ----------
+    engine : utils.inference.CompiledForest
+        Compiled EWS model.
+    n_points : int, optional
+        Grid points per feature. Defaults to 25.
+    maxsize : int, optional
+        Curves kept in the LRU cache. Defaults to 4096.
+    """
+
+    def __init__(self, engine, n_points=25, maxsize=4096):
+        self.engine = engine
+        self.features = list(engine.feature_names)
+        self.grids = {
+            j: feature_grid(f, n_points)
+            for j, f in enumerate(self.features)
+            if f in slider_settings
+        }
+        steps = [get_slider_step(f) if f in slider_settings else None for f in self.features]
+        self.cache = QuantizedLRUCache(steps, maxsize=maxsize)
+
+    def curves(self, values):
+        """
+        ICE curves for one input vector.
+
+        Parameters
+        ----------
+        values : list of float
+            Feature values in model order.
+
+        Returns
+        -------
+        dict
+            {feature: (grid values, risk probabilities)} for every slider
+            feature.
+        """
+        key = self.cache.key(values)
+        curves, missing = {}, {}
+        for j, grid in self.grids.items():
+            # curve of feature j does not depend on feature j's own value
+            curve_key = (j,) + key[:j] + key[j + 1:]
+            found, probs = self.cache.lookup(curve_key)
+            if found:
+                curves[self.features[j]] = (grid, probs)
+            else:
+                missing[j] = curve_key
+
+        if missing:
+            X, slices = build_grid_matrix(values, {j: self.grids[j] for j in missing})
+            probs = self.engine.predict_proba(X)[:, 1]
+            for j, curve_key in missing.items():
+                self.cache.store(curve_key, probs[slices[j]])
+                curves[self.features[j]] = (self.grids[j], probs[slices[j]])
+
+        return curves
+
+
+def ice_surface(engine, X, n_points=25, chunk_rows=20_000):
+    """
+    ICE curves for many schools at once (schools × features × grid points).
+
+    Parameters
+    ----------
+    engine : utils.inference.CompiledForest
+        Compiled EWS model.
+    X : pandas.DataFrame or array-like
+        School inputs.
+    n_points : int, optional
+        Grid points per feature. Defaults to 25.
+    chunk_rows : int, optional
+        Grid rows built and scored at a time, which bounds memory. Each
+        chunk covers whole schools, so it is at least one school's grid.
+        Defaults to 20,000.
+
+    Returns
+    -------
+    dict
+        {feature: (grid values, probabilities of shape (n_schools, n_grid))}.
+        Averaging the probabilities over schools gives the partial dependence.
+    """
+    X = engine.to_array(X)
+    n = len(X)
+    out = {}
+    for j, feature in enumerate(engine.feature_names):
+        if feature not in slider_settings:
+            continue
+        grid = feature_grid(feature, n_points)
+        probs = np.empty((n, len(grid)))
+        # the grid matrix is built per chunk of schools, never for all of them
+        step = max(1, chunk_rows // len(grid))
+        for i in range(0, n, step):
+            block = X[i:i + step]
+            # rows ordered school-major: school s, grid point k -> s * len(grid) + k
+            rows = np.repeat(block, len(grid), axis=0)
+            rows[:, j] = np.tile(grid, len(block))
+            probs[i:i + step] = engine.predict_proba(rows)[:, 1].reshape(len(block), len(grid))
+        out[feature] = (grid, probs)
+    return out
+
+
+def ice_chart(grid, probs, current_value, height=90):
+    """
+    Small line chart of one ICE curve with the current value marked.
+    """
+    curve = pd.DataFrame({"value": grid, "risk": np.asarray(probs) * 100})
+    line = (
+        alt.Chart(curve)
+        .mark_line()
+        .encode(
+            x=alt.X("value:Q", title=None),
+            y=alt.Y("risk:Q", title="Risk %", scale=alt.Scale(domain=[0, 100])),
+            tooltip=[alt.Tooltip("value:Q", format=".2f"), alt.Tooltip("risk:Q", format=".1f")],
+        )
+    )
+    marker = (
+        alt.Chart(pd.DataFrame({"value": [current_value]}))
+        .mark_rule(color="#d62728", strokeDash=[4, 2])
+        .encode(x="value:Q")
+    )
+    return (line + marker).properties(height=height)
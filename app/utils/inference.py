@@ -0,0 +1,472 @@
+"""
+Array-compiled Random Forest inference.
+
+``model.predict`` followed by ``model.predict_proba`` on a one-row DataFrame
+runs two full sklearn passes over all 400 trees (each with input validation
+and per-tree dispatch). ``CompiledForest`` flattens every tree of the trained
+forest into a handful of NumPy arrays once, then scores one row or a whole
+batch with a single vectorized traversal that advances all trees one level at
+a time. Labels and probabilities come out of the same pass and match
+sklearn's ``predict`` / ``predict_proba``.
+
+Usage:
+
+    from utils.registry import load_compiled_model
+
+    engine = load_compiled_model()
+    labels, proba = engine.predict(input_df)
+    probability = proba[0, 1]
+"""
+
+import numpy as np
+import pandas as pd
+
+# levels stepped for every (row, tree) pair before batch traversal switches to
+# stepping only the paths that have not reached a leaf yet
+DENSE_LEVELS = 5
+
+
+class CompiledForest:
+    """
+    A fitted sklearn forest classifier compiled into flat NumPy arrays.
+
+    Nodes of every tree are renumbered breadth-first so the two children of a
+    split are adjacent: the next node is ``child[node] + (x > threshold)``.
+    Leaves point to themselves with an infinite threshold (and send missing
+    values left), so a row that reaches a leaf early simply stays there until
+    the deepest tree finishes. Splits can have an infinite threshold too:
+    sklearn uses one to separate missing from present values.
+
+    Attributes
+    ----------
+    feature_names : list of str
+        Columns the model was trained on, in training order.
+    classes_ : numpy.ndarray
+        Class labels, as in the sklearn model.
+    feature : numpy.ndarray
+        Split feature index per node (0 for leaves).
+    threshold : numpy.ndarray
+        Split threshold per node (+inf for leaves).
+    child : numpy.ndarray
+        Index of the left child per node (the right child is ``child + 1``);
+        leaves point to themselves.
+    missing_left : numpy.ndarray
+        True where rows with a missing value go to the left child (always
+        True for leaves).
+    value : numpy.ndarray
+        Class fractions per node, shape (n_nodes, n_classes).
+    roots : numpy.ndarray
+        Root node index of each tree.
+    is_leaf : numpy.ndarray
+        True for leaf nodes.
+    max_depth : int
+        Depth of the deepest tree (number of traversal steps).
+    """
+
+    def __init__(
+        self,
+        feature,
+        threshold,
+        child,
+        missing_left,
+        value,
+        roots,
+        max_depth,
+        classes,
+        feature_names,
+    ):
+        self.feature = feature
+        self.threshold = threshold
+        self.child = child
+        self.missing_left = missing_left
+        self.value = value
+        self._class_value = [np.ascontiguousarray(value[:, c]) for c in range(value.shape[1])]
+        self.roots = roots
+        self.is_leaf = child == np.arange(len(child))
+        self.max_depth = int(max_depth)
+        self.classes_ = np.asarray(classes)
+        self.feature_names = list(feature_names)
+        self.n_features = len(self.feature_names)
+        self.n_trees = len(roots)
+
+    @classmethod
+    def from_sklearn(cls, model, feature_names=None):
+        """
+        Compile a fitted ``RandomForestClassifier`` (or any forest of
+        ``DecisionTreeClassifier`` estimators).
+
+        Parameters
+        ----------
+        model : sklearn.ensemble.RandomForestClassifier
+            Fitted forest.
+        feature_names : list of str, optional
+            Column order of the model input. Defaults to
+            ``model.feature_names_in_``.
+
+        Returns
+        -------
+        CompiledForest
+        """
+        if feature_names is None:
+            feature_names = getattr(model, "feature_names_in_", None)
+            if feature_names is None:
+                feature_names = [f"x{i}" for i in range(model.n_features_in_)]
+
+        features, thresholds, children, missing, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for est in model.estimators_:
+            tree = est.tree_
+            left, right = tree.children_left, tree.children_right
+
+            # breadth-first order with each split's children next to each other
+            order = [0]
+            for node in order:
+                if left[node] != -1:
+                    order.extend((left[node], right[node]))
+            order = np.asarray(order)
+            new_id = np.empty(len(order), dtype=np.intp)
+            new_id[order] = np.arange(len(order)) + offset
+
+            is_leaf = left[order] == -1
+            child = np.where(is_leaf, new_id[order], new_id[np.where(is_leaf, 0, left[order])])
+
+            value = tree.value[order, 0, :].astype(np.float64)
+            value /= value.sum(axis=1, keepdims=True)
+
+            go_left = getattr(tree, "missing_go_to_left", None)
+            go_left = (
+                np.ones(len(order), dtype=bool)
+                if go_left is None
+                else go_left[order].astype(bool)
+            )
+            # a missing value at a leaf must not move the row
+            go_left |= is_leaf
+
+            features.append(np.where(is_leaf, 0, tree.feature[order]))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold[order]))
+            children.append(child)
+            missing.append(go_left)
+            values.append(value)
+            roots.append(offset)
+
+            offset += len(order)
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds),
+            child=np.concatenate(children).astype(np.intp),
+            missing_left=np.concatenate(missing),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max_depth,
+            classes=model.classes_,
+            feature_names=feature_names,
+        )
+
+    # --- Input handling ------------------------------------------------------
+
+    def to_array(self, X):
+        """
+        Convert model input to a float array in training column order.
+
+        Parameters
+        ----------
+        X : pandas.DataFrame, pandas.Series, dict, or array-like
+            DataFrames, Series (one row) and dicts are matched by feature name
+            (extra columns are ignored); arrays must already be in training
+            column order.
+
+        Returns
+        -------
+        numpy.ndarray
+            Array of shape (n_rows, n_features).
+
+        Raises
+        ------
+        KeyError
+            If a DataFrame or dict is missing a model feature.
+        ValueError
+            If an array has the wrong number of columns.
+        """
+        if isinstance(X, pd.Series):
+            X = X.to_dict()
+
+        if isinstance(X, (dict, pd.DataFrame)):
+            missing = [f for f in self.feature_names if f not in X]
+            if missing:
+                raise KeyError(f"Input is missing model features: {missing}")
+
+        if isinstance(X, dict):
+            X = np.column_stack(
+                [np.atleast_1d(np.asarray(X[f], dtype=np.float64)) for f in self.feature_names]
+            )
+        elif isinstance(X, pd.DataFrame):
+            # column selection costs more than scoring a row; skip it if possible
+            if list(X.columns) != self.feature_names:
+                X = X[self.feature_names]
+            X = X.to_numpy(dtype=np.float64)
+
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        if X.shape[1] != self.n_features:
+            raise ValueError(
+                f"Expected {self.n_features} features, got {X.shape[1]}."
+            )
+        # sklearn trees compare float32 inputs against their thresholds
+        return X.astype(np.float32).astype(np.float64)
+
+    # --- Traversal -----------------------------------------------------------
+
+    def apply(self, X):
+        """
+        Return the leaf reached in every tree, shape (n_rows, n_trees).
+
+        Leaf indices refer to the compiled node arrays (not sklearn's
+        per-tree node ids).
+        """
+        X = self.to_array(X)
+        n = len(X)
+        flat = X.ravel()
+
+        if n == 1 and not np.isnan(flat).any():
+            # single row (slider moves): 1-D traversal, no row offsets
+            node = self.roots
+            for _ in range(self.max_depth):
+                node = self.child[node] + (flat[self.feature[node]] > self.threshold[node])
+            return node[None, :]
+
+        row_offset = (np.arange(n, dtype=np.intp) * self.n_features)[:, None]
+        node = np.broadcast_to(self.roots, (n, self.n_trees))
+        has_nan = np.isnan(flat).any()
+        dense = min(self.max_depth, DENSE_LEVELS)
+        for _ in range(dense):
+            node = self._step(flat, row_offset, node, has_nan)
+        if dense == self.max_depth:
+            return node
+
+        # below the top levels most (row, tree) pairs already sit on a leaf:
+        # keep stepping only the ones that have not, so the deep levels cost
+        # in proportion to the paths still descending rather than n * trees
+        node = node.ravel()
+        active = np.flatnonzero(~self.is_leaf[node])
+        current = node[active]
+        offset = active // self.n_trees * self.n_features
+        for _ in range(self.max_depth - dense):
+            if not len(active):
+                break
+            current = self._step(flat, offset, current, has_nan)
+            node[active] = current
+            descending = ~self.is_leaf[current]
+            active, current, offset = active[descending], current[descending], offset[descending]
+        return node.reshape(n, self.n_trees)
+
+    def _step(self, flat, row_offset, node, has_nan):
+        """
+        Advance every (row, tree) one level down; leaves stay where they are.
+        """
+        x = flat[row_offset + self.feature[node]]
+        thr = self.threshold[node]
+        if not has_nan:
+            return self.child[node] + (x > thr)
+        # leaves never move: x > inf is False and they send missing values left
+        go_right = np.where(np.isnan(x), ~self.missing_left[node], x > thr)
+        return self.child[node] + go_right
+
+    def contributions(self, X, class_index=1):
+        """
+        Per-feature contributions to the predicted probability (Saabas
+        path attribution).
+
+        Each split a row passes through moves the tree's estimate from the
+        parent's class fraction to the child's; that change is credited to
+        the split feature and averaged over trees.
+
+        Parameters
+        ----------
+        X : pandas.DataFrame, dict, or array-like
+            Rows to explain.
+        class_index : int, optional
+            Column of ``classes_`` to explain. Defaults to 1 (at risk).
+
+        Returns
+        -------
+        bias : float
+            Forest average of the root class fractions (the prediction before
+            any split).
+        contrib : numpy.ndarray
+            Shape (n_rows, n_features); ``bias + contrib.sum(axis=1)`` equals
+            ``predict_proba(X)[:, class_index]``.
+        """
+        X = self.to_array(X)
+        n = len(X)
+        flat = X.ravel()
+        row_offset = (np.arange(n, dtype=np.intp) * self.n_features)[:, None]
+        node = np.broadcast_to(self.roots, (n, self.n_trees))
+        has_nan = np.isnan(flat).any()
+        value = self.value[:, class_index]
+
+        contrib = np.zeros(n * self.n_features)
+        for _ in range(self.max_depth):
+            nxt = self._step(flat, row_offset, node, has_nan)
+            # leaves map to themselves, so they add zero
+            contrib += np.bincount(
+                (row_offset + self.feature[node]).ravel(),
+                weights=(value[nxt] - value[node]).ravel(),
+                minlength=n * self.n_features,
+            )
+            node = nxt
+
+        bias = float(value[self.roots].mean())
+        return bias, contrib.reshape(n, self.n_features) / self.n_trees
+
+    def tree_proba(self, X):
+        """
+        Per-tree class probabilities, shape (n_rows, n_trees, n_classes).
+        """
+        return self.value[self.apply(X)]
+
+    def predict_proba(self, X):
+        """
+        Class probabilities, shape (n_rows, n_classes), as in sklearn.
+        """
+        leaves = self.apply(X)
+        # one class column at a time: gathering a single contiguous column is
+        # much cheaper than pulling (rows, trees, classes) and reducing it
+        return np.column_stack(
+            [self._class_value[c][leaves].mean(axis=1) for c in range(len(self.classes_))]
+        )
+
+    def predict_with_uncertainty(self, X, interval=(5, 95), class_index=1):
+        """
+        Score rows and measure how much the trees disagree, in one pass.
+
+        The averaged probability hides whether the trees agree (most near the
+        same value) or split (some near 0, some near 1). Every tree's
+        probability is already gathered to form the average, so the spread
+        costs only a few reductions over the same (rows, trees) arrays.
+
+        Parameters
+        ----------
+        X : pandas.DataFrame, dict, or array-like
+            One or more rows of model input.
+        interval : tuple of float, optional
+            Lower and upper percentiles of the per-tree probabilities.
+            Defaults to (5, 95).
+        class_index : int, optional
+            Class whose probability spread is measured. Defaults to 1
+            (At Risk).
+
+        Returns
+        -------
+        labels : numpy.ndarray
+            Predicted class per row (same as ``predict``).
+        proba : numpy.ndarray
+            Class probabilities per row (same as ``predict``).
+        spread : dict
+            Arrays per row: 'std' (standard deviation of the per-tree
+            probabilities), 'lower' / 'upper' (the percentile interval
+            across trees) and 'vote_share' (share of trees whose own vote is
+            ``class_index``).
+        """
+        leaves = self.apply(X)
+        per_tree = [value[leaves] for value in self._class_value]
+        proba = np.column_stack([p.mean(axis=1) for p in per_tree])
+        labels = self.classes_[np.argmax(proba, axis=1)]
+
+        target = per_tree[class_index]
+        # a tree votes for the class with its largest fraction (first on ties)
+        votes = np.ones(target.shape, dtype=bool)
+        for k, other in enumerate(per_tree):
+            if k < class_index:
+                votes &= target > other
+            elif k > class_index:
+                votes &= target >= other
+
+        lower, upper = _percentiles(target, interval)
+        spread = {
+            "std": target.std(axis=1),
+            "lower": lower,
+            "upper": upper,
+            "vote_share": votes.mean(axis=1),
+        }
+        return labels, proba, spread
+
+    def predict(self, X):
+        """
+        Score rows in one pass.
+
+        Parameters
+        ----------
+        X : pandas.DataFrame, dict, or array-like
+            One or more rows of model input.
+
+        Returns
+        -------
+        labels : numpy.ndarray
+            Predicted class per row (same as ``model.predict``).
+        proba : numpy.ndarray
+            Class probabilities per row (same as ``model.predict_proba``).
+        """
+        proba = self.predict_proba(X)
+        labels = self.classes_[np.argmax(proba, axis=1)]
+        return labels, proba
+
+
+def _percentiles(a, qs):
+    """
+    Row-wise percentiles (linear interpolation, as ``np.percentile``) from
+    one sort; avoids ``np.percentile``'s per-call overhead on one-row inputs.
+    """
+    a = np.sort(a, axis=1)
+    last = a.shape[1] - 1
+    out = []
+    for q in qs:
+        pos = q / 100 * last
+        lo = int(np.floor(pos))
+        hi = min(lo + 1, last)
+        out.append(a[:, lo] + (a[:, hi] - a[:, lo]) * (pos - lo))
+    return out
+
+
+# share of trees agreeing with the forest's call -> how firm the call is
+AGREEMENT_LEVELS = [(0.8, "High"), (0.65, "Medium"), (0.0, "Low")]
+
+
+def agreement_level(agreement):
+    """
+    'High', 'Medium' or 'Low' for the share of trees agreeing with the call.
+    """
+    return next(level for cutoff, level in AGREEMENT_LEVELS if agreement >= cutoff)
+
+
+def describe_uncertainty(prediction, vote_share, lower, upper, risk_labels=None):
+    """
+    One-line summary of the tree spread behind a prediction.
+
+    Parameters
+    ----------
+    prediction : int
+        Predicted class (1 = At Risk).
+    vote_share : float
+        Share of trees voting At Risk.
+    lower, upper : float
+        Percentile interval of the per-tree risk probabilities.
+
+    Returns
+    -------
+    level : str
+        Agreement level of the trees with the call ('High', 'Medium', 'Low').
+    text : str
+        e.g. '62% of trees vote At Risk · 5th–95th percentile across trees:
+        12.0%–78.5% · Agreement: Low'.
+    """
+    agreement = vote_share if prediction == 1 else 1 - vote_share
+    level = agreement_level(agreement)
+    text = (
+        f"{vote_share * 100:.0f}% of trees vote At Risk · "
+        f"5th–95th percentile across trees: {lower * 100:.1f}%–{upper * 100:.1f}% · "
+        f"Agreement: {level}"
+    )
+    return level, text
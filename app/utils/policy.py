@@ -0,0 +1,285 @@
+"""
+Policy-shift simulation: re-score many schools under one intervention.
+
+A policy is a filter (counties and/or districts; statewide if empty) plus a
+list of feature transforms, e.g. "every school in Fresno County cuts chronic
+absenteeism by 5 points":
+
+    from utils.policy import load_policy_simulator
+
+    sim = load_policy_simulator()
+    result = sim.simulate(
+        [("chronicabsenteeismrate", "add", -5)], counties=["Fresno"]
+    )
+    result["summary"]["flipped_to_on_track"]
+
+Transforms are applied to the whole filtered block of the input matrix at
+once and the block is scored in one compiled-forest call. Schools count as at
+risk above the saved risk cutoff (``registry.load_risk_threshold``). Results are cached
+per (filter, transforms, threshold), so a dashboard comparing many policies
+only pays for the ones it has not seen yet.
+"""
+
+import numpy as np
+import pandas as pd
+
+from utils.batch_scoring import ID_COLS
+from utils.feature_config import slider_settings
+from utils.prediction_cache import QuantizedLRUCache
+from utils.registry import (
+    FINAL_DATASET_PATH,
+    get_artifact,
+    load_baseline_scores,
+    load_compiled_model,
+    load_risk_threshold,
+    load_school_data,
+    threshold_dependencies,
+)
+
+# op -> label shown in the app
+OPERATIONS = {
+    "add": "Add (points)",
+    "multiply": "Multiply by",
+    "clamp": "Clamp to (min, max)",
+}
+
+
+def normalize_transforms(transforms):
+    """
+    Validate transforms and turn them into a hashable, order-preserving key.
+
+    Parameters
+    ----------
+    transforms : list of tuple
+        (feature, op, value) with op in ``OPERATIONS``. For 'clamp', value is
+        a (min, max) pair; either end may be None.
+
+    Returns
+    -------
+    tuple
+        ((feature, op, value), ...) with numeric values as floats.
+    """
+    out = []
+    for feature, op, value in transforms:
+        if feature not in slider_settings:
+            raise KeyError(f"Unknown feature '{feature}'.")
+        if op not in OPERATIONS:
+            raise ValueError(f"Unknown operation '{op}'. Use one of {list(OPERATIONS)}.")
+        if op == "clamp":
+            lo, hi = value
+            value = (None if lo is None else float(lo), None if hi is None else float(hi))
+        else:
+            value = float(value)
+        out.append((feature, op, value))
+    return tuple(out)
+
+
+def normalize_filter(counties=None, districts=None):
+    """
+    Hashable filter key: (sorted counties, sorted districts).
+    """
+    return (tuple(sorted(set(counties or ()))), tuple(sorted(set(districts or ()))))
+
+
+def apply_transforms(X, feature_names, transforms):
+    """
+    Apply transforms to every row of ``X`` (model order) at once.
+
+    Transformed values are kept inside the feature's slider range, widened
+    to include the school's own value, so a policy never pushes a feature
+    past its valid range (e.g. absenteeism below 0%) and never drags an
+    already out-of-range school onto the boundary.
+
+    Returns
+    -------
+    numpy.ndarray
+        A transformed copy of ``X``.
+    """
+    X_new = np.array(X, dtype=np.float64, copy=True)
+    for feature, op, value in transforms:
+        j = feature_names.index(feature)
+        col = X_new[:, j]
+        if op == "add":
+            new = col + value
+        elif op == "multiply":
+            new = col * value
+        else:
+            lo, hi = value
+            new = np.clip(col, -np.inf if lo is None else lo, np.inf if hi is None else hi)
+
+        s = slider_settings[feature]
+        lo = np.minimum(s["min"], X[:, j])
+        hi = np.maximum(s["max"], X[:, j])
+        new = np.clip(new, lo, hi)
+        if not isinstance(s["default"], float):
+            new = np.round(new)
+        X_new[:, j] = new
+    return X_new
+
+
+def _group_summary(schools, by):
+    grouped = schools.groupby(by, sort=True, observed=True)
+    out = pd.DataFrame(
+        {
+            "schools": grouped.size(),
+            "at_risk_before": grouped["at_risk_before"].sum(),
+            "at_risk_after": grouped["at_risk_after"].sum(),
+            "flipped_to_on_track": grouped["flipped_to_on_track"].sum(),
+            "flipped_to_at_risk": grouped["flipped_to_at_risk"].sum(),
+            "mean_delta": grouped["delta"].mean(),
+            "min_delta": grouped["delta"].min(),
+        }
+    )
+    return out.sort_values(["flipped_to_on_track", "mean_delta"], ascending=[False, True])
+
+
+class PolicySimulator:
+    """
+    Cached policy re-scoring over the school table.
+
+    Parameters
+    ----------
+    engine : utils.inference.CompiledForest
+        Compiled EWS model.
+    df : pandas.DataFrame
+        School table with ID columns and model features.
+    baseline : numpy.ndarray
+        Current risk probability of every row of ``df``.
+    maxsize : int, optional
+        Policy results kept in the LRU cache. Defaults to 128.
+    threshold : float, optional
+        Default risk probability above which a school is at risk.
+        Defaults to 0.5.
+    """
+
+    def __init__(self, engine, df, baseline, maxsize=128, threshold=0.5):
+        self.engine = engine
+        self.threshold = float(threshold)
+        self.ids = df[[c for c in ID_COLS if c in df.columns]].reset_index(drop=True)
+        self.X = engine.to_array(df)
+        self.baseline = np.asarray(baseline, dtype=np.float64)
+        # keys here are already hashable policy specs, so no quantization steps
+        self.cache = QuantizedLRUCache([], maxsize=maxsize)
+
+    def counties(self):
+        return sorted(self.ids["county"].dropna().unique())
+
+    def districts(self, counties=None):
+        ids = self.ids if not counties else self.ids[self.ids["county"].isin(counties)]
+        return sorted(ids["district"].dropna().unique())
+
+    def mask(self, counties=None, districts=None):
+        """
+        Boolean row mask for a county/district filter (all rows if empty).
+        """
+        keep = np.ones(len(self.ids), dtype=bool)
+        if counties:
+            keep &= self.ids["county"].isin(counties).to_numpy()
+        if districts:
+            keep &= self.ids["district"].isin(districts).to_numpy()
+        return keep
+
+    def simulate(self, transforms, counties=None, districts=None, threshold=None):
+        """
+        Re-score the filtered schools under a policy.
+
+        Parameters
+        ----------
+        transforms : list of tuple
+            (feature, op, value); see ``normalize_transforms``.
+        counties, districts : list of str, optional
+            Schools to apply the policy to. Statewide if both are empty.
+        threshold : float, optional
+            Risk probability above which a school is at risk. Defaults to
+            the simulator's cutoff.
+
+        Returns
+        -------
+        dict
+            'schools' (per-school before/after, delta and flips), 'by_county'
+            and 'by_district' (aggregates), and 'summary' (totals). Cached
+            results are shared, so treat them as read-only.
+        """
+        threshold = self.threshold if threshold is None else float(threshold)
+        key = (normalize_filter(counties, districts), normalize_transforms(transforms), threshold)
+        found, result = self.cache.lookup(key)
+        if found:
+            return result
+
+        (counties, districts), transforms, _ = key
+        rows = np.flatnonzero(self.mask(counties, districts))
+        before = self.baseline[rows]
+        if transforms and len(rows):
+            X_new = apply_transforms(self.X[rows], self.engine.feature_names, transforms)
+            after = self.engine.predict_proba(X_new)[:, 1]
+        else:
+            after = before.copy()
+
+        schools = self.ids.iloc[rows].reset_index(drop=True)
+        schools["risk_before"] = before
+        schools["risk_after"] = after
+        schools["delta"] = after - before
+        schools["at_risk_before"] = before > threshold
+        schools["at_risk_after"] = after > threshold
+        schools["flipped_to_on_track"] = schools["at_risk_before"] & ~schools["at_risk_after"]
+        schools["flipped_to_at_risk"] = ~schools["at_risk_before"] & schools["at_risk_after"]
+
+        result = {
+            "schools": schools,
+            "by_county": _group_summary(schools, "county"),
+            "by_district": _group_summary(schools, ["county", "district"]),
+            "summary": {
+                "schools": len(rows),
+                "at_risk_before": int(schools["at_risk_before"].sum()),
+                "at_risk_after": int(schools["at_risk_after"].sum()),
+                "flipped_to_on_track": int(schools["flipped_to_on_track"].sum()),
+                "flipped_to_at_risk": int(schools["flipped_to_at_risk"].sum()),
+                "mean_delta": float(schools["delta"].mean()) if len(rows) else 0.0,
+            },
+        }
+        self.cache.store(key, result)
+        return result
+
+    def compare(self, policies, threshold=None):
+        """
+        Summaries of several policies side by side.
+
+        Parameters
+        ----------
+        policies : dict
+            {name: {'transforms': [...], 'counties': [...], 'districts': [...]}}.
+
+        Returns
+        -------
+        pandas.DataFrame
+            One row of ``simulate(...)['summary']`` per policy.
+        """
+        return pd.DataFrame.from_dict(
+            {
+                name: self.simulate(
+                    p["transforms"], p.get("counties"), p.get("districts"), threshold
+                )["summary"]
+                for name, p in policies.items()
+            },
+            orient="index",
+        )
+
+
+def load_policy_simulator(maxsize=128):
+    """
+    Shared policy simulator over the final dataset, at the saved risk
+    cutoff, from the artifact registry. Rebuilt, with an empty result cache,
+    when the model, the cutoff or the dataset changes.
+    """
+    def build(_):
+        return PolicySimulator(
+            load_compiled_model(),
+            load_school_data(),
+            load_baseline_scores()["risk_probability"].to_numpy(),
+            maxsize=maxsize,
+            threshold=load_risk_threshold().threshold,
+        )
+
+    return get_artifact(
+        "policy_simulator", threshold_dependencies() + [FINAL_DATASET_PATH], build
+    )
@@ -0,0 +1,123 @@
+"""
+Size-bounded LRU cache for what-if predictions.
+
+Slider values move in fixed steps (``feature_config.get_slider_step``), so
+users keep revisiting the same positions while exploring a school. The cache
+keys each input vector by its values quantized to those steps, so a repeated
+or revisited slider position returns its prediction without scoring again.
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class QuantizedLRUCache:
+    """
+    LRU cache of scoring results keyed on a quantized feature vector.
+
+    The cache stores whatever ``compute`` returns. School Explorer keeps one
+    instance for predictions, holding ``(probability, spread dict)`` from
+    ``predict_with_uncertainty``. It keeps another for TreeSHAP explanations,
+    holding ``(base value, contributions Series)``.
+
+    Parameters
+    ----------
+    steps : list of float or None
+        Quantization step per feature, in model order. ``None`` keys the
+        feature on its exact value.
+    maxsize : int, optional
+        Entries kept before the least recently used one is evicted.
+        Defaults to 4096.
+
+    Notes
+    -----
+    Inputs within half a step of each other share an entry. Slider inputs
+    always sit on the step grid, so in the app this only matters for raw
+    dataset values, which are scored exactly through the baseline scores.
+    """
+
+    def __init__(self, steps, maxsize=4096):
+        self.steps = list(steps)
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, values):
+        """
+        Quantize a feature vector (model order) to a hashable key.
+        """
+        return tuple(
+            float(v) if step is None else int(round(float(v) / step))
+            for v, step in zip(values, self.steps)
+        )
+
+    def get_or_compute(self, values, compute):
+        """
+        Return the cached result for ``values``, or compute and store it.
+
+        Parameters
+        ----------
+        values : list of float
+            Feature values in model order.
+        compute : callable
+            Zero-argument function returning the result on a miss.
+
+        Returns
+        -------
+        object
+            The cached or freshly computed result.
+        """
+        key = self.key(values)
+        found, result = self.lookup(key)
+        if found:
+            return result
+        result = compute()
+        self.store(key, result)
+        return result
+
+    def lookup(self, key):
+        """
+        Return (True, result) for a cached key, or (False, None), counting
+        the hit or miss.
+        """
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return True, self._data[key]
+            self.misses += 1
+            return False, None
+
+    def store(self, key, result):
+        """
+        Insert a result under an already-quantized key, evicting the least
+        recently used entries beyond ``maxsize``.
+        """
+        with self._lock:
+            self._data[key] = result
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """
+        Return hit/miss/eviction counters, current size and hit rate.
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
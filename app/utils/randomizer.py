@@ -1,20 +1,53 @@
-import random
+import numpy as np
 import streamlit as st
 
-def randomize_feature_values(features, slider_settings, key_prefix=""):
+
+def sample_slider_values(settings, n, rng=None):
+    """
+    Draws ``n`` uniform random values within one feature's slider range.
+
+    Parameters
+    ----------
+    settings : dict
+        Slider settings for the feature (min, max, default).
+
+    n : int
+        Number of values to draw.
+
+    rng : numpy.random.Generator, optional
+        Random generator (a fresh one is used if omitted).
+
+    Returns
+    -------
+    numpy.ndarray
+        Floats rounded to 4 decimals for continuous sliders, integers
+        (inclusive of max) for integer sliders.
+    """
+    rng = rng or np.random.default_rng()
+
+    # Continuous (float) or integer?
+    if isinstance(settings["default"], float):
+        return np.round(rng.uniform(settings["min"], settings["max"], n), 4)
+    return rng.integers(settings["min"], settings["max"], n, endpoint=True)
+
+
+def randomize_feature_values(features, slider_settings, key_prefix="", rng=None):
     """
     Randomizes values for a list of feature names using their slider settings.
-    
+
     Parameters
     ----------
     features : list
         List of feature names to randomize.
-    
+
     slider_settings : dict
         Dictionary containing min, max, default, and label for each feature.
-    
+
     key_prefix : str
         Optional prefix for session_state keys (e.g., "imp_" for importance page).
+
+    rng : numpy.random.Generator, optional
+        Random generator (shared with the scenario simulator's sampling).
     """
     for feature in features:
         s = slider_settings.get(feature)
@@ -22,11 +55,7 @@ def randomize_feature_values(features, slider_settings, key_prefix=""):
         if s is None:
             continue
 
-        # Continuous (float) or integer?
-        if isinstance(s["default"], float):
-            value = round(random.uniform(s["min"], s["max"]), 4)
-        else:
-            value = random.randint(s["min"], s["max"])
+        value = sample_slider_values(s, 1, rng)[0].item()
 
         # Update the associated slider key
         st.session_state[key_prefix + feature] = value
@@ -0,0 +1,290 @@
+"""
+Process-wide registry for the model and dataset artifacts used by the app.
+
+Streamlit re-executes a page script on every widget interaction, so loading
+the model with ``joblib.load`` at the top of a page deserializes it again on
+every slider drag, for every user. The registry loads each artifact once per
+server process and shares it across pages and sessions. Each artifact is
+reloaded only when its file's modification time or size changes (e.g. after
+re-running notebook 05 or 06).
+
+Objects returned here are shared: treat them as read-only (copy a DataFrame
+before modifying it).
+"""
+
+import os
+import threading
+from pathlib import Path
+
+import joblib
+import pandas as pd
+
+from utils.explanations import EXPLANATIONS_PATH, make_explainer, model_hash, read_store
+from utils.feature_config import get_slider_step, slider_settings
+from utils.ice import IceEngine
+from utils.inference import CompiledForest
+from utils.paths import get_paths
+from utils.prediction_cache import QuantizedLRUCache
+from utils.school_index import SchoolIndex
+from utils.thresholds import RiskThreshold, read_threshold
+
+paths = get_paths()
+MODELS_DIR = paths["MODELS_DIR"]
+DATA_DIR = paths["DATA_DIR"]
+
+# EWS_MODEL_PATH serves another forest, e.g. a compacted one from
+# code_library/model_compaction.py
+MODEL_PATH = Path(os.environ.get("EWS_MODEL_PATH", MODELS_DIR / "random_forest_ews.pkl"))
+FEATURE_PATH = MODELS_DIR / "top_features.pkl"
+FINAL_DATASET_PATH = DATA_DIR / "06_top15_features_w_ids_and_target.pkl"
+# risk cutoff and calibration from code_library/thresholds.py (optional)
+RISK_THRESHOLD_PATH = MODELS_DIR / "risk_threshold.pkl"
+
+# name -> (file signature, loaded object)
+_entries = {}
+# name -> lock, so a slow load only blocks callers waiting on the same artifact
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _signature(path):
+    """
+    Cheap change detector for a file: (mtime in ns, size in bytes).
+
+    For a list/tuple of files (derived artifacts), the signatures of all of
+    them.
+    """
+    if isinstance(path, (list, tuple)):
+        return tuple(_signature(p) for p in path)
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _lock_for(name):
+    with _locks_guard:
+        return _locks.setdefault(name, threading.Lock())
+
+
+def get_artifact(name, path, loader):
+    """
+    Return a registered artifact, loading it only if missing or changed.
+
+    Parameters
+    ----------
+    name : str
+        Registry key (e.g. 'model').
+    path : pathlib.Path or list of pathlib.Path
+        File the artifact is loaded from (or every file a derived artifact
+        depends on). Their mtime/size decide when the cached object is stale.
+    loader : callable
+        Function taking ``path`` and returning the loaded object.
+
+    Returns
+    -------
+    object
+        The shared, loaded artifact.
+    """
+    signature = _signature(path)
+
+    entry = _entries.get(name)
+    if entry is not None and entry[0] == signature:
+        return entry[1]
+
+    with _lock_for(name):
+        # another thread may have loaded it while we waited
+        entry = _entries.get(name)
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+
+        value = loader(path)
+        _entries[name] = (signature, value)
+        return value
+
+
+def clear_registry():
+    """
+    Drop every loaded artifact (they are reloaded on next access).
+    """
+    _entries.clear()
+
+
+def registry_info():
+    """
+    Return {name: file signature} for the artifacts currently loaded.
+    """
+    return {name: entry[0] for name, entry in _entries.items()}
+
+
+# --- Accessors ---------------------------------------------------------------
+
+
+def load_model():
+    """
+    Trained Random Forest EWS model (``models/random_forest_ews.pkl``).
+    """
+    return get_artifact("model", MODEL_PATH, joblib.load)
+
+
+def load_top_features():
+    """
+    Top 15 features in model importance order (``models/top_features.pkl``).
+    """
+    return get_artifact("top_features", FEATURE_PATH, joblib.load)
+
+
+def load_school_data():
+    """
+    Final school dataset with IDs, top 15 features and target (notebook 06).
+    """
+    return get_artifact("school_data", FINAL_DATASET_PATH, pd.read_pickle)
+
+
+def load_compiled_model():
+    """
+    The EWS model compiled to flat arrays for fast scoring (see
+    ``utils.inference.CompiledForest``). Recompiled when the model file changes.
+    """
+    return get_artifact(
+        "compiled_model",
+        MODEL_PATH,
+        lambda path: CompiledForest.from_sklearn(load_model()),
+    )
+
+
+def threshold_dependencies():
+    """
+    The model file plus the saved risk cutoff, when there is one: artifacts
+    that classify schools are rebuilt when either changes.
+    """
+    return [MODEL_PATH] + ([RISK_THRESHOLD_PATH] if RISK_THRESHOLD_PATH.exists() else [])
+
+
+def load_risk_threshold():
+    """
+    At-risk cutoff and calibration (see ``utils.thresholds``).
+
+    Returns
+    -------
+    utils.thresholds.RiskThreshold
+        The saved cutoff, or the model's 0.5 rule until
+        ``code_library/thresholds.py`` has been run for the current model.
+    """
+    if not RISK_THRESHOLD_PATH.exists():
+        return RiskThreshold()
+    return get_artifact(
+        "risk_threshold",
+        threshold_dependencies(),
+        lambda paths: read_threshold(RISK_THRESHOLD_PATH, load_model_hash()),
+    )
+
+
+def load_baseline_scores():
+    """
+    Model predictions for every school in the final dataset, computed once
+    per model/dataset/cutoff version.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Indexed like ``load_school_data()``, with 'risk_probability',
+        'calibrated_probability', 'prediction' (at the saved cutoff) and the
+        spread across trees ('risk_std', 'risk_p05', 'risk_p95',
+        'vote_share').
+    """
+    def score(_):
+        df = load_school_data()
+        risk = load_risk_threshold()
+        _, proba, spread = load_compiled_model().predict_with_uncertainty(df)
+        return pd.DataFrame(
+            {
+                "risk_probability": proba[:, 1],
+                "calibrated_probability": risk.calibrate(proba[:, 1]),
+                "prediction": risk.classify(proba[:, 1]),
+                "risk_std": spread["std"],
+                "risk_p05": spread["lower"],
+                "risk_p95": spread["upper"],
+                "vote_share": spread["vote_share"],
+            },
+            index=df.index,
+        )
+
+    return get_artifact(
+        "baseline_scores", threshold_dependencies() + [FINAL_DATASET_PATH], score
+    )
+
+
+def load_prediction_cache(maxsize=4096):
+    """
+    Shared what-if prediction cache (see ``utils.prediction_cache``).
+
+    A fresh, empty cache is created whenever the model file changes, so
+    cached probabilities never outlive the model that produced them.
+    """
+    return get_artifact(
+        "prediction_cache", MODEL_PATH, lambda path: _slider_cache(maxsize)
+    )
+
+
+def _slider_cache(maxsize):
+    engine = load_compiled_model()
+    steps = [get_slider_step(f) if f in slider_settings else None for f in engine.feature_names]
+    return QuantizedLRUCache(steps, maxsize=maxsize)
+
+
+def load_school_index():
+    """
+    cdscode lookup and search index over the final dataset (see
+    ``utils.school_index.SchoolIndex``).
+    """
+    return get_artifact(
+        "school_index",
+        FINAL_DATASET_PATH,
+        lambda path: SchoolIndex(load_school_data()),
+    )
+
+
+def load_model_hash():
+    """
+    SHA-256 of the model file (hashed once per model version).
+    """
+    return get_artifact("model_hash", MODEL_PATH, model_hash)
+
+
+def load_explanations():
+    """
+    Precomputed per-school SHAP contributions (see ``utils.explanations``).
+
+    Returns
+    -------
+    (pandas.DataFrame or None, dict)
+        Store indexed by cdscode and its metadata; ``(None, {})`` until
+        ``python -m utils.explanations`` has been run.
+    """
+    if not EXPLANATIONS_PATH.exists():
+        return None, {}
+    return get_artifact("explanations", EXPLANATIONS_PATH, read_store)
+
+
+def load_explainer():
+    """
+    TreeSHAP explainer for on-demand contributions of slider-modified inputs.
+    """
+    return get_artifact("explainer", MODEL_PATH, lambda path: make_explainer(load_model()))
+
+
+def load_explanation_cache(maxsize=1024):
+    """
+    Shared cache of on-demand SHAP contributions, keyed like the prediction
+    cache and reset when the model changes.
+    """
+    return get_artifact(
+        "explanation_cache", MODEL_PATH, lambda path: _slider_cache(maxsize)
+    )
+
+
+def load_ice_engine():
+    """
+    Cached ICE curve builder for the slider features (see ``utils.ice``),
+    rebuilt with an empty cache when the model changes.
+    """
+    return get_artifact("ice_engine", MODEL_PATH, lambda path: IceEngine(load_compiled_model()))
@@ -0,0 +1,199 @@
+"""
+Monte-Carlo scenario simulation.
+
+Instead of one random draw per click (``randomizer.randomize_feature_values``),
+scenario mode draws tens of thousands of input vectors, scores them with the
+compiled forest's array path, and summarizes the resulting risk
+distribution and how sensitive risk is to each feature.
+
+Samples come either from the slider ranges (uniform, same sampling as the
+randomizer) or from the empirical distribution of the 06 dataset (whole
+school rows resampled, so correlations between features are kept). Samples
+are drawn and scored in chunks and only running summaries are kept, so
+memory stays flat however many scenarios are run.
+"""
+
+import time
+
+import numpy as np
+
+from utils.feature_config import slider_settings
+from utils.randomizer import sample_slider_values
+
+MODES = ["uniform", "empirical"]
+
+
+def sample_uniform(feature_names, n, rng):
+    """
+    ``n`` input vectors drawn uniformly within each feature's slider range.
+    """
+    return np.column_stack(
+        [sample_slider_values(slider_settings[f], n, rng) for f in feature_names]
+    ).astype(np.float64)
+
+
+def sample_empirical(X_data, n, rng):
+    """
+    ``n`` rows resampled (with replacement) from the dataset's input matrix.
+    """
+    return X_data[rng.integers(0, len(X_data), n)]
+
+
+class ScenarioSummary:
+    """
+    Running summary of scored scenarios (constant memory).
+
+    Keeps a probability histogram, the at-risk count, and per-feature binned
+    sums used for sensitivity: the mean risk in each of ``n_bins`` bins across
+    the feature's slider range, plus sums for the feature/risk correlation.
+    """
+
+    def __init__(self, feature_names, threshold=0.5, n_hist=50, n_bins=10):
+        self.features = list(feature_names)
+        self.threshold = threshold
+        # the threshold is a bin edge, so every bin is wholly at risk or not
+        edges = np.linspace(0, 1, n_hist + 1)
+        self.hist_edges = np.union1d(edges[~np.isclose(edges, threshold)], [threshold])
+        self.hist = np.zeros(len(self.hist_edges) - 1, dtype=np.int64)
+        self.n = 0
+        self.at_risk = 0
+        self.sum_p = 0.0
+
+        self.n_bins = n_bins
+        k = len(self.features)
+        self.lo = np.array([slider_settings[f]["min"] for f in self.features], dtype=float)
+        self.hi = np.array([slider_settings[f]["max"] for f in self.features], dtype=float)
+        self.bin_count = np.zeros((k, n_bins))
+        self.bin_sum = np.zeros((k, n_bins))
+        self.sx = np.zeros(k)
+        self.sxx = np.zeros(k)
+        self.sxp = np.zeros(k)
+        self.spp = 0.0
+
+    def update(self, X, p):
+        """
+        Add a chunk of inputs ``X`` (model order) and their risk ``p``.
+        """
+        self.n += len(p)
+        self.at_risk += int((p > self.threshold).sum())
+        self.sum_p += float(p.sum())
+        # right-closed bins (start, end], matching the at-risk rule p > threshold
+        idx = np.clip(np.searchsorted(self.hist_edges, p, side="left") - 1, 0, len(self.hist) - 1)
+        self.hist += np.bincount(idx, minlength=len(self.hist))
+
+        self.sx += X.sum(axis=0)
+        self.sxx += (X ** 2).sum(axis=0)
+        self.sxp += X.T @ p
+        self.spp += float(p @ p)
+
+        span = np.where(self.hi > self.lo, self.hi - self.lo, 1.0)
+        bins = np.clip(((X - self.lo) / span * self.n_bins).astype(int), 0, self.n_bins - 1)
+        for j in range(len(self.features)):
+            self.bin_count[j] += np.bincount(bins[:, j], minlength=self.n_bins)
+            self.bin_sum[j] += np.bincount(bins[:, j], weights=p, minlength=self.n_bins)
+
+    def histogram(self):
+        """
+        Risk distribution as (bin start, bin end, count, at risk) arrays.
+
+        Bins are right-closed and split at the threshold, so the counts of the
+        at-risk bins add up to the at-risk count.
+        """
+        start, end = self.hist_edges[:-1], self.hist_edges[1:]
+        return start, end, self.hist, start >= self.threshold
+
+    def sensitivity(self):
+        """
+        Per-feature sensitivity of risk.
+
+        Returns
+        -------
+        dict
+            {feature: {'swing': max - min mean risk across the feature's bins,
+            'correlation': Pearson correlation of feature and risk,
+            'bin_means': mean risk per bin}}
+        """
+        n = max(self.n, 1)
+        mean_p = self.sum_p / n
+        var_p = self.spp / n - mean_p ** 2
+        mean_x = self.sx / n
+        var_x = self.sxx / n - mean_x ** 2
+        cov = self.sxp / n - mean_x * mean_p
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = cov / np.sqrt(var_x * var_p)
+            bin_means = self.bin_sum / self.bin_count
+
+        out = {}
+        for j, f in enumerate(self.features):
+            means = bin_means[j]
+            filled = means[~np.isnan(means)]
+            out[f] = {
+                "swing": float(filled.max() - filled.min()) if filled.size else 0.0,
+                "correlation": float(np.nan_to_num(corr[j])),
+                "bin_means": means,
+            }
+        return out
+
+    def stats(self):
+        n = max(self.n, 1)
+        return {
+            "samples": self.n,
+            "mean_risk": self.sum_p / n,
+            "at_risk_share": self.at_risk / n,
+        }
+
+
+def run_scenarios(
+    engine,
+    n_samples=20_000,
+    mode="uniform",
+    X_data=None,
+    seed=None,
+    chunk_size=5_000,
+    threshold=0.5,
+):
+    """
+    Draw and score ``n_samples`` scenarios in chunks.
+
+    Parameters
+    ----------
+    engine : utils.inference.CompiledForest
+        Compiled EWS model (array path; no DataFrames are built).
+    n_samples : int, optional
+        Scenarios to draw. Defaults to 20,000.
+    mode : {'uniform', 'empirical'}, optional
+        Sample from the slider ranges or resample rows of ``X_data``.
+    X_data : numpy.ndarray, optional
+        Dataset inputs in model order (required for 'empirical').
+    seed : int, optional
+        Random seed for reproducible runs.
+    chunk_size : int, optional
+        Scenarios drawn and scored at a time. Defaults to 5,000.
+    threshold : float, optional
+        Risk probability above which a scenario counts as at risk.
+
+    Returns
+    -------
+    summary : ScenarioSummary
+    elapsed : float
+        Seconds spent sampling and scoring.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode '{mode}'. Use one of {MODES}.")
+    if mode == "empirical" and X_data is None:
+        raise ValueError("Empirical mode needs the dataset inputs (X_data).")
+
+    start = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    summary = ScenarioSummary(engine.feature_names, threshold=threshold)
+
+    for done in range(0, n_samples, chunk_size):
+        n = min(chunk_size, n_samples - done)
+        if mode == "uniform":
+            X = sample_uniform(engine.feature_names, n, rng)
+        else:
+            X = sample_empirical(X_data, n, rng)
+        p = engine.predict_proba(X)[:, 1]
+        summary.update(X, p)
+
+    return summary, time.perf_counter() - start
@@ -0,0 +1,150 @@
+"""
+Lookup and search index for schools in the final dataset.
+
+School names are not unique statewide (about 60 names repeat across
+districts), so the index is keyed by ``cdscode``. It gives O(1) row retrieval
+by code and a type-ahead search over school, district and county names:
+word-prefix matches come from a sorted token list with ``bisect``, and typos
+fall back to ``difflib`` fuzzy matching.
+"""
+
+import bisect
+import difflib
+import re
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _normalize(text):
+    return " ".join(_WORD.findall(str(text).lower()))
+
+
+class SchoolIndex:
+    """
+    Prebuilt cdscode index plus prefix/fuzzy search.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        School table with 'cdscode', 'school', 'district' and 'county'.
+        Kept by reference and not modified.
+
+    Attributes
+    ----------
+    codes : list of str
+        All cdscodes, ordered by school name, district and county (selector
+        order).
+    """
+
+    SEARCH_COLS = ["school", "district", "county"]
+
+    def __init__(self, df):
+        self.df = df
+        codes = df["cdscode"].astype(str).tolist()
+        self._pos = {code: i for i, code in enumerate(codes)}
+
+        labels = {}
+        for code, school, district, county in zip(
+            codes, df["school"], df["district"], df["county"]
+        ):
+            labels[code] = f"{school} — {district} ({county})"
+        self._labels = labels
+
+        self.codes = sorted(
+            codes,
+            key=lambda c: tuple(str(df[col].iat[self._pos[c]]).lower() for col in self.SEARCH_COLS),
+        )
+        self._rank = {code: i for i, code in enumerate(self.codes)}
+
+        # (token, field priority, code) sorted for bisect prefix search;
+        # full normalized names are included so multi-word prefixes match too
+        entries = set()
+        self._names = {}
+        for priority, col in enumerate(self.SEARCH_COLS):
+            for code, value in zip(codes, df[col]):
+                name = _normalize(value)
+                self._names.setdefault(name, set()).add(code)
+                entries.add((name, priority, code))
+                for token in name.split():
+                    entries.add((token, priority, code))
+        self._tokens = sorted(entries)
+        self._keys = [t[0] for t in self._tokens]
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __contains__(self, cdscode):
+        return str(cdscode) in self._pos
+
+    def row(self, cdscode):
+        """
+        Return the dataset row (a Series, labelled with its original index)
+        for a cdscode.
+
+        Raises
+        ------
+        KeyError
+            If the cdscode is not in the dataset.
+        """
+        return self.df.iloc[self._pos[str(cdscode)]]
+
+    def label(self, cdscode):
+        """
+        Display label 'School — District (County)' for a cdscode.
+        """
+        return self._labels[str(cdscode)]
+
+    def prefix_search(self, query, limit=None):
+        """
+        cdscodes whose school, district or county has a word (or the full
+        name) starting with ``query``; school-name matches come first.
+        """
+        query = _normalize(query)
+        if not query:
+            return []
+
+        start = bisect.bisect_left(self._keys, query)
+        stop = bisect.bisect_left(self._keys, query + "￿")
+        best = {}
+        for _, priority, code in self._tokens[start:stop]:
+            best[code] = min(priority, best.get(code, priority))
+
+        hits = sorted(best, key=lambda c: (best[c], self._rank[c]))
+        return hits[:limit] if limit else hits
+
+    def fuzzy_search(self, query, limit=10, cutoff=0.6):
+        """
+        cdscodes whose school, district or county name is close to ``query``
+        (tolerates typos).
+        """
+        query = _normalize(query)
+        if not query:
+            return []
+
+        matches = difflib.get_close_matches(query, self._names, n=limit, cutoff=cutoff)
+        hits = []
+        for name in matches:
+            hits.extend(sorted(self._names[name], key=self._rank.get))
+        return hits[:limit]
+
+    def search(self, query, limit=50):
+        """
+        Type-ahead search: prefix matches first, then fuzzy matches.
+
+        Returns
+        -------
+        list of str
+            Matching cdscodes (all schools, in selector order, for an empty
+            query).
+        """
+        if not _normalize(query):
+            return list(self.codes)
+
+        hits = self.prefix_search(query, limit=limit)
+        if len(hits) < limit:
+            seen = set(hits)
+            hits += [
+                c for c in self.fuzzy_search(query, limit=limit - len(hits))
+                if c not in seen
+            ]
+        return hits
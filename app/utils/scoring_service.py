@@ -0,0 +1,335 @@
+"""
+Local HTTP scoring service for the EWS model.
+
+Dashboards can request predictions over HTTP instead of loading the model in
+every process. Requests are handled asynchronously. A micro-batcher collects
+single-school requests that arrive within a few milliseconds of each other
+and scores them together in one vectorized call to the compiled forest.
+
+Endpoints:
+
+    POST /score    one feature object, or a list of them -> predictions
+    GET  /schema   model features with their allowed ranges
+    GET  /metrics  request counts, batch sizes, latency percentiles, throughput
+    GET  /health   liveness check
+
+Usage (from ``app/``):
+
+    python -m utils.scoring_service --port 8080
+
+    curl -X POST localhost:8080/score -H "Content-Type: application/json" \\
+         -d '{"still_enrolled_rate": 4.2, "chronicabsenteeismrate": 18.0, ...}'
+"""
+
+import argparse
+import asyncio
+import time
+from collections import deque
+
+import numpy as np
+from aiohttp import web
+
+from utils.batch_scoring import RISK_LABELS
+from utils.feature_config import slider_settings
+from utils.registry import load_compiled_model, load_risk_threshold
+
+
+# --- Validation ------------------------------------------------------------------
+
+
+def validate_features(payload, feature_names):
+    """
+    Check one request body against the model features and slider ranges.
+
+    Parameters
+    ----------
+    payload : dict
+        Feature name -> value.
+    feature_names : list of str
+        Features the model expects, in model order.
+
+    Returns
+    -------
+    row : list of float or None
+        Values in model order, or None if the payload is invalid.
+    errors : list of str
+        Validation messages (empty when valid).
+    """
+    if not isinstance(payload, dict):
+        return None, ["Expected a JSON object of feature values."]
+
+    errors = []
+    unknown = sorted(set(payload) - set(feature_names))
+    if unknown:
+        errors.append(f"Unknown features: {unknown}")
+
+    row = []
+    for feature in feature_names:
+        if feature not in payload:
+            errors.append(f"Missing feature '{feature}'.")
+            continue
+        value = payload[feature]
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            errors.append(f"'{feature}' must be a number, got {value!r}.")
+            continue
+        s = slider_settings.get(feature)
+        if s is not None and not s["min"] <= value <= s["max"]:
+            errors.append(f"'{feature}'={value} is outside [{s['min']}, {s['max']}].")
+            continue
+        row.append(float(value))
+
+    return (None, errors) if errors else (row, [])
+
+
+# --- Metrics ---------------------------------------------------------------------
+
+
+class ServiceMetrics:
+    """
+    Counters plus a rolling window of request latencies and batch sizes.
+    """
+
+    def __init__(self, window=10_000):
+        self.started = time.time()
+        self.requests = 0
+        self.rows = 0
+        self.rejected = 0
+        self.batches = 0
+        self.latencies_ms = deque(maxlen=window)
+        self.batch_sizes = deque(maxlen=window)
+        # (finish time, rows) for the throughput over the last minute
+        self.recent = deque(maxlen=window)
+
+    def record_request(self, rows, latency_ms):
+        self.requests += 1
+        self.rows += rows
+        self.latencies_ms.append(latency_ms)
+        self.recent.append((time.time(), rows))
+
+    def record_batch(self, size):
+        self.batches += 1
+        self.batch_sizes.append(size)
+
+    def snapshot(self):
+        now = time.time()
+        uptime = now - self.started
+        last_min = sum(n for t, n in self.recent if now - t <= 60)
+        lat = np.asarray(self.latencies_ms, dtype=float)
+        pct = (
+            dict(zip(["p50", "p90", "p99"], np.percentile(lat, [50, 90, 99]).round(3)))
+            if lat.size else {}
+        )
+        return {
+            "uptime_s": round(uptime, 1),
+            "requests": self.requests,
+            "rows_scored": self.rows,
+            "rejected": self.rejected,
+            "batches": self.batches,
+            "mean_batch_size": (
+                round(float(np.mean(self.batch_sizes)), 2) if self.batch_sizes else None
+            ),
+            "latency_ms": {k: float(v) for k, v in pct.items()},
+            "rows_per_s": round(self.rows / uptime, 2) if uptime else None,
+            "rows_per_s_last_min": round(last_min / min(60.0, uptime), 2) if uptime else None,
+        }
+
+
+# --- Micro-batching ------------------------------------------------------------
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent scoring requests into one vectorized predict call.
+
+    The first request in an empty queue opens a batch; the batch is scored
+    when it reaches ``max_batch_size`` rows or ``max_wait_ms`` has passed,
+    whichever comes first. Scoring runs in a worker thread so the event loop
+    keeps accepting requests meanwhile.
+    """
+
+    def __init__(self, engine, metrics, max_batch_size=64, max_wait_ms=2.0):
+        self.engine = engine
+        self.metrics = metrics
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, rows):
+        """
+        Queue rows (list of feature lists) and wait for (labels, probabilities).
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((rows, future))
+        return await future
+
+    async def _collect(self):
+        items = [await self.queue.get()]
+        size = len(items[0][0])
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            items.append(item)
+            size += len(item[0])
+        return items
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = await self._collect()
+            X = np.asarray([row for rows, _ in items for row in rows], dtype=np.float64)
+            try:
+                labels, proba = await loop.run_in_executor(None, self.engine.predict, X)
+            except Exception as exc:  # surface scoring errors to every waiting request
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+
+            self.metrics.record_batch(len(X))
+            start = 0
+            for rows, future in items:
+                stop = start + len(rows)
+                if not future.done():
+                    future.set_result((labels[start:stop], proba[start:stop, 1]))
+                start = stop
+
+
+# --- HTTP handlers ---------------------------------------------------------------
+
+
+async def handle_score(request):
+    started = time.perf_counter()
+    service = request.app["service"]
+    try:
+        body = await request.json()
+    except ValueError:
+        service["metrics"].rejected += 1
+        return web.json_response({"error": "Request body must be JSON."}, status=400)
+
+    batch = body if isinstance(body, list) else [body]
+    feature_names = service["engine"].feature_names
+    rows, errors = [], {}
+    for i, payload in enumerate(batch):
+        row, errs = validate_features(payload, feature_names)
+        if errs:
+            errors[i] = errs
+        else:
+            rows.append(row)
+
+    if errors or not rows:
+        service["metrics"].rejected += 1
+        return web.json_response(
+            {"error": "Invalid input.", "details": errors or "Empty request."}, status=422
+        )
+
+    _, proba = await service["batcher"].submit(rows)
+    risk = service["risk"]
+    labels, calibrated = risk.classify(proba), risk.calibrate(proba)
+    results = [
+        {
+            "prediction": int(label),
+            "risk_label": RISK_LABELS.get(int(label), str(label)),
+            "risk_probability": float(p),
+            "calibrated_probability": float(c),
+        }
+        for label, p, c in zip(labels, proba, calibrated)
+    ]
+    service["metrics"].record_request(len(rows), (time.perf_counter() - started) * 1000)
+    return web.json_response(results if isinstance(body, list) else results[0])
+
+
+async def handle_schema(request):
+    features = request.app["service"]["engine"].feature_names
+    return web.json_response(
+        {
+            f: {k: slider_settings[f][k] for k in ("min", "max", "label")}
+            if f in slider_settings else {}
+            for f in features
+        }
+    )
+
+
+async def handle_metrics(request):
+    return web.json_response(request.app["service"]["metrics"].snapshot())
+
+
+async def handle_health(request):
+    return web.json_response({"status": "ok"})
+
+
+def create_app(engine=None, max_batch_size=64, max_wait_ms=2.0, risk=None):
+    """
+    Build the aiohttp application.
+
+    Parameters
+    ----------
+    engine : utils.inference.CompiledForest, optional
+        Compiled model. Defaults to the registry's compiled EWS model.
+    max_batch_size : int, optional
+        Most rows scored in one call. Defaults to 64.
+    max_wait_ms : float, optional
+        Longest a request waits for others to join its batch. Defaults to 2.
+    risk : utils.thresholds.RiskThreshold, optional
+        At-risk cutoff and calibration. Defaults to the registry's saved
+        cutoff.
+
+    Returns
+    -------
+    aiohttp.web.Application
+    """
+    engine = engine or load_compiled_model()
+    risk = risk or load_risk_threshold()
+    metrics = ServiceMetrics()
+    app = web.Application()
+    app["service"] = {"engine": engine, "risk": risk, "metrics": metrics}
+
+    async def start_batcher(app):
+        batcher = MicroBatcher(engine, metrics, max_batch_size, max_wait_ms)
+        batcher.start()
+        app["service"]["batcher"] = batcher
+
+    async def stop_batcher(app):
+        await app["service"]["batcher"].stop()
+
+    app.on_startup.append(start_batcher)
+    app.on_cleanup.append(stop_batcher)
+
+    app.router.add_post("/score", handle_score)
+    app.router.add_get("/schema", handle_schema)
+    app.router.add_get("/metrics", handle_metrics)
+    app.router.add_get("/health", handle_health)
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve EWS predictions over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    args = parser.parse_args(argv)
+
+    app = create_app(max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
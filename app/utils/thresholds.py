@@ -0,0 +1,98 @@
+"""
+The saved EWS risk cutoff and probability calibration.
+
+``code_library/thresholds.py`` chooses the cutoff (by target recall, alert
+budget or best F1) and fits a calibration. It saves both to
+``models/risk_threshold.pkl`` as plain numbers and arrays, together with the
+SHA-256 of the model they were fitted for. Here they are only applied: a
+comparison with the cutoff and an interpolation, with nothing fitted or
+swept at request time. Without the file, or when the model file has changed
+since, the model's own 0.5 rule applies.
+"""
+
+import joblib
+import numpy as np
+
+DEFAULT_THRESHOLD = 0.5
+
+
+class RiskThreshold:
+    """
+    At-risk cutoff on the forest's probability, plus optional calibration.
+
+    Parameters
+    ----------
+    threshold : float, optional
+        A school is "At Risk" when its probability is above this. Defaults
+        to 0.5.
+    calibration : dict, optional
+        {'method': 'isotonic', 'x', 'y'} or {'method': 'sigmoid', 'coef',
+        'intercept'}, as saved by ``code_library/thresholds.py``.
+    rule : str, optional
+        How the cutoff was chosen (e.g. 'recall ≥ 0.85').
+    metrics : dict, optional
+        Validation metrics saved with the cutoff.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, calibration=None, rule="default", metrics=None):
+        self.threshold = float(threshold)
+        self.calibration = calibration
+        self.rule = rule
+        self.metrics = metrics or {}
+
+    @property
+    def calibrated(self):
+        return self.calibration is not None
+
+    def classify(self, proba):
+        """
+        1 (At Risk) where the probability is above the cutoff, else 0.
+        """
+        return (np.asarray(proba) > self.threshold).astype(int)
+
+    def calibrate(self, proba):
+        """
+        Calibrated probability (the input unchanged without a calibration).
+        """
+        proba = np.asarray(proba, dtype=np.float64)
+        cal = self.calibration
+        if cal is None:
+            return proba
+        if cal["method"] == "isotonic":
+            return np.interp(proba, cal["x"], cal["y"])
+        return 1.0 / (1.0 + np.exp(-(cal["coef"] * proba + cal["intercept"])))
+
+    def describe(self):
+        """
+        One-line description of the cutoff for captions.
+        """
+        if self.rule == "default":
+            return f"Risk cutoff {self.threshold:.0%} (model default)"
+        return f"Risk cutoff {self.threshold:.1%} (chosen for {self.rule})"
+
+
+def read_threshold(path, model_sha256=None):
+    """
+    Load a saved cutoff, or the default if it was fitted for another model.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        ``models/risk_threshold.pkl``.
+    model_sha256 : str, optional
+        SHA-256 of the model being served; checked against the saved one.
+
+    Returns
+    -------
+    RiskThreshold
+    """
+    artifact = joblib.load(path)
+    if model_sha256 is not None and artifact.get("model_sha256") != model_sha256:
+        print(f"⚠️ {path.name} was fitted for a different model; using the 0.5 cutoff.")
+        return RiskThreshold()
+    return RiskThreshold(
+        artifact["threshold"],
+        artifact.get("calibration"),
+        artifact.get("rule", "saved"),
+        artifact.get("metrics"),
+    )
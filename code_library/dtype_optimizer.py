@@ -0,0 +1,253 @@
+"""
+Compact dtype planning for CDE and stage datasets.
+
+CDE text files are loaded with every column as a string, and the combined
+stage datasets keep float64/object columns that fit in much smaller types.
+``plan_dtypes`` picks the narrowest safe dtype for each column, and
+``memory_report`` shows the before/after bytes per column.
+
+Usage (from ``code_library/``):
+
+    python dtype_optimizer.py ../data/0*_*.pkl           # report only
+    python dtype_optimizer.py ../data/0*_*.pkl --write   # also rewrite the pickles
+"""
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# values CDE uses for suppressed or unavailable cells
+NA_MARKERS = ["*", "", "N/A", "NA", "--"]
+
+# signed only: unsigned columns wrap around on later differences or -1 sentinels
+INT_TYPES = [np.int8, np.int16, np.int32, np.int64]
+
+
+def _smallest_int(values):
+    """
+    Return the narrowest signed integer dtype that holds every value.
+    """
+    lo, hi = values.min(), values.max()
+    for dtype in INT_TYPES:
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return np.dtype(dtype)
+    return None
+
+
+def _is_text(col):
+    return col.dtype == object or pd.api.types.is_string_dtype(col.dtype)
+
+
+def _parse_numeric_text(col, na_markers):
+    """
+    Parse a text column as numbers if every non-missing value is numeric.
+
+    Columns where any value has a leading zero (CDS, county, district and
+    school codes) are left as text so identifiers keep their padding.
+
+    Returns
+    -------
+    pandas.Series or None
+        Parsed float Series, or None if the column is not numeric text.
+    """
+    text = col.dropna().astype(str).str.strip()
+    text = text[~text.isin(na_markers)]
+    if text.empty:
+        return None
+    if text.str.match(r"^-?0\d").any():
+        return None
+
+    parsed = pd.to_numeric(text, errors="coerce")
+    if parsed.isna().any():
+        return None
+
+    out = pd.Series(np.nan, index=col.index, dtype=float)
+    out[parsed.index] = parsed.astype(float)
+    return out
+
+
+def _numeric_dtype(values, float_rtol):
+    """
+    Narrowest dtype for a numeric Series (may contain NaN).
+    """
+    if pd.api.types.is_bool_dtype(values):
+        return values.dtype
+
+    present = values.dropna().to_numpy(dtype=float)
+    if present.size == 0:
+        return np.dtype(np.float32)
+
+    has_na = present.size < len(values)
+    integral = np.all(np.isfinite(present)) and np.all(np.mod(present, 1) == 0)
+
+    if integral and not has_na:
+        dtype = _smallest_int(present)
+        if dtype is not None:
+            return dtype
+
+    as_f32 = present.astype(np.float32)
+    if float_rtol == 0:
+        fits = np.array_equal(as_f32.astype(np.float64), present)
+    else:
+        fits = np.all(np.isfinite(as_f32[np.isfinite(present)])) and np.allclose(
+            as_f32, present, rtol=float_rtol, atol=0
+        )
+    return np.dtype(np.float32) if fits else np.dtype(np.float64)
+
+
+def plan_dtypes(
+    df, category_threshold=0.5, float_rtol=0, na_markers=NA_MARKERS, exclude=()
+):
+    """
+    Infer the narrowest safe dtype for each column.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Dataset to analyze (not modified).
+    category_threshold : float, optional
+        Text columns whose unique-value count is at most this share of their
+        non-missing values become ``category``. Defaults to 0.5.
+    float_rtol : float, optional
+        Maximum relative error allowed when narrowing floats to float32.
+        Defaults to 0: a column becomes float32 only if every value survives
+        the round trip exactly. A positive value (e.g. 1e-6) allows lossy
+        narrowing.
+    na_markers : list of str, optional
+        Text values treated as missing when deciding whether a text column is
+        numeric (CDE uses '*' for suppressed cells).
+    exclude : iterable of str, optional
+        Columns to leave untouched.
+
+    Returns
+    -------
+    dict
+        {column: dtype} for every column whose dtype should change.
+
+    Notes
+    -----
+    - Integer-valued columns without missing values get the smallest
+      signed integer type (never unsigned, so differences and -1 sentinels
+      computed later cannot wrap around); with missing values they stay
+      floats so NaN handling downstream is unchanged.
+    - Text columns with leading zeros (CDS/county/district/school codes) are
+      never converted to numbers.
+    """
+    plan = {}
+    for name in df.columns:
+        if name in exclude:
+            continue
+        col = df[name]
+
+        if _is_text(col):
+            parsed = _parse_numeric_text(col, na_markers)
+            if parsed is not None:
+                plan[name] = _numeric_dtype(parsed, float_rtol)
+                continue
+            n_present = col.notna().sum()
+            if n_present and col.nunique(dropna=True) <= category_threshold * n_present:
+                plan[name] = "category"
+            continue
+
+        if pd.api.types.is_numeric_dtype(col):
+            dtype = _numeric_dtype(col, float_rtol)
+            if dtype != col.dtype:
+                plan[name] = dtype
+
+    return plan
+
+
+def apply_dtype_plan(df, plan, na_markers=NA_MARKERS):
+    """
+    Return a copy of ``df`` with the planned dtypes applied.
+    """
+    out = df.copy()
+    for name, dtype in plan.items():
+        col = out[name]
+        if dtype == "category":
+            out[name] = col.astype("category")
+            continue
+        if _is_text(col):
+            col = col.astype(str).str.strip().where(col.notna())
+            col = pd.to_numeric(col.where(~col.isin(na_markers)), errors="coerce")
+        out[name] = col.astype(dtype)
+    return out
+
+
+def optimize_dtypes(df, **plan_kwargs):
+    """
+    Narrow every column of ``df`` to its smallest safe dtype.
+
+    Keyword arguments are passed to ``plan_dtypes``.
+    """
+    na_markers = plan_kwargs.get("na_markers", NA_MARKERS)
+    return apply_dtype_plan(df, plan_dtypes(df, **plan_kwargs), na_markers=na_markers)
+
+
+def memory_report(before, after):
+    """
+    Compare per-column memory use of two versions of a dataset.
+
+    Parameters
+    ----------
+    before, after : pandas.DataFrame
+        The original and optimized datasets.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per column (plus a 'TOTAL' row) with dtypes, bytes before and
+        after, and the percent saved, sorted by bytes saved.
+    """
+    mem_before = before.memory_usage(deep=True, index=False)
+    mem_after = after.memory_usage(deep=True, index=False)
+
+    report = pd.DataFrame(
+        {
+            "dtype_before": before.dtypes.map(lambda d: d.name),
+            "dtype_after": after.dtypes.map(lambda d: d.name),
+            "bytes_before": mem_before,
+            "bytes_after": mem_after,
+            "bytes_saved": mem_before - mem_after,
+        }
+    ).sort_values("bytes_saved", ascending=False)
+
+    report.loc["TOTAL"] = [
+        "", "", mem_before.sum(), mem_after.sum(), mem_before.sum() - mem_after.sum()
+    ]
+    report["pct_saved"] = (
+        100 * report["bytes_saved"] / report["bytes_before"].replace(0, np.nan)
+    ).round(1)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report (and apply) compact dtypes.")
+    parser.add_argument("paths", nargs="+", type=Path, help="pickled DataFrames")
+    parser.add_argument("--write", action="store_true", help="overwrite the pickles")
+    parser.add_argument(
+        "--float-rtol", type=float, default=0,
+        help="relative error allowed when narrowing to float32 (default 0: exact only)",
+    )
+    args = parser.parse_args(argv)
+
+    for path in args.paths:
+        before = pd.read_pickle(path)
+        after = optimize_dtypes(before, float_rtol=args.float_rtol)
+        report = memory_report(before, after)
+        total = report.loc["TOTAL"]
+        print(
+            f"\n📁 {path.name}: {total['bytes_before'] / 1e6:.2f} MB -> "
+            f"{total['bytes_after'] / 1e6:.2f} MB ({total['pct_saved']}% saved)"
+        )
+        print(report.drop(index="TOTAL").head(10).to_string())
+        if args.write:
+            after.to_pickle(path)
+            print(f"[saved] {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+"""
+Feature selection: parallel permutation importance and a top-N sweep.
+
+Notebook 05 keeps the 15 features with the highest impurity importance from
+a single forest. Impurity importance favours high-cardinality columns and
+says nothing about how many features the model actually needs. This engine
+runs in three steps:
+
+1. Fit the notebook's forest on all features and compute **permutation
+   importance** on a validation split of the training rows: the PR-AUC
+   lost when a column is shuffled. Features are spread over a process pool.
+   All shuffles of one feature are scored in a single stacked
+   ``predict_proba`` call.
+2. **Sweep N**: refit the forest on the top-N features for every N in the
+   grid, in parallel, and record validation PR-AUC and fit time. The
+   matrix is built once with columns in rank order, so each top-N input
+   is a column prefix.
+3. Pick the smallest N whose PR-AUC is within a tolerance of the best.
+
+Every fit is cached on disk under ``data/cache/feature_selection``. The key
+is the dataset's content hash plus the exact columns and settings, so a
+re-run only fits what changed. Re-selecting for a new data year costs one
+pass of fits.
+
+Usage (from ``code_library/``):
+
+    python feature_selection.py
+    python feature_selection.py --dataset 04 --repeats 20 --tolerance 0.005
+    python feature_selection.py --features-out ../models/top_features_next.pkl --curve-out sweep.csv
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import average_precision_score
+
+from modeling import DATASETS, FINAL_DATASET, RANDOM_STATE, RF_PARAMS, load_xy, split_xy
+from stage_cache import CACHE_DIR, cache_key
+
+SELECTION_DIR = CACHE_DIR / "feature_selection"
+
+# forest settings for every fit here (one thread: fits run in parallel)
+SELECTION_RF = dict(RF_PARAMS, n_jobs=1)
+
+
+# --- Data ------------------------------------------------------------------------
+
+
+def selection_split(dataset=FINAL_DATASET, val_size=0.25, seed=RANDOM_STATE):
+    """
+    The notebooks' training rows, split again into fit and validation parts
+    (``seed`` drives this second split only).
+
+    Returns
+    -------
+    X_fit, X_val : pandas.DataFrame
+    y_fit, y_val : numpy.ndarray
+    """
+    X, y = load_xy(dataset)
+    X_train, _, y_train, _ = split_xy(X, y)
+    X_fit, X_val, y_fit, y_val = split_xy(X_train, y_train, test_size=val_size, random_state=seed)
+    return X_fit, X_val, y_fit.to_numpy(), y_val.to_numpy()
+
+
+# --- Cached fits -----------------------------------------------------------------
+
+
+def _fit_key(dataset, columns, params, val_size=0.25, seed=RANDOM_STATE):
+    path = DATASETS.get(str(dataset), dataset)
+    return cache_key(
+        [path],
+        {"columns": list(columns), "params": params, "val_size": val_size, "seed": seed},
+    )
+
+
+def cached_fit(key, X_fit, y_fit, X_val, y_val, params=SELECTION_RF, cache_dir=SELECTION_DIR):
+    """
+    Fit a forest on ``X_fit`` and score it on ``X_val``, or return the cached
+    result for ``key``.
+
+    Returns
+    -------
+    dict
+        'model', 'score' (validation PR-AUC), 'fit_s' and 'cached'.
+    """
+    path = Path(cache_dir) / f"{key[:24]}.pkl"
+    if path.exists():
+        return dict(joblib.load(path), cached=True)
+
+    start = time.perf_counter()
+    model = RandomForestClassifier(**params).fit(X_fit, y_fit)
+    fit_s = time.perf_counter() - start
+    score = float(average_precision_score(y_val, model.predict_proba(X_val)[:, 1]))
+
+    result = {"model": model, "score": score, "fit_s": fit_s}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    joblib.dump(result, path, compress=3)
+    return dict(result, cached=False)
+
+
+# --- Permutation importance ------------------------------------------------------
+
+# data held by each worker process: (model, X_val, y_val, n_repeats, seed) for
+# permutation importance, (X_fit, y_fit, X_val, y_val, params, cache_dir) for
+# the sweep
+_worker_data = None
+
+
+def _init_worker(data):
+    global _worker_data
+    _worker_data = data
+
+
+def _permute_feature(j):
+    """
+    PR-AUC drop for every shuffle of feature ``j``, scored in one call.
+    """
+    model, X_val, y_val, n_repeats, seed = _worker_data
+    rng = np.random.default_rng([seed, j])
+    n = len(X_val)
+    base = average_precision_score(y_val, model.predict_proba(X_val)[:, 1])
+
+    stacked = np.tile(X_val, (n_repeats, 1))
+    for r in range(n_repeats):
+        stacked[r * n:(r + 1) * n, j] = X_val[rng.permutation(n), j]
+    proba = model.predict_proba(stacked)[:, 1].reshape(n_repeats, n)
+    drops = np.array([base - average_precision_score(y_val, p) for p in proba])
+    return j, drops
+
+
+def permutation_importance(model, X_val, y_val, n_repeats=10, seed=RANDOM_STATE, jobs=None):
+    """
+    Permutation importance (PR-AUC drop) of every feature, in parallel.
+
+    Parameters
+    ----------
+    model : fitted classifier
+        Scored on ``X_val``.
+    X_val : pandas.DataFrame
+        Validation rows.
+    y_val : array-like
+        Validation labels.
+    n_repeats : int, optional
+        Shuffles per feature. Defaults to 10.
+    jobs : int, optional
+        Worker processes. Defaults to the number of CPU cores.
+
+    Returns
+    -------
+    pandas.DataFrame
+        'feature', 'importance' (mean PR-AUC drop), 'std' and the model's
+        impurity importance, most important first.
+    """
+    X = X_val.to_numpy(dtype=np.float64)
+    data = (model, X, np.asarray(y_val), n_repeats, seed)
+    features = range(X.shape[1])
+    jobs = jobs or os.cpu_count() or 1
+
+    if jobs == 1:
+        _init_worker(data)
+        results = [_permute_feature(j) for j in features]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(data,)) as pool:
+            results = list(pool.map(_permute_feature, features))
+
+    drops = dict(results)
+    table = pd.DataFrame(
+        {
+            "feature": list(X_val.columns),
+            "importance": [drops[j].mean() for j in features],
+            "std": [drops[j].std() for j in features],
+            "impurity": getattr(model, "feature_importances_", np.full(X.shape[1], np.nan)),
+        }
+    )
+    # ties (e.g. unused features) fall back to impurity importance
+    return table.sort_values(["importance", "impurity"], ascending=False).reset_index(drop=True)
+
+
+# --- Top-N sweep -----------------------------------------------------------------
+
+
+def _sweep_one(task):
+    n, key = task
+    X_fit, y_fit, X_val, y_val, params, cache_dir = _worker_data
+    result = cached_fit(key, X_fit[:, :n], y_fit, X_val[:, :n], y_val, params, cache_dir)
+    return {"N": n, "PR-AUC": result["score"], "fit_s": result["fit_s"], "cached": result["cached"]}
+
+
+def sweep_top_n(
+    ranking,
+    X_fit,
+    y_fit,
+    X_val,
+    y_val,
+    n_values=None,
+    dataset=FINAL_DATASET,
+    jobs=None,
+    val_size=0.25,
+    seed=RANDOM_STATE,
+    cache_dir=SELECTION_DIR,
+):
+    """
+    Validation PR-AUC of the forest refit on the top-N features, per N.
+
+    Parameters
+    ----------
+    ranking : list of str
+        Features, most important first.
+    n_values : list of int, optional
+        N to try. Defaults to 3, 5, 7, ... up to all features.
+    val_size, seed : optional
+        The ``selection_split`` settings behind ``X_fit``/``X_val``; part of
+        the cache key.
+
+    Returns
+    -------
+    pandas.DataFrame
+        'N', 'PR-AUC', 'fit_s' and 'cached' per N.
+    """
+    # columns in rank order once, so each top-N input is a prefix
+    Xf = X_fit[ranking].to_numpy(dtype=np.float64)
+    Xv = X_val[ranking].to_numpy(dtype=np.float64)
+    n_all = len(ranking)
+    n_values = sorted(set(n_values or list(range(3, n_all, 2)) + [n_all]))
+
+    tasks = [
+        (n, _fit_key(dataset, ranking[:n], SELECTION_RF, val_size, seed))
+        for n in n_values if 0 < n <= n_all
+    ]
+    # the matrices go to each worker once, not with every task
+    data = (Xf, np.asarray(y_fit), Xv, np.asarray(y_val), SELECTION_RF, cache_dir)
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1:
+        _init_worker(data)
+        rows = [_sweep_one(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=min(jobs, len(tasks)), initializer=_init_worker, initargs=(data,)
+        ) as pool:
+            rows = list(pool.map(_sweep_one, tasks))
+    return pd.DataFrame(rows)
+
+
+def choose_n(curve, tolerance=0.01):
+    """
+    Smallest N whose PR-AUC is within ``tolerance`` of the best N's.
+    """
+    best = curve["PR-AUC"].max()
+    return int(curve.loc[curve["PR-AUC"] >= best - tolerance, "N"].min())
+
+
+def select_features(
+    dataset=FINAL_DATASET, n_repeats=10, n_values=None, tolerance=0.01, jobs=None,
+    val_size=0.25, seed=RANDOM_STATE,
+):
+    """
+    Full selection run: rank by permutation importance, sweep N, choose N.
+
+    Returns
+    -------
+    selected : list of str
+        Chosen top-N features.
+    ranking : pandas.DataFrame
+        Permutation importance table.
+    curve : pandas.DataFrame
+        PR-AUC vs. N.
+    """
+    X_fit, X_val, y_fit, y_val = selection_split(dataset, val_size, seed)
+    columns = list(X_fit.columns)
+
+    full = cached_fit(
+        _fit_key(dataset, columns, SELECTION_RF, val_size, seed),
+        X_fit.to_numpy(dtype=np.float64), y_fit,
+        X_val.to_numpy(dtype=np.float64), y_val,
+    )
+    ranking = permutation_importance(full["model"], X_val, y_val, n_repeats=n_repeats, jobs=jobs)
+    order = ranking["feature"].tolist()
+
+    curve = sweep_top_n(order, X_fit, y_fit, X_val, y_val, n_values, dataset, jobs, val_size, seed)
+    n = choose_n(curve, tolerance)
+    return order[:n], ranking, curve
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Permutation-importance ranking and top-N feature sweep.")
+    parser.add_argument("--dataset", default=FINAL_DATASET, help="dataset key (02, 03, 04)")
+    parser.add_argument("--repeats", type=int, default=10, help="shuffles per feature")
+    parser.add_argument("--n-values", type=int, nargs="*", default=None, help="N to sweep")
+    parser.add_argument("--tolerance", type=float, default=0.01, help="allowed PR-AUC below the best N")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--features-out", type=Path, default=None, help="save the selected list (joblib)")
+    parser.add_argument("--curve-out", type=Path, default=None, help="save PR-AUC vs. N (.csv)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    selected, ranking, curve = select_features(
+        args.dataset, args.repeats, args.n_values, args.tolerance, args.jobs
+    )
+    print(f"✅ Selection finished in {time.perf_counter() - start:.1f}s\n")
+
+    with pd.option_context("display.width", 160, "display.precision", 4):
+        print(ranking.to_string(index=False))
+        print()
+        print(curve.to_string(index=False))
+    print(f"\nℹ️ Selected N = {len(selected)}: {selected}")
+
+    if args.features_out:
+        joblib.dump(selected, args.features_out)
+        print(f"[saved] {args.features_out}")
+    if args.curve_out:
+        curve.to_csv(args.curve_out, index=False)
+        print(f"[saved] {args.curve_out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,30 @@
-import re
-
 import numpy as np
 import pandas as pd
 from pathlib import Path
 
-def load_cde_txt(path, sep="\t", encoding="latin1"):
+from dtype_optimizer import optimize_dtypes
+from stage_cache import pickle_columns, read_pickle_columns
+
+
+def load_cde_txt(
+    path,
+    sep="\t",
+    encoding="latin1",
+    filters=None,
+    usecols=None,
+    numeric_cols=None,
+    chunksize=None,
+    compact=False,
+):
     """
     Load a California Department of Education (CDE) text file as a DataFrame.
 
+    By default the whole file is read with every column as a string. When
+    ``filters``, ``usecols``, ``numeric_cols`` or ``chunksize`` are given, the
+    file is streamed in chunks instead: each chunk is filtered and projected
+    before it is kept, so rows and columns that would be dropped right away
+    never accumulate in memory.
+
     Parameters
     ----------
     path : str or pathlib.Path
@@ -16,17 +33,105 @@ def load_cde_txt(path, sep="\t", encoding="latin1"):
         Field separator used in the file. Defaults to tab ("\\t").
     encoding : str, optional
         Encoding used to read the file. Defaults to 'latin1'.
+    filters : dict, optional
+        Row predicates keyed by column name. A value may be a string (matched
+        after stripping whitespace), a list/set/tuple of accepted strings, or
+        a callable that takes the column Series and returns a boolean mask.
+        All predicates must hold for a row to be kept.
+    usecols : list of str, optional
+        Columns to keep in the result, in this order. Filter columns are read
+        even when they are not listed here. Defaults to all columns.
+    numeric_cols : list of str, optional
+        Columns parsed with ``pd.to_numeric(errors="coerce")`` chunk by chunk,
+        so suppressed values such as '*' become NaN.
+    chunksize : int, optional
+        Rows per chunk in streaming mode. Defaults to 100,000 when any of the
+        streaming options is set.
+    compact : bool, optional
+        Narrow the result with ``dtype_optimizer.optimize_dtypes``: numeric
+        text becomes the smallest safe int/float, repetitive text becomes
+        ``category``, and zero-padded codes stay strings. Defaults to False.
 
     Returns
     -------
     pandas.DataFrame
-        DataFrame with all columns loaded as strings.
+        DataFrame with all columns loaded as strings, except ``numeric_cols``
+        (or compact dtypes when ``compact=True``).
 
     Notes
     -----
     Docstring generated with assistance from ChatGPT.
+
+    Examples
+    --------
+    >>> df_acgr = load_cde_txt(
+    ...     ca_doe / "acgr21.txt",
+    ...     filters={
+    ...         "AggregateLevel": "S",
+    ...         "CharterSchool": "No",
+    ...         "DASS": "No",
+    ...         "ReportingCategory": "TA",
+    ...     },
+    ...     numeric_cols=["CohortStudents", "Regular HS Diploma Graduates (Rate)"],
+    ... )
     """
-    return pd.read_csv(path, sep=sep, dtype=str, encoding=encoding)
+    streaming = any(
+        opt is not None for opt in (filters, usecols, numeric_cols, chunksize)
+    )
+    if not streaming:
+        df = pd.read_csv(path, sep=sep, dtype=str, encoding=encoding)
+        return optimize_dtypes(df) if compact else df
+
+    filters = filters or {}
+    numeric_cols = list(numeric_cols or [])
+
+    # Columns to read = projection + anything the predicates need
+    read_cols = None
+    if usecols is not None:
+        read_cols = list(dict.fromkeys(list(usecols) + list(filters) + numeric_cols))
+
+    reader = pd.read_csv(
+        path,
+        sep=sep,
+        dtype=str,
+        encoding=encoding,
+        usecols=read_cols,
+        chunksize=chunksize or 100_000,
+    )
+
+    chunks = []
+    for chunk in reader:
+        mask = np.ones(len(chunk), dtype=bool)
+        for col, cond in filters.items():
+            if callable(cond):
+                mask &= np.asarray(cond(chunk[col]), dtype=bool)
+            elif isinstance(cond, (list, set, tuple, frozenset)):
+                mask &= chunk[col].str.strip().isin(cond).to_numpy()
+            else:
+                mask &= (chunk[col].str.strip() == cond).to_numpy()
+
+        chunk = chunk.loc[mask]
+        if usecols is not None:
+            chunk = chunk[list(usecols)]
+
+        parsed = {
+            col: pd.to_numeric(chunk[col], errors="coerce")
+            for col in numeric_cols
+            if col in chunk.columns
+        }
+        if parsed:
+            chunk = chunk.assign(**parsed)
+
+        chunks.append(chunk)
+
+    if not chunks:
+        # no data rows: an empty frame with the file's (projected) columns
+        header = pd.read_csv(path, sep=sep, dtype=str, encoding=encoding, usecols=read_cols, nrows=0)
+        chunks = [header[list(usecols)] if usecols is not None else header]
+
+    # Keep the original row labels, same as boolean-indexing the full file
+    df = pd.concat(chunks)
+    return optimize_dtypes(df) if compact else df
 
 
 def clean_calschls_safety(
@@ -61,6 +166,8 @@ def clean_calschls_safety(
     -----
     - Detects rows that contain county/state names ending in 'Percent'.
     - Parses Grade 9/11 rows into numeric columns.
+    - Works column-wise on the whole export (string ops, a forward-filled
+      region column and one bulk numeric conversion) instead of row by row.
     - Converts '%' strings to floats and sets 'S'/'N/A' to NaN.
     - This function is tailored to the specific CalSCHLS export format used
       in this project and may need adjustment for other layouts.
@@ -68,73 +175,89 @@ def clean_calschls_safety(
     Docstring generated with assistance from ChatGPT.
     """
 
-    def _clean_val(x):
-        if pd.isna(x):
-            return np.nan
-        x = str(x).strip().replace("%", "")
-        if x in {"N/A", "S", ""}:
-            return np.nan
-        try:
-            return float(x)
-        except ValueError:
-            return np.nan
-
-    rows = []
-    region = None
-
-    # Loop through all rows
-    for _, row in df_raw.iterrows():
-        # Flatten and join all values to handle irregular formats
-        values = [str(v).strip() for v in row if pd.notna(v)]
-        if not values:
-            continue
-
-        line = "\t".join(values)
-
-        # Detect new region headers (e.g., 'Alameda County Percent')
-        if line.endswith("Percent") and not line.startswith("Grade Level"):
-            region = line.replace("Percent", "").strip()
-            continue
-
-        # Detect data lines ('Grade 9', 'Grade 11')
-        if line.startswith("Grade 9") or line.startswith("Grade 11"):
-            match = re.match(r"Grade\s+(9|11)\s+(.*)", line)
-            if not match or region is None:
-                continue
-
-            grade = int(match.group(1))
-            rest = match.group(2)
-            parts = re.split(r"\t+|\s{2,}", rest)
-            if len(parts) < 5:
-                parts = rest.split()
-            vals = (parts + [""] * 5)[:5]
-
-            vs, s, n, u, vu = map(_clean_val, vals)
-            rows.append(
-                {
-                    "geography": region,
-                    "geo_type": "County" if "County" in region else "State",
-                    "grade": grade,
-                    "very_safe_pct": vs,
-                    "safe_pct": s,
-                    "neither_pct": n,
-                    "unsafe_pct": u,
-                    "very_unsafe_pct": vu,
-                    "years": years,
-                    "level_of_safety_filter": level_filter,
-                }
-            )
+    # Stringify and strip every non-missing cell, one column at a time
+    present = df_raw.notna()
+    cells = df_raw.astype(str).astype(object).apply(lambda col: col.str.strip())
 
-    df_clean = pd.DataFrame(rows)
+    # Join each row's non-missing cells with tabs (same as the old row loop)
+    line = pd.Series(np.nan, index=df_raw.index, dtype=object)
+    for col in df_raw.columns:
+        cell = cells[col].where(present[col])
+        line = (line + "\t" + cell).fillna(line).fillna(cell)
 
-    # Sort for readability
-    if not df_clean.empty:
-        df_clean["geo_type"] = pd.Categorical(
-            df_clean["geo_type"], categories=["State", "County"], ordered=True
+    # Region header rows (e.g. 'Alameda County Percent'), forward-filled
+    is_header = (
+        line.str.endswith("Percent").fillna(False).astype(bool)
+        & ~line.str.startswith("Grade Level").fillna(False).astype(bool)
+    )
+    region = (
+        line.where(is_header)
+        .str.replace("Percent", "", regex=False)
+        .str.strip()
+        .ffill()
+    )
+
+    # Data rows ('Grade 9', 'Grade 11') that follow a region header
+    parsed = line.str.extract(r"^Grade\s+(9|11)\s+(.*)")
+    is_data = (
+        (
+            line.str.startswith("Grade 9").fillna(False).astype(bool)
+            | line.str.startswith("Grade 11").fillna(False).astype(bool)
         )
-        df_clean = df_clean.sort_values(["geo_type", "geography", "grade"]).reset_index(
-            drop=True
+        & ~is_header
+        & parsed[0].notna()
+        & region.notna()
+    )
+
+    if not is_data.any():
+        return pd.DataFrame()
+
+    rest = parsed.loc[is_data, 1]
+    region = region[is_data]
+
+    # Split values on tabs / runs of spaces; fall back to any whitespace
+    parts = rest.str.split(r"\t+|\s{2,}", regex=True, expand=True)
+    # object dtype: the padding columns added here would otherwise be float64
+    parts = parts.reindex(columns=range(max(5, parts.shape[1]))).astype(object)
+    short = parts.notna().sum(axis=1) < 5
+    if short.any():
+        ws_parts = rest[short].str.split(expand=True)
+        parts.loc[short] = ws_parts.reindex(columns=parts.columns).to_numpy(dtype=object)
+    # missing cells count as empty values, as in the old row loop
+    parts = parts.iloc[:, :5].fillna("")
+
+    # Bulk percent conversion ('27.4%' -> 27.4; 'S', 'N/A', '' -> NaN)
+    pct = parts.apply(
+        lambda col: pd.to_numeric(
+            col.astype(str).str.replace("%", "", regex=False).str.strip(),
+            errors="coerce",
         )
+    )
+
+    df_clean = pd.DataFrame(
+        {
+            "geography": region.to_numpy(dtype=object),
+            "geo_type": np.where(
+                region.str.contains("County", regex=False), "County", "State"
+            ).astype(object),
+            "grade": parsed.loc[is_data, 0].astype(int).to_numpy(),
+            "very_safe_pct": pct.iloc[:, 0].to_numpy(dtype=float),
+            "safe_pct": pct.iloc[:, 1].to_numpy(dtype=float),
+            "neither_pct": pct.iloc[:, 2].to_numpy(dtype=float),
+            "unsafe_pct": pct.iloc[:, 3].to_numpy(dtype=float),
+            "very_unsafe_pct": pct.iloc[:, 4].to_numpy(dtype=float),
+            "years": years,
+            "level_of_safety_filter": level_filter,
+        }
+    )
+
+    # Sort for readability
+    df_clean["geo_type"] = pd.Categorical(
+        df_clean["geo_type"], categories=["State", "County"], ordered=True
+    )
+    df_clean = df_clean.sort_values(["geo_type", "geography", "grade"]).reset_index(
+        drop=True
+    )
 
     return df_clean
 
@@ -161,6 +284,8 @@ def clean_safety_by_connectedness(df_raw: pd.DataFrame) -> pd.DataFrame:
     - Drops empty rows/columns and uses header structure specific to the
       KidsData/CalSCHLS export.
     - Connectedness is expected to have levels 'High', 'Medium', 'Low'.
+    - Region header offsets are found in one vectorized pass and the fixed
+      header + 3-row blocks are gathered with NumPy indexing.
     - Percentage columns are converted from strings (e.g., '27.4%') to floats.
     - This function is tailored to the specific file format used in this project.
 
@@ -169,32 +294,46 @@ def clean_safety_by_connectedness(df_raw: pd.DataFrame) -> pd.DataFrame:
     # Drop all-empty rows/columns
     df = df_raw.dropna(how="all").dropna(axis=1, how="all").copy()
 
-    # Reset index for easier iteration
+    # Reset index so row positions line up with the NumPy array below
     df.reset_index(drop=True, inplace=True)
+    values = df.to_numpy(dtype=object)
+
+    # Find all region header rows in one pass
+    first_col = df.iloc[:, 0].astype(str).str.strip()
+    is_region = first_col.str.contains("County", regex=False) | (
+        first_col == "California"
+    )
+    offsets = np.flatnonzero(is_region.to_numpy())
+    regions = first_col.to_numpy(dtype=object)[offsets]
+
+    # Each region is followed by a header row ("Level of School
+    # Connectedness ...") and 3 data rows (High, Medium, Low)
+    block_rows = offsets[:, None] + np.arange(2, 5)
+    in_range = block_rows < len(df)
 
-    # Find rows that contain region names (header rows)
-    region_rows = []
-    for i in range(len(df)):
-        row_str = str(df.iloc[i, 0]).strip()
-        if "County" in row_str or row_str == "California":
-            region_rows.append(i)
+    # Blocks normally share one header row; group them by header just in case
+    header_hash = pd.util.hash_pandas_object(df.iloc[offsets + 1], index=False)
+    header_codes, _ = pd.factorize(header_hash)
 
-    # Extract all regions and their associated 3 rows (High, Medium, Low)
     records = []
-    for idx in region_rows:
-        region = str(df.iloc[idx, 0]).strip()
-        # Usually, after this line: header row + 3 data rows
-        sub_df = df.iloc[
-            idx + 2 : idx + 5
-        ].copy()  # skip header line ("Level of School Connectedness ...")
-        sub_df.columns = df.iloc[
-            idx + 1
-        ].tolist()  # use the "Level of School Connectedness" header row
-        sub_df["Geography"] = region
+    for code in np.unique(header_codes):
+        blocks = np.flatnonzero(header_codes == code)
+        rows = block_rows[blocks][in_range[blocks]]
+        sub_df = pd.DataFrame(
+            values[rows], columns=df.iloc[offsets[blocks[0]] + 1].tolist()
+        )
+        sub_df["Geography"] = np.repeat(regions[blocks], in_range[blocks].sum(axis=1))
+        # position of each row in the original block order
+        sub_df["_order"] = (blocks[:, None] * 3 + np.arange(3))[in_range[blocks]]
         records.append(sub_df)
 
     # Combine
-    df_clean = pd.concat(records, ignore_index=True)
+    df_clean = (
+        pd.concat(records, ignore_index=True)
+        .sort_values("_order", kind="stable")
+        .drop(columns="_order")
+        .reset_index(drop=True)
+    )
 
     # Remove any 'Percent' columns or artifacts
     if "Percent" in df_clean.columns:
@@ -272,7 +411,28 @@ def clean_columns(df):
     )
     return df
 
-def rpkl(folder_path, filename, show_cols=True):
+def _clean_col_names(columns):
+    """
+    Standardize column labels: lowercase, underscores, no punctuation.
+    """
+    return (
+        pd.Index(columns)
+        .str.strip()
+        .str.lower()
+        .str.replace(r"\s+", "_", regex=True)
+        .str.replace(r"[^\w_]", "", regex=True)
+    )
+
+
+# cleaned names of the code columns rpkl uses to build 'cdscode'
+_CDS_PART_COLS = [
+    "county_code", "countycode",
+    "district_code", "districtcode",
+    "school_code", "schoolcode",
+]
+
+
+def rpkl(folder_path, filename, show_cols=True, columns=None, compact=False):
     """
     Read, clean, and standardize a pickle file into a pandas DataFrame.
 
@@ -289,6 +449,13 @@ def rpkl(folder_path, filename, show_cols=True):
         Name of the pickle file.
     show_cols : bool, default True
         Whether to print the cleaned column list.
+    columns : list of str, optional
+        Cleaned column names to keep. When given, the pickle is read through
+        the columnar cache in ``stage_cache`` and only these columns (plus the
+        code columns needed for 'cdscode') are loaded from disk.
+    compact : bool, default False
+        Narrow column dtypes with ``dtype_optimizer.optimize_dtypes`` after
+        'cdscode' is built ('cdscode' itself always stays a string).
 
     Returns
     -------
@@ -305,17 +472,23 @@ def rpkl(folder_path, filename, show_cols=True):
     Docstring generated with assistance from ChatGPT.
     """
 
-    # --- Load pickle ---
-    df = pd.read_pickle(folder_path / filename)
+    path = Path(folder_path) / filename
+
+    # --- Load pickle (whole file, or only the needed columns via the cache) ---
+    if columns is None:
+        df = pd.read_pickle(path)
+    else:
+        raw_cols = pickle_columns(path)
+        wanted = set(columns) | {"cdscode"} | set(_CDS_PART_COLS)
+        keep = [
+            raw
+            for raw, clean in zip(raw_cols, _clean_col_names(raw_cols))
+            if clean in wanted
+        ]
+        df = read_pickle_columns(path, columns=keep)
 
     # --- Clean column names ---
-    df.columns = (
-        df.columns
-        .str.strip()
-        .str.lower()
-        .str.replace(r"\s+", "_", regex=True)
-        .str.replace(r"[^\w_]", "", regex=True)
-    )
+    df.columns = _clean_col_names(df.columns)
 
     # --- Check if 'cdscode' already exists ---
     if "cdscode" not in df.columns:
@@ -349,6 +522,12 @@ def rpkl(folder_path, filename, show_cols=True):
     else:
         print("ℹ️ 'cdscode' already exists — skipping creation")
 
+    if columns is not None:
+        df = df[[c for c in df.columns if c in columns or c == "cdscode"]]
+
+    if compact:
+        df = optimize_dtypes(df, exclude=["cdscode"])
+
     # --- Optionally print columns ---
     if show_cols:
         print(f"\n📁 Columns in {filename}:")
@@ -356,6 +535,38 @@ def rpkl(folder_path, filename, show_cols=True):
 
     return df
 
+def save_stage(df, path, compact=True, exclude=("cdscode",)):
+    """
+    Write a pipeline stage dataset (01-06) to a pickle, narrowing dtypes first.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Stage dataset.
+    path : str or pathlib.Path
+        Pickle to write (e.g. ``data/01_combined_eda_dataset.pkl``).
+    compact : bool, default True
+        Narrow column dtypes with ``dtype_optimizer.optimize_dtypes``. Values
+        are unchanged: floats only become float32 when they round-trip
+        exactly, and integers only get smaller signed types.
+    exclude : iterable of str, default ('cdscode',)
+        Columns left as they are.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The DataFrame as written.
+    """
+    if compact:
+        before = df.memory_usage(deep=True).sum()
+        df = optimize_dtypes(df, exclude=[c for c in exclude if c in df.columns])
+        after = df.memory_usage(deep=True).sum()
+        print(f"ℹ️ {Path(path).name}: {before / 1e6:.2f} MB -> {after / 1e6:.2f} MB in memory")
+    df.to_pickle(path)
+    print(f"[saved] {path}")
+    return df
+
+
 def create_county_fr_geography(df, column="geography"):
     """
     Derive a 'county' column from a geography column that ends with ' County'.
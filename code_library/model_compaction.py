@@ -0,0 +1,334 @@
+"""
+Model compaction: smaller, faster stand-ins for the final Random Forest.
+
+``models/random_forest_ews.pkl`` is a 400-tree forest grown to full depth
+(``min_samples_leaf=3``) and every app page loads it. This tool builds
+compact alternatives and reports, for each one, what it costs in accuracy
+and what it saves:
+
+- **prune**: keep the first N trees. Bagged trees are interchangeable, so
+  the first N are a random subset of the forest.
+- **depth cap**: cut every tree at a maximum depth. A cut node becomes a
+  leaf that predicts the class mix of its subtree, which is already
+  stored on the node, so no refit is needed.
+- **distill**: fit a compact student to the forest's probabilities, on
+  the training rows plus jittered copies of them. The students are a
+  boosted model (``HistGradientBoostingClassifier``) and a scaled
+  logistic regression. Soft labels are passed as two weighted copies of
+  each row (label 1 with weight p, label 0 with weight 1 − p).
+
+Each option is scored on notebook 05's test split. The report gives PR-AUC
+(as ``evaluate_pr``), agreement with the full forest, pickle size, load time
+and p50/p99 single-row ``predict_proba`` latency. ``select_model`` picks
+the smallest option within a PR-AUC tolerance of the full forest.
+
+Usage (from ``code_library/``):
+
+    python model_compaction.py
+    python model_compaction.py --trees 50 100 --depths 8 10 --tolerance 0.01 \\
+        --save ../models/random_forest_ews_compact.pkl
+
+Pruned and depth-capped options are still sklearn forests, so the app's
+compiled inference can serve them: save with ``--forests-only`` and point
+``EWS_MODEL_PATH`` at the file. Distilled students need plain sklearn
+scoring.
+"""
+
+import argparse
+import copy
+import tempfile
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from modeling import MODEL_PATH, RANDOM_STATE, evaluate_pr, load_final_split
+
+TREE_LEAF = -1
+TREE_UNDEFINED = -2
+
+
+# --- Compaction options ----------------------------------------------------------
+
+
+def prune_trees(forest, n_trees):
+    """
+    Copy of ``forest`` keeping only its first ``n_trees`` trees.
+    """
+    pruned = copy.deepcopy(forest)
+    pruned.estimators_ = pruned.estimators_[:n_trees]
+    pruned.n_estimators = len(pruned.estimators_)
+    return pruned
+
+
+def _node_depths(left, right):
+    depth = np.zeros(len(left), dtype=np.int64)
+    # sklearn numbers nodes depth-first, so parents come before children
+    for node in range(len(left)):
+        if left[node] != TREE_LEAF:
+            depth[left[node]] = depth[right[node]] = depth[node] + 1
+    return depth
+
+
+def _cap_tree(tree, max_depth):
+    state = tree.__getstate__()
+    nodes, values = state["nodes"].copy(), state["values"]
+    depth = _node_depths(nodes["left_child"], nodes["right_child"])
+    keep = depth <= max_depth
+
+    # cut nodes become leaves; their stored class fractions already
+    # summarize the subtree below them
+    cut = (depth == max_depth) & (nodes["left_child"] != TREE_LEAF)
+    nodes["left_child"][cut] = TREE_LEAF
+    nodes["right_child"][cut] = TREE_LEAF
+    nodes["feature"][cut] = TREE_UNDEFINED
+    nodes["threshold"][cut] = TREE_UNDEFINED
+
+    new_index = np.cumsum(keep) - 1
+    nodes = nodes[keep]
+    internal = nodes["left_child"] != TREE_LEAF
+    nodes["left_child"][internal] = new_index[nodes["left_child"][internal]]
+    nodes["right_child"][internal] = new_index[nodes["right_child"][internal]]
+
+    state.update(
+        nodes=nodes,
+        values=np.ascontiguousarray(values[keep]),
+        node_count=int(keep.sum()),
+        max_depth=int(min(state["max_depth"], max_depth)),
+    )
+    tree.__setstate__(state)
+
+
+def cap_depth(forest, max_depth):
+    """
+    Copy of ``forest`` with every tree cut at ``max_depth``.
+    """
+    capped = copy.deepcopy(forest)
+    for est in capped.estimators_:
+        _cap_tree(est.tree_, max_depth)
+        est.max_depth = max_depth
+    capped.max_depth = max_depth
+    return capped
+
+
+def _jitter(X, n_samples, scale, rng):
+    """
+    ``n_samples`` training rows resampled with Gaussian noise (``scale`` ×
+    each feature's std), so the student sees the forest between the rows.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    base = X[rng.integers(0, len(X), n_samples)]
+    noise = rng.normal(0.0, 1.0, base.shape) * X.std(axis=0) * scale
+    lo, hi = X.min(axis=0), X.max(axis=0)
+    return np.clip(base + noise, lo, hi)
+
+
+def distill(forest, X_train, student="boosted", n_synthetic=5_000, scale=0.1, random_state=RANDOM_STATE):
+    """
+    Fit a compact student to the forest's probabilities.
+
+    Parameters
+    ----------
+    forest : sklearn.ensemble.RandomForestClassifier
+        Teacher model.
+    X_train : pandas.DataFrame
+        Training rows (model features).
+    student : {'boosted', 'linear'}, optional
+        Student model. Defaults to 'boosted'.
+    n_synthetic : int, optional
+        Jittered rows added to the training rows. Defaults to 5,000.
+    scale : float, optional
+        Jitter size as a share of each feature's std. Defaults to 0.1.
+
+    Returns
+    -------
+    sklearn estimator
+        Fitted student with ``predict_proba``.
+    """
+    rng = np.random.default_rng(random_state)
+    X = np.vstack([np.asarray(X_train, dtype=np.float64), _jitter(X_train, n_synthetic, scale, rng)])
+    X = pd.DataFrame(X, columns=X_train.columns)
+    p = forest.predict_proba(X)[:, 1]
+
+    # soft labels: each row once as class 1 (weight p) and once as class 0
+    X_soft = pd.concat([X, X], ignore_index=True)
+    y_soft = np.r_[np.ones(len(X), dtype=int), np.zeros(len(X), dtype=int)]
+    w_soft = np.r_[p, 1 - p]
+
+    if student == "boosted":
+        model = HistGradientBoostingClassifier(
+            max_iter=200, learning_rate=0.1, max_leaf_nodes=15, random_state=random_state
+        )
+        model.fit(X_soft, y_soft, sample_weight=w_soft)
+    elif student == "linear":
+        model = Pipeline(
+            [
+                ("scaler", StandardScaler()),
+                ("clf", LogisticRegression(max_iter=2000, random_state=random_state)),
+            ]
+        )
+        model.fit(X_soft, y_soft, clf__sample_weight=w_soft)
+    else:
+        raise ValueError(f"Unknown student '{student}'. Use 'boosted' or 'linear'.")
+    return model
+
+
+# --- Measurement ----------------------------------------------------------------
+
+
+def model_size_and_load(model, repeats=3):
+    """
+    Pickle size (bytes) and median ``joblib.load`` time (seconds).
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "model.pkl"
+        joblib.dump(model, path)
+        size = path.stat().st_size
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            joblib.load(path)
+            times.append(time.perf_counter() - start)
+    return size, float(np.median(times))
+
+
+def single_row_latency(model, X, n_calls=200, random_state=RANDOM_STATE):
+    """
+    p50 and p99 latency (seconds) of one-row ``predict_proba`` calls, the
+    way the app scores a slider move.
+    """
+    rng = np.random.default_rng(random_state)
+    rows = rng.integers(0, len(X), n_calls)
+    model.predict_proba(X.iloc[[0]])   # warm-up
+    times = np.empty(n_calls)
+    for i, r in enumerate(rows):
+        start = time.perf_counter()
+        model.predict_proba(X.iloc[[r]])
+        times[i] = time.perf_counter() - start
+    return float(np.percentile(times, 50)), float(np.percentile(times, 99))
+
+
+def _n_nodes(model):
+    if hasattr(model, "estimators_"):
+        return int(sum(est.tree_.node_count for est in model.estimators_))
+    return np.nan
+
+
+def compaction_report(options, X_test, y_test, reference, latency_calls=200):
+    """
+    Score each option against the test split and the full forest.
+
+    Parameters
+    ----------
+    options : dict
+        {name: fitted model}. Must include ``reference``.
+    X_test, y_test : pandas.DataFrame, pandas.Series
+        Test split.
+    reference : str
+        Name of the full model (baseline for PR-AUC drop and agreement).
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per option: trees, nodes, size (KB), load time (ms), p50/p99
+        latency (ms), PR-AUC, PR-AUC drop and agreement with the reference's
+        labels at 0.5.
+    """
+    ref_pred = options[reference].predict_proba(X_test)[:, 1] > 0.5
+    ref_auc = evaluate_pr(reference, y_test, options[reference].predict_proba(X_test)[:, 1],
+                          plot=False, verbose=False)
+    rows = []
+    for name, model in options.items():
+        proba = model.predict_proba(X_test)[:, 1]
+        pr_auc = evaluate_pr(name, y_test, proba, plot=False, verbose=False)
+        size, load = model_size_and_load(model)
+        p50, p99 = single_row_latency(model, X_test, n_calls=latency_calls)
+        rows.append(
+            {
+                "option": name,
+                "trees": len(getattr(model, "estimators_", [])) or np.nan,
+                "nodes": _n_nodes(model),
+                "size_kb": size / 1024,
+                "load_ms": load * 1000,
+                "p50_ms": p50 * 1000,
+                "p99_ms": p99 * 1000,
+                "PR-AUC": pr_auc,
+                "PR-AUC drop": ref_auc - pr_auc,
+                "agreement": float(((proba > 0.5) == ref_pred).mean()),
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+def select_model(report, tolerance=0.01, forests_only=False):
+    """
+    Name of the smallest option whose PR-AUC is within ``tolerance`` of the
+    full forest's (only forests, which the app can compile, if
+    ``forests_only``).
+    """
+    ok = report[report["PR-AUC drop"] <= tolerance]
+    if forests_only:
+        ok = ok[ok["trees"].notna()]
+    return ok.sort_values(["size_kb", "p50_ms"]).iloc[0]["option"]
+
+
+def build_options(forest, X_train, trees=(25, 50, 100, 200), depths=(6, 8, 10), students=("boosted", "linear")):
+    """
+    The full forest plus every requested compaction of it.
+    """
+    options = {"full": forest}
+    for n in trees:
+        if n < len(forest.estimators_):
+            options[f"prune_{n}"] = prune_trees(forest, n)
+    max_depth = max(est.tree_.max_depth for est in forest.estimators_)
+    for d in depths:
+        if d < max_depth:
+            options[f"depth_{d}"] = cap_depth(forest, d)
+    for s in students:
+        options[f"distill_{s}"] = distill(forest, X_train, student=s)
+    return options
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and compare compact versions of the EWS model.")
+    parser.add_argument("--model", type=Path, default=MODEL_PATH, help="forest to compact")
+    parser.add_argument("--trees", type=int, nargs="*", default=[25, 50, 100, 200], help="tree counts to keep")
+    parser.add_argument("--depths", type=int, nargs="*", default=[6, 8, 10], help="depth caps")
+    parser.add_argument("--students", nargs="*", default=["boosted", "linear"], help="distilled students")
+    parser.add_argument("--tolerance", type=float, default=0.01, help="allowed PR-AUC drop")
+    parser.add_argument("--latency-calls", type=int, default=200, help="one-row calls timed per option")
+    parser.add_argument("--forests-only", action="store_true", help="only select forests (app-servable)")
+    parser.add_argument("--report", type=Path, default=None, help="write the report to this .csv")
+    parser.add_argument("--save", type=Path, default=None, help="save the selected model here")
+    args = parser.parse_args(argv)
+
+    forest = joblib.load(args.model)
+    X_train, X_test, y_train, y_test = load_final_split(list(forest.feature_names_in_))
+
+    start = time.perf_counter()
+    options = build_options(forest, X_train, args.trees, args.depths, args.students)
+    report = compaction_report(options, X_test, y_test, "full", latency_calls=args.latency_calls)
+    print(f"✅ {len(options)} options built and measured in {time.perf_counter() - start:.1f}s\n")
+
+    with pd.option_context("display.width", 160, "display.precision", 3):
+        print(report.to_string(index=False))
+
+    chosen = select_model(report, args.tolerance, forests_only=args.forests_only)
+    print(f"\nℹ️ Smallest option within {args.tolerance:.3f} PR-AUC of the full model: {chosen}")
+
+    if args.report:
+        report.to_csv(args.report, index=False)
+        print(f"[saved] {args.report}")
+    if args.save:
+        joblib.dump(options[chosen], args.save)
+        print(f"[saved] {args.save}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""
+Parallel model-comparison harness.
+
+Notebooks 03, 04 and 05 each rebuild X/y and then fit their classifiers one
+after another. Along the way they refit a ``StandardScaler`` and run
+``evaluate_pr`` (with a plot) for every model. The harness does the same
+comparison in one command:
+
+- each dataset's feature matrix is built once, as a float array;
+- stratified split (or fold) indices are computed once and cached on disk
+  under ``data/cache/splits``. The cache key is the dataset's content
+  hash plus the split settings. The holdout split is the notebooks' 80/20
+  split;
+- standardized matrices for the scaled models are computed once per split
+  and shared by every model that needs them;
+- every (dataset, model, fold) fit runs in a process pool, and the results
+  form one comparison table with fit and predict timings.
+
+Usage (from ``code_library/``):
+
+    python model_harness.py                          # datasets 02, 03, 04, holdout split
+    python model_harness.py --datasets 03 --folds 5  # stratified 5-fold CV
+    python model_harness.py --models "Random Forest" "Logistic Regression" --jobs 4
+    python model_harness.py --top-features --output ../media/modeling/comparison.csv
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.model_selection import RepeatedStratifiedKFold, StratifiedKFold, train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from modeling import (
+    DATASETS,
+    METRIC_COLS,
+    RANDOM_STATE,
+    SCALED_MODELS,
+    TEST_SIZE,
+    candidate_models,
+    load_top_features,
+    load_xy,
+    score_metrics,
+)
+from stage_cache import CACHE_DIR, cache_key
+
+SPLITS_DIR = CACHE_DIR / "splits"
+
+# slowest models first, so the pool is not left waiting on one long fit
+FIT_ORDER = ["Random Forest", "Gradient Boosting", "XGBoost", "LightGBM", "Linear SVM"]
+
+
+# --- Splits --------------------------------------------------------------------
+
+
+def split_indices(y, folds=None, test_size=TEST_SIZE, random_state=RANDOM_STATE, repeats=1):
+    """
+    Stratified (train, test) index pairs.
+
+    ``folds=None`` gives the notebooks' single 80/20 holdout split (the same
+    rows as ``train_test_split(X, y, ...)``); an integer gives stratified
+    k-fold splits, repeated ``repeats`` times with different shuffles
+    (repeat ``r`` holds splits ``r * folds`` to ``(r + 1) * folds - 1``).
+    """
+    y = np.asarray(y)
+    if not folds:
+        train, test = train_test_split(
+            np.arange(len(y)), test_size=test_size, random_state=random_state, stratify=y
+        )
+        return [(train, test)]
+    if repeats > 1:
+        skf = RepeatedStratifiedKFold(n_splits=folds, n_repeats=repeats, random_state=random_state)
+    else:
+        skf = StratifiedKFold(n_splits=folds, shuffle=True, random_state=random_state)
+    return list(skf.split(np.zeros(len(y)), y))
+
+
+def cached_split_indices(dataset, y, folds=None, test_size=TEST_SIZE,
+                         random_state=RANDOM_STATE, repeats=1, cache_dir=SPLITS_DIR):
+    """
+    ``split_indices`` for a dataset file, read from the on-disk cache when
+    the file and the split settings are unchanged.
+    """
+    path = DATASETS.get(str(dataset), dataset)
+    params = {"folds": folds, "test_size": test_size, "random_state": random_state}
+    if repeats > 1:
+        params["repeats"] = repeats
+    key = cache_key([path], params)
+    cache_path = Path(cache_dir) / f"{Path(path).stem}_{key[:16]}.npz"
+    if cache_path.exists():
+        with np.load(cache_path) as f:
+            return [(f[f"train_{i}"], f[f"test_{i}"]) for i in range(len(f.files) // 2)]
+
+    splits = split_indices(y, folds, test_size, random_state, repeats)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    arrays = {}
+    for i, (train, test) in enumerate(splits):
+        arrays[f"train_{i}"], arrays[f"test_{i}"] = train, test
+    np.savez(cache_path, **arrays)
+    return splits
+
+
+def prepare_dataset(dataset, features=None, folds=None, repeats=1):
+    """
+    Build a dataset's matrices once: features as a float array, labels, the
+    split indices and the standardized copy of each split.
+
+    Returns
+    -------
+    dict
+        'X', 'y', 'features', 'splits' [(train, test)], and 'scaled'
+        [(X_train_std, X_test_std)] aligned with 'splits'.
+    """
+    X_df, y = load_xy(dataset, features=features)
+    X = X_df.to_numpy(dtype=np.float64)
+    y = y.to_numpy()
+    splits = cached_split_indices(dataset, y, folds, repeats=repeats)
+
+    scaled = []
+    for train, test in splits:
+        scaler = StandardScaler().fit(X[train])
+        scaled.append((scaler.transform(X[train]), scaler.transform(X[test])))
+
+    return {
+        "X": X,
+        "y": y,
+        "features": list(X_df.columns),
+        "splits": splits,
+        "scaled": scaled,
+    }
+
+
+# --- Fitting ---------------------------------------------------------------------
+
+# prepared datasets held by each worker process (set once by _init_worker)
+_worker_data = None
+
+
+def _init_worker(prepared):
+    global _worker_data
+    _worker_data = prepared
+
+
+def fit_predict(dataset, name, fold):
+    """
+    Fit one model on one split of one dataset (in a worker).
+
+    Returns
+    -------
+    y_proba : numpy.ndarray
+        Class-1 probabilities for the split's test rows.
+    fit_s, predict_s : float
+        Seconds spent fitting and predicting.
+    """
+    data = _worker_data[dataset]
+    train, test = data["splits"][fold]
+    y_train = data["y"][train]
+
+    if name in SCALED_MODELS:
+        X_train, X_test = data["scaled"][fold]
+    else:
+        X_train, X_test = data["X"][train], data["X"][test]
+
+    # one thread per model: the pool already runs one fit per core
+    model = clone(candidate_models(y_train, n_jobs=1, verbose=False)[name])
+
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    y_proba = model.predict_proba(X_test)[:, 1]
+    predict_s = time.perf_counter() - start
+    return y_proba, fit_s, predict_s
+
+
+def _fit_one(task):
+    """
+    Fit one model on one split of one dataset and score it.
+    """
+    dataset, name, fold = task
+    y_proba, fit_s, predict_s = fit_predict(dataset, name, fold)
+    data = _worker_data[dataset]
+    y_test = data["y"][data["splits"][fold][1]]
+    return {
+        "Dataset": dataset,
+        "Model": name,
+        "Fold": fold,
+        **score_metrics(y_test, y_proba),
+        "Fit (s)": fit_s,
+        "Predict (s)": predict_s,
+    }
+
+
+def compare_models(datasets=("02", "03", "04"), models=None, folds=None,
+                   features=None, jobs=None, prepared=None):
+    """
+    Fit and score every candidate model on every dataset, in parallel.
+
+    Parameters
+    ----------
+    datasets : iterable of str, optional
+        Keys of ``DATASETS``. Defaults to ('02', '03', '04').
+    models : list of str, optional
+        Model names from ``candidate_models``. Defaults to all of them.
+    folds : int, optional
+        Stratified k-fold CV instead of the 80/20 holdout split.
+    features : list of str, optional
+        Restrict every dataset to these columns (e.g. the top-15 features).
+    jobs : int, optional
+        Worker processes. Defaults to the number of CPU cores.
+    prepared : dict, optional
+        Output of ``prepare_dataset`` per dataset, to reuse across calls.
+
+    Returns
+    -------
+    results : pandas.DataFrame
+        One row per (dataset, model): mean precision, recall, F1 and PR-AUC
+        (plus the PR-AUC std across folds when ``folds`` is set) and mean
+        fit / predict seconds, best PR-AUC first within each dataset.
+    runs : pandas.DataFrame
+        One row per (dataset, model, fold).
+    """
+    datasets = [str(d) for d in datasets]
+    prepared = prepared or {d: prepare_dataset(d, features, folds) for d in datasets}
+
+    available = list(candidate_models(prepared[datasets[0]]["y"], verbose=True))
+    names = [m for m in (models or available) if m in available]
+    missing = sorted(set(models or []) - set(available))
+    if missing:
+        print(f"⚠️ Unknown or unavailable models skipped: {missing}")
+
+    names.sort(key=lambda n: FIT_ORDER.index(n) if n in FIT_ORDER else len(FIT_ORDER))
+    tasks = [
+        (d, name, fold)
+        for name in names
+        for d in datasets
+        for fold in range(len(prepared[d]["splits"]))
+    ]
+    jobs = jobs or os.cpu_count() or 1
+
+    if jobs == 1 or len(tasks) <= 1:
+        _init_worker(prepared)
+        rows = [_fit_one(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=min(jobs, len(tasks)), initializer=_init_worker, initargs=(prepared,)
+        ) as pool:
+            rows = list(pool.map(_fit_one, tasks))
+
+    runs = pd.DataFrame(rows)
+    grouped = runs.groupby(["Dataset", "Model"], sort=False)
+    results = grouped[METRIC_COLS + ["Fit (s)", "Predict (s)"]].mean()
+    if folds:
+        results.insert(len(METRIC_COLS), "PR-AUC std", grouped["PR-AUC"].std())
+    results = (
+        results.reset_index()
+        .sort_values(["Dataset", "PR-AUC"], ascending=[True, False])
+        .reset_index(drop=True)
+    )
+    return results, runs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare candidate models across datasets in parallel.")
+    parser.add_argument("--datasets", nargs="*", default=["02", "03", "04"], help="dataset keys")
+    parser.add_argument("--models", nargs="*", default=None, help="model names (default: all)")
+    parser.add_argument("--folds", type=int, default=None, help="stratified k-fold instead of holdout")
+    parser.add_argument("--top-features", action="store_true", help="use models/top_features.pkl columns")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--output", type=Path, default=None, help="write the table to this .csv")
+    args = parser.parse_args(argv)
+
+    features = load_top_features() if args.top_features else None
+
+    start = time.perf_counter()
+    results, runs = compare_models(
+        args.datasets, models=args.models, folds=args.folds, features=features, jobs=args.jobs
+    )
+    print(f"✅ {len(runs):,} fits in {time.perf_counter() - start:.1f}s\n")
+
+    with pd.option_context("display.width", 160, "display.precision", 3):
+        print(results.to_string(index=False))
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        results.to_csv(args.output, index=False)
+        print(f"[saved] {args.output}")
+
+
+if __name__ == "__main__":
+    main()
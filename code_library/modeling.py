@@ -0,0 +1,301 @@
+"""
+Shared modeling helpers for notebooks 03–05 and the modeling tools.
+
+Notebooks 03, 04 and 05 each repeat the same setup: load a modeling pickle,
+build the ``low_grad_rate`` target, drop the leakage columns, make the
+stratified 80/20 split and report results with ``evaluate_pr``. This module
+holds that setup once so the compaction, comparison, tuning, selection and
+evaluation tools all train and score on exactly the data the notebooks use.
+
+Usage (from ``code_library/``):
+
+    from modeling import load_final_split, evaluate_pr
+
+    X_train, X_test, y_train, y_test = load_final_split()
+"""
+
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import (
+    average_precision_score,
+    classification_report,
+    f1_score,
+    precision_recall_curve,
+    precision_score,
+    recall_score,
+)
+from sklearn.model_selection import train_test_split
+from sklearn.naive_bayes import GaussianNB
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.svm import LinearSVC
+from sklearn.tree import DecisionTreeClassifier
+
+CODE_DIR = Path(__file__).resolve().parent
+ROOT_DIR = CODE_DIR.parent
+DATA_DIR = ROOT_DIR / "data"
+MODELS_DIR = ROOT_DIR / "models"
+
+MODEL_PATH = MODELS_DIR / "random_forest_ews.pkl"
+FEATURES_PATH = MODELS_DIR / "top_features.pkl"
+
+# modeling datasets by notebook prefix
+DATASETS = {
+    "02": DATA_DIR / "02_modeling_with_climate.pkl",
+    "03": DATA_DIR / "03_modeling_all_counties_no_climate.pkl",
+    "04": DATA_DIR / "04_modeling_safety_only.pkl",
+}
+FINAL_DATASET = "03"   # the final model (notebook 05) is trained on 03
+
+RANDOM_STATE = 42
+TEST_SIZE = 0.20
+
+TARGET = "low_grad_rate"
+# columns that leak the label or are the label itself
+LEAKAGE = [TARGET, "high_grad_rate", "graduation_rate"]
+
+# final Random Forest settings (notebook 05)
+RF_PARAMS = dict(
+    n_estimators=400,
+    max_depth=None,
+    min_samples_leaf=3,
+    class_weight="balanced_subsample",
+    n_jobs=-1,
+    random_state=RANDOM_STATE,
+)
+
+METRIC_COLS = ["Precision", "Recall", "F1-Score", "PR-AUC"]
+
+# models notebooks 03/04 fit on standardized inputs (a StandardScaler step)
+SCALED_MODELS = {"Logistic Regression"}
+
+
+# --- Data ------------------------------------------------------------------------
+
+
+def load_xy(dataset=FINAL_DATASET, features=None):
+    """
+    Load a modeling dataset as (X, y), as in the notebooks.
+
+    Parameters
+    ----------
+    dataset : str or Path, optional
+        Key of ``DATASETS`` ('02', '03', '04') or a pickle path.
+        Defaults to the final dataset ('03').
+    features : list of str, optional
+        Keep only these columns (e.g. the top-15 features).
+
+    Returns
+    -------
+    X : pandas.DataFrame
+        Features with the leakage columns dropped.
+    y : pandas.Series
+        ``low_grad_rate`` (1 = graduation rate below 90%).
+    """
+    path = DATASETS.get(str(dataset), dataset)
+    df = pd.read_pickle(path)
+
+    if TARGET in df.columns:
+        y = df[TARGET].astype(int)
+    else:
+        if "graduation_rate" not in df.columns:
+            raise KeyError("No 'graduation_rate' or 'low_grad_rate' column found.")
+        y = (df["graduation_rate"] < 90).astype(int)
+
+    X = df.drop(columns=[c for c in LEAKAGE if c in df.columns])
+    if features is not None:
+        X = X[list(features)]
+    return X, y
+
+
+def split_xy(X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE):
+    """
+    Stratified train/test split (same call as the notebooks).
+
+    Returns
+    -------
+    X_train, X_test, y_train, y_test
+    """
+    return train_test_split(
+        X, y, test_size=test_size, random_state=random_state, stratify=y
+    )
+
+
+def load_top_features(path=FEATURES_PATH):
+    return list(joblib.load(path))
+
+
+def load_final_split(features=None):
+    """
+    Notebook 05's split: dataset 03, stratified 80/20, reduced to the top
+    features (``models/top_features.pkl`` unless ``features`` is given).
+
+    The split depends only on the row count and ``y``, so the rows match the
+    ones the final model was trained and tested on.
+    """
+    features = load_top_features() if features is None else features
+    X, y = load_xy(FINAL_DATASET, features=features)
+    return split_xy(X, y)
+
+
+# --- Evaluation ------------------------------------------------------------------
+
+
+def score_metrics(y_true, y_proba, threshold=0.5):
+    """
+    Precision, recall and F1 at ``threshold`` plus PR-AUC (one comparison
+    table row, as in notebook 05).
+    """
+    y_pred = (np.asarray(y_proba) > threshold).astype(int)
+    return {
+        "Precision": precision_score(y_true, y_pred, zero_division=0),
+        "Recall": recall_score(y_true, y_pred, zero_division=0),
+        "F1-Score": f1_score(y_true, y_pred, zero_division=0),
+        "PR-AUC": average_precision_score(y_true, y_proba),
+    }
+
+
+def evaluate_pr(model_name, y_true, y_proba, plot=True, verbose=True, threshold=0.5):
+    """
+    Print the classification report at ``threshold`` and PR-AUC, optionally
+    plotting the precision–recall curve.
+
+    Parameters
+    ----------
+    model_name : str
+        Title for the report and plot.
+    y_true : array-like
+        True labels.
+    y_proba : array-like
+        Predicted probabilities for class 1.
+    plot : bool, optional
+        Draw the PR curve (needs matplotlib). Defaults to True.
+    verbose : bool, optional
+        Print the report. Defaults to True.
+    threshold : float, optional
+        Probability above which the report counts a prediction as class 1.
+        Defaults to 0.5 (see ``thresholds.py`` for choosing another).
+
+    Returns
+    -------
+    float
+        PR-AUC (average precision).
+    """
+    pr_auc = average_precision_score(y_true, y_proba)
+
+    if verbose:
+        y_pred = (np.asarray(y_proba) > threshold).astype(int)
+        print(f"===== {model_name} =====")
+        print(classification_report(y_true, y_pred, digits=3))
+        print("PR-AUC:", round(pr_auc, 4))
+
+    if plot:
+        import matplotlib.pyplot as plt
+
+        precision, recall, _ = precision_recall_curve(y_true, y_proba)
+        plt.figure(figsize=(5, 4))
+        plt.plot(recall, precision)
+        plt.xlabel("Recall")
+        plt.ylabel("Precision")
+        plt.title(f"Precision-Recall Curve: {model_name} (AP={pr_auc:.3f})")
+        plt.grid(True)
+        plt.show()
+
+    return pr_auc
+
+
+# --- Candidate models ------------------------------------------------------------
+
+
+def candidate_models(y_train, random_state=RANDOM_STATE, n_jobs=-1, verbose=True):
+    """
+    The classifiers compared in notebooks 03 and 04, with their settings.
+
+    Models in ``SCALED_MODELS`` are returned without their ``StandardScaler``
+    step; callers fit them on standardized inputs. XGBoost and LightGBM are
+    skipped (with a note) when the package is not installed.
+
+    Parameters
+    ----------
+    y_train : array-like
+        Training labels (XGBoost's ``scale_pos_weight`` uses the class ratio).
+    random_state : int, optional
+        Seed for every model that takes one.
+    n_jobs : int, optional
+        Threads for models that support them. Defaults to -1 (all cores);
+        use 1 when models are already fitted in parallel processes.
+    verbose : bool, optional
+        Note skipped optional models. Defaults to True.
+
+    Returns
+    -------
+    dict
+        {model name: unfitted estimator}.
+    """
+    y_train = np.asarray(y_train)
+    models = {
+        "Logistic Regression": LogisticRegression(
+            class_weight="balanced", max_iter=2000, random_state=random_state
+        ),
+        "Decision Tree": DecisionTreeClassifier(
+            class_weight="balanced", max_depth=None, min_samples_leaf=5, random_state=random_state
+        ),
+        "Random Forest": RandomForestClassifier(
+            **dict(RF_PARAMS, n_jobs=n_jobs, random_state=random_state)
+        ),
+    }
+
+    try:
+        from xgboost import XGBClassifier
+
+        models["XGBoost"] = XGBClassifier(
+            n_estimators=400,
+            max_depth=4,
+            learning_rate=0.05,
+            subsample=0.8,
+            colsample_bytree=0.8,
+            scale_pos_weight=(len(y_train) / y_train.sum()),
+            random_state=random_state,
+            eval_metric="logloss",
+            n_jobs=n_jobs,
+        )
+    except ImportError:
+        if verbose:
+            print("ℹ️ xgboost not installed; skipping XGBoost.")
+
+    try:
+        from lightgbm import LGBMClassifier
+
+        models["LightGBM"] = LGBMClassifier(
+            n_estimators=400,
+            learning_rate=0.05,
+            max_depth=-1,
+            subsample=0.9,
+            colsample_bytree=0.9,
+            class_weight="balanced",
+            random_state=random_state,
+            n_jobs=n_jobs,
+            verbose=-1,
+        )
+    except ImportError:
+        if verbose:
+            print("ℹ️ lightgbm not installed; skipping LightGBM.")
+
+    models.update(
+        {
+            "Gradient Boosting": GradientBoostingClassifier(
+                n_estimators=300, learning_rate=0.05, max_depth=3, random_state=random_state
+            ),
+            "Linear SVM": CalibratedClassifierCV(
+                LinearSVC(class_weight="balanced", random_state=random_state)
+            ),
+            "Naive Bayes": GaussianNB(),
+            "KNN": KNeighborsClassifier(n_neighbors=5),
+        }
+    )
+    return models
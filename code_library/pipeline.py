@@ -0,0 +1,379 @@
+"""
+Incremental runner for the notebook pipeline (stages 00–06).
+
+Each notebook is declared as a task with the files it reads and writes. A task
+is skipped when the content hash of its inputs (data files, ``helper.py`` and
+the notebook's own code cells) matches the hash recorded on its last
+successful run and all of its outputs still exist. Tasks whose upstream tasks
+are done run in parallel, each notebook in its own kernel process, so e.g. the
+no-climate and safety-only model comparisons run side by side.
+
+Usage (from ``code_library/``):
+
+    python pipeline.py                  # run whatever is out of date
+    python pipeline.py model            # bring 'model' and its upstream up to date
+    python pipeline.py --dry-run        # show what would run
+    python pipeline.py --force --jobs 4
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from stage_cache import CACHE_DIR, cache_key
+
+CODE_DIR = Path(__file__).resolve().parent
+ROOT_DIR = CODE_DIR.parent
+DATA_DIR = ROOT_DIR / "data"
+RAW_DIR = DATA_DIR / "raw_pickle"
+MODELS_DIR = ROOT_DIR / "models"
+
+STATE_PATH = CACHE_DIR / "pipeline_state.json"
+RUNS_DIR = CACHE_DIR / "runs"
+
+CA_DOE = DATA_DIR / "public_data" / "ca_doe"
+CDE = DATA_DIR / "public_data" / "cde"
+CA_SCHLS = DATA_DIR / "public_data" / "ca_schls"
+
+RAW_PICKLES = [
+    RAW_DIR / f"raw_{name}.pkl"
+    for name in [
+        "acgr",
+        "chronic_absent",
+        "absent_reason",
+        "school_data",
+        "frpm",
+        "cbeds",
+        "student_staff_ratio",
+        "staff_edu",
+        "staff_exp",
+        "school_enroll",
+        "safety_percept_grade",
+        "safety_connect",
+    ]
+]
+
+
+# --- Task declarations ---------------------------------------------------------
+
+TASKS = {
+    "ingest": {
+        "notebook": "00_data_collection.ipynb",
+        "inputs": [
+            CA_DOE / "acgr21.txt",
+            CDE / "chronicabsenteeism21.txt",
+            CDE / "absenteeismreason22-v3.txt",
+            CDE / "pubschls.xlsx",
+            CDE / "frpm2122_v2.xlsx",
+            CDE / "cbedsora21b.txt",
+            CDE / "strat2122.txt",
+            CDE / "sted2122.txt",
+            CDE / "stex2122.txt",
+            CDE / "enr202022-v2.txt",
+            CA_SCHLS / "Kidsdata-Perceptions-of-School-Safety--by-Grade-Level--2017.xls",
+            CA_SCHLS / "Kidsdata-Perceptions-of-School-Safety--by-Level-of-School-C.xls",
+        ],
+        "outputs": RAW_PICKLES,
+    },
+    "prepare": {
+        "notebook": "01_data_preparation.ipynb",
+        "inputs": RAW_PICKLES,
+        "outputs": [DATA_DIR / "01_combined_eda_dataset.pkl"],
+    },
+    "modeling_datasets": {
+        "notebook": "02_data_exploration.ipynb",
+        "inputs": [DATA_DIR / "01_combined_eda_dataset.pkl"],
+        "outputs": [
+            DATA_DIR / "02_modeling_with_climate.pkl",
+            DATA_DIR / "03_modeling_all_counties_no_climate.pkl",
+            DATA_DIR / "04_modeling_safety_only.pkl",
+            DATA_DIR / "05_raw_combined_with_ids.pkl",
+        ],
+    },
+    "compare_no_climate": {
+        "notebook": "03_modeling_counties.ipynb",
+        "inputs": [DATA_DIR / "03_modeling_all_counties_no_climate.pkl"],
+        "outputs": [],
+    },
+    "compare_safety_only": {
+        "notebook": "04_modeling_safety.ipynb",
+        "inputs": [DATA_DIR / "04_modeling_safety_only.pkl"],
+        "outputs": [],
+    },
+    "model": {
+        "notebook": "05_modeling_counties_reduced.ipynb",
+        "inputs": [DATA_DIR / "03_modeling_all_counties_no_climate.pkl"],
+        "outputs": [
+            MODELS_DIR / "random_forest_ews.pkl",
+            MODELS_DIR / "top_features.pkl",
+        ],
+    },
+    "final_dataset": {
+        "notebook": "06_final_dataset_preparation.ipynb",
+        "inputs": [
+            DATA_DIR / "05_raw_combined_with_ids.pkl",
+            RAW_DIR / "raw_school_data.pkl",
+            MODELS_DIR / "top_features.pkl",
+        ],
+        "outputs": [
+            DATA_DIR / "06_top15_features_w_ids_and_target.pkl",
+            DATA_DIR / "06_top15_features_w_ids_and_target.csv",
+        ],
+    },
+}
+
+# files every notebook imports code from
+SHARED_INPUTS = [
+    CODE_DIR / "helper.py",
+    CODE_DIR / "stage_cache.py",
+    CODE_DIR / "dtype_optimizer.py",
+]
+
+
+# --- Dependency graph ----------------------------------------------------------
+
+
+def task_dependencies(tasks=TASKS):
+    """
+    Return {task: set of upstream tasks}, derived from inputs and outputs.
+    """
+    producers = {}
+    for name, spec in tasks.items():
+        for out in spec["outputs"]:
+            producers[Path(out)] = name
+
+    return {
+        name: {
+            producers[Path(p)]
+            for p in spec["inputs"]
+            if Path(p) in producers and producers[Path(p)] != name
+        }
+        for name, spec in tasks.items()
+    }
+
+
+def select_tasks(targets, tasks=TASKS):
+    """
+    Return the targets plus everything upstream of them.
+    """
+    deps = task_dependencies(tasks)
+    selected, stack = set(), list(targets or tasks)
+    while stack:
+        name = stack.pop()
+        if name not in tasks:
+            raise KeyError(f"Unknown task '{name}'. Available: {list(tasks)}")
+        if name not in selected:
+            selected.add(name)
+            stack.extend(deps[name])
+    return selected
+
+
+# --- Hashing / state -------------------------------------------------------------
+
+
+def notebook_code_hash(path):
+    """
+    Hash only the code cells of a notebook, so executing it (which rewrites
+    outputs and metadata) does not make it look changed.
+    """
+    with open(path, encoding="utf-8") as fh:
+        nb = json.load(fh)
+    code = [
+        "".join(cell["source"]) for cell in nb["cells"] if cell["cell_type"] == "code"
+    ]
+    return cache_key(params={"code": code})
+
+
+def task_hash(name, tasks=TASKS):
+    """
+    Content hash of everything a task reads, or None if an input is missing.
+    """
+    spec = tasks[name]
+    if not all(Path(p).exists() for p in spec["inputs"]):
+        return None
+
+    return cache_key(
+        sources=list(spec["inputs"]) + SHARED_INPUTS,
+        params={
+            "task": name,
+            "notebook": notebook_code_hash(CODE_DIR / spec["notebook"]),
+        },
+    )
+
+
+def load_state(path=STATE_PATH):
+    if not Path(path).exists():
+        return {}
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def save_state(state, path=STATE_PATH):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as fh:
+        json.dump(state, fh, indent=2, sort_keys=True)
+
+
+def outputs_exist(name, tasks=TASKS):
+    return all(Path(p).exists() for p in tasks[name]["outputs"])
+
+
+# --- Execution -------------------------------------------------------------------
+
+
+def run_notebook(notebook, timeout=3600):
+    """
+    Execute a notebook in a fresh kernel (cwd = code_library/).
+
+    The executed copy is written to ``data/cache/runs`` so the tracked
+    notebook is left untouched.
+
+    Returns
+    -------
+    subprocess.CompletedProcess
+    """
+    RUNS_DIR.mkdir(parents=True, exist_ok=True)
+    cmd = [
+        sys.executable, "-m", "jupyter", "nbconvert",
+        "--to", "notebook",
+        "--execute",
+        f"--ExecutePreprocessor.timeout={timeout}",
+        "--output-dir", str(RUNS_DIR),
+        str(CODE_DIR / notebook),
+    ]
+    return subprocess.run(cmd, cwd=CODE_DIR, capture_output=True, text=True)
+
+
+def run_pipeline(targets=None, force=False, jobs=2, dry_run=False, tasks=TASKS):
+    """
+    Bring the selected tasks up to date, skipping unchanged ones.
+
+    Parameters
+    ----------
+    targets : list of str, optional
+        Tasks to bring up to date (with their upstream tasks). Defaults to all.
+    force : bool, optional
+        Re-run every selected task even if its inputs are unchanged.
+    jobs : int, optional
+        Maximum number of notebooks executing at once. Defaults to 2.
+    dry_run : bool, optional
+        Only report which tasks would run. Tasks downstream of a stale task
+        are reported as 'pending'.
+
+    Returns
+    -------
+    dict
+        {task: 'skipped' | 'ran' | 'failed' | 'stale' | 'pending' | 'blocked'
+        | 'unavailable'}
+
+    Notes
+    -----
+    A task whose inputs are not on disk (e.g. the raw CDE downloads, which are
+    not kept in the repo) but whose outputs exist is treated as up to date.
+    If some of its outputs are missing too, the task is 'unavailable': it
+    cannot run here, but that is not a failure, and it does not hold back
+    downstream tasks. Those are judged on their own inputs, so stages can
+    still be rebuilt from the committed pickles.
+    """
+    selected = select_tasks(targets, tasks)
+    all_deps = task_dependencies(tasks)
+    deps = {name: all_deps[name] & selected for name in selected}
+    state = load_state()
+    status = {}
+
+    def ready(name):
+        return all(status.get(d) in ("skipped", "ran", "unavailable") for d in deps[name])
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        running = {}
+        while True:
+            queued = {name for name, _, _ in running.values()}
+            settled = len(status)
+            for name in sorted(selected - set(status) - queued):
+                if not ready(name):
+                    continue
+
+                # rehash even after an upstream rebuild: its outputs may be unchanged
+                input_hash = task_hash(name, tasks)
+                if input_hash is None:
+                    if outputs_exist(name, tasks):
+                        status[name] = "skipped"
+                        print(f"⚠️  {name}: inputs not available, using existing outputs")
+                    else:
+                        status[name] = "unavailable"
+                        print(f"ℹ️  {name}: inputs not available and outputs incomplete, cannot run here")
+                    continue
+
+                fresh = state.get(name, {}).get("input_hash") == input_hash
+                if not force and fresh and outputs_exist(name, tasks):
+                    status[name] = "skipped"
+                    print(f"⏭️  {name}: up to date")
+                elif dry_run:
+                    status[name] = "stale"
+                    print(f"🔁 {name}: would run {tasks[name]['notebook']}")
+                else:
+                    print(f"▶️  {name}: running {tasks[name]['notebook']}")
+                    future = pool.submit(run_notebook, tasks[name]["notebook"])
+                    running[future] = (name, input_hash, time.perf_counter())
+
+            if not running:
+                # tasks settled without running may have readied others
+                if len(status) > settled:
+                    continue
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, input_hash, started = running.pop(future)
+                result = future.result()
+                elapsed = time.perf_counter() - started
+                if result.returncode == 0:
+                    status[name] = "ran"
+                    state[name] = {"input_hash": input_hash, "seconds": round(elapsed, 1)}
+                    save_state(state)
+                    print(f"✅ {name}: finished in {elapsed:.1f}s")
+                else:
+                    status[name] = "failed"
+                    print(f"❌ {name}: failed after {elapsed:.1f}s")
+                    print(result.stderr[-2000:])
+
+    for name in selected - set(status):
+        status[name] = "pending" if dry_run else "blocked"
+
+    return status
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run the EWS notebook pipeline incrementally."
+    )
+    parser.add_argument(
+        "targets", nargs="*", help=f"tasks to bring up to date ({', '.join(TASKS)})"
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="re-run even if inputs are unchanged"
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=2, help="notebooks to run in parallel"
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="only report what would run"
+    )
+    args = parser.parse_args(argv)
+
+    status = run_pipeline(
+        args.targets, force=args.force, jobs=args.jobs, dry_run=args.dry_run
+    )
+    print()
+    for name in TASKS:
+        if name in status:
+            print(f"{name:<22} {status[name]}")
+    return 1 if "failed" in status.values() else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""
+Integer-keyed multi-way join for assembling the school master table.
+
+`01_data_preparation.ipynb` builds ``df_combined`` with a chain of
+``merge(on="cdscode", how="left")`` calls on 14-character string keys. Each
+merge copies the growing frame. This module encodes ``cdscode`` as an int64
+key once, indexes every source on that key, and assembles the wide table in a
+single pass, along with a per-source match report.
+
+Example (same result as the notebook's merge chain):
+
+    from school_join import build_school_table
+
+    df_combined, report = build_school_table(
+        df_schooldata,
+        {
+            "acgr": df_acgr,
+            "chronic_absent": df_chron_abs,
+            "absent_reason": df_abs,
+            "frpm": df_frpm,
+            "ss_ratio": df_ss_ratio,
+            "staff_ed": staff_ed,
+            "staff_exp": df_staff_experience,
+            "enroll": df_enroll_grouped[cols_enroll],
+            "safety": (df_safety[cols_safety], "county"),
+            "connected": (df_connected[cols_connected], "county"),
+        },
+    )
+"""
+
+import numpy as np
+import pandas as pd
+
+# cleaned column names that hold the three parts of a CDS code
+COUNTY_COLS = ["county_code", "countycode"]
+DISTRICT_COLS = ["district_code", "districtcode"]
+SCHOOL_COLS = ["school_code", "schoolcode"]
+
+MISSING_KEY = -1
+
+
+def encode_cdscode(codes):
+    """
+    Encode CDS codes (strings or numbers) as int64 keys.
+
+    Parameters
+    ----------
+    codes : array-like
+        CDS codes such as '01611190130229'. Leading zeros are irrelevant once
+        the code is numeric, so '01611190130229' and 1611190130229 map to the
+        same key.
+
+    Returns
+    -------
+    numpy.ndarray
+        int64 keys, with ``MISSING_KEY`` (-1) for missing or non-numeric codes.
+    """
+    codes = pd.Series(codes)
+    if codes.dtype == object or pd.api.types.is_string_dtype(codes):
+        codes = codes.str.strip()
+    keys = pd.to_numeric(codes, errors="coerce")
+    return keys.fillna(MISSING_KEY).to_numpy(dtype=np.int64)
+
+
+def cdscode_from_parts(county, district, school):
+    """
+    Build int64 CDS keys from county (2), district (5) and school (7) codes.
+
+    This is the arithmetic equivalent of ``zfill`` + string concatenation in
+    ``helper.rpkl``; parts that are missing or non-numeric yield ``MISSING_KEY``.
+    """
+    parts = [
+        pd.to_numeric(pd.Series(p), errors="coerce").to_numpy(dtype=float)
+        for p in (county, district, school)
+    ]
+    keys = parts[0] * 10**12 + parts[1] * 10**7 + parts[2]
+    return np.where(np.isnan(keys), MISSING_KEY, keys).astype(np.int64)
+
+
+def decode_cdscode(keys):
+    """
+    Convert int64 keys back to 14-character CDS code strings.
+    """
+    keys = pd.Series(np.asarray(keys, dtype=np.int64))
+    return keys.astype(str).str.zfill(14).where(keys != MISSING_KEY)
+
+
+def cds_keys(df, key="cdscode"):
+    """
+    Return int64 CDS keys for a DataFrame.
+
+    Uses ``key`` when present, otherwise builds the key from the county,
+    district and school code columns.
+    """
+    if key in df.columns:
+        return encode_cdscode(df[key])
+
+    def find_col(options):
+        return next((c for c in options if c in df.columns), None)
+
+    cols = [find_col(COUNTY_COLS), find_col(DISTRICT_COLS), find_col(SCHOOL_COLS)]
+    if None in cols:
+        raise KeyError(
+            f"DataFrame has no '{key}' column and no county/district/school code columns."
+        )
+    return cdscode_from_parts(*(df[c] for c in cols))
+
+
+def build_school_table(base, sources, key="cdscode"):
+    """
+    Left-join many sources onto a base table in one pass.
+
+    Every source is indexed once on its join key and reindexed to the base
+    rows; all pieces are then concatenated column-wise in a single allocation
+    instead of copying the growing frame once per merge.
+
+    Parameters
+    ----------
+    base : pandas.DataFrame
+        Left table (e.g. school directory data). Its rows and row order are
+        kept as-is.
+    sources : dict
+        Mapping of source name to either a DataFrame (joined on ``key``) or a
+        ``(DataFrame, column)`` tuple to join on another base column, such as
+        ``"county"`` for the county-level CalSCHLS features.
+    key : str, optional
+        CDS code column name. Defaults to 'cdscode'. Sources without it are
+        keyed from their county/district/school code columns.
+
+    Returns
+    -------
+    table : pandas.DataFrame
+        Base columns followed by each source's columns, in the order given.
+    report : pandas.DataFrame
+        One row per source with its row count, unique keys, duplicate keys
+        and the number/share of base rows that found a match.
+
+    Raises
+    ------
+    ValueError
+        If a source column name collides with a column already in the table.
+
+    Notes
+    -----
+    When a source has duplicate keys the first row per key is used, where a
+    plain ``merge`` would duplicate base rows. Duplicates are counted in the
+    report so they can be fixed upstream.
+    """
+    base = base.reset_index(drop=True)
+    base_cds = cds_keys(base, key)
+
+    pieces = [base]
+    seen = set(base.columns)
+    rows = []
+
+    for name, source in sources.items():
+        src, on = source if isinstance(source, tuple) else (source, key)
+
+        if on == key:
+            src_keys = cds_keys(src, key)
+            left_keys = base_cds
+        else:
+            src_keys = src[on].to_numpy()
+            left_keys = base[on].to_numpy()
+
+        data = src.drop(columns=[c for c in (key, on) if c in src.columns])
+        clash = seen.intersection(data.columns)
+        if clash:
+            raise ValueError(
+                f"Source '{name}' repeats columns already joined: {sorted(clash)}"
+            )
+        seen.update(data.columns)
+
+        index = pd.Index(src_keys)
+        dupes = index.duplicated()
+        usable = ~dupes & ~pd.isna(index)
+        if on == key:
+            usable &= index != MISSING_KEY
+        data = data.loc[usable]
+        data.index = index[usable]
+
+        aligned = data.reindex(left_keys)
+        aligned.index = base.index
+        pieces.append(aligned)
+
+        matched = int((data.index.get_indexer(left_keys) >= 0).sum())
+        rows.append(
+            {
+                "source": name,
+                "on": on,
+                "rows": len(src),
+                "unique_keys": int(usable.sum()),
+                "duplicate_keys": int(dupes.sum()),
+                "matched": matched,
+                "match_rate": matched / len(base) if len(base) else np.nan,
+            }
+        )
+
+    table = pd.concat(pieces, axis=1)
+    report = pd.DataFrame(rows)
+    return table, report
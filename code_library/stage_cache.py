@@ -0,0 +1,400 @@
+"""
+Columnar (Arrow/Parquet) cache for pipeline stage datasets.
+
+Each cached stage is stored as one Feather (Arrow IPC) or Parquet file plus a
+small JSON sidecar holding the cache key. The key is a content hash of the
+source files together with the parameters used to build the stage, so a cache
+entry is rebuilt automatically whenever a source file or a cleaning parameter
+changes. Reads can be limited to a subset of columns, and Feather files are
+memory-mapped so only the requested columns are paged in.
+
+Typical use from a notebook in ``code_library/``:
+
+    from stage_cache import cached_stage, read_pickle_columns
+
+    df_cbeds = read_pickle_columns(
+        raw_pickle / "raw_cbeds.pkl",
+        columns=["Cdscode", "Level", "Section", "RowNumber", "Value", "Year"],
+    )
+"""
+
+import hashlib
+import json
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+CACHE_DIR = Path(__file__).resolve().parents[1] / "data" / "cache"
+
+FORMATS = {"feather": ".feather", "parquet": ".parquet"}
+
+
+# --- Hashing -----------------------------------------------------------------
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """
+    Return the SHA-256 hex digest of a file's contents.
+
+    Parameters
+    ----------
+    path : str or pathlib.Path
+        File to hash.
+    chunk_size : int, optional
+        Bytes read per iteration. Defaults to 1 MiB.
+
+    Returns
+    -------
+    str
+        Hex digest of the file contents.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_key(sources=(), params=None):
+    """
+    Build a cache key from source file contents and build parameters.
+
+    Parameters
+    ----------
+    sources : iterable of str or pathlib.Path, optional
+        Files the stage is built from. Their content hashes (not their paths
+        or modification times) go into the key.
+    params : dict, optional
+        Cleaning/filtering parameters. Must be JSON serializable; values that
+        are not are converted with ``str``.
+
+    Returns
+    -------
+    str
+        Hex digest identifying this combination of inputs.
+    """
+    payload = {
+        "sources": [file_hash(p) for p in sources],
+        "params": params or {},
+    }
+    blob = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()
+
+
+# --- Low-level read/write ------------------------------------------------------
+
+
+def _stage_paths(name, cache_dir, fmt):
+    cache_dir = Path(cache_dir)
+    return cache_dir / f"{name}{FORMATS[fmt]}", cache_dir / f"{name}.json"
+
+
+def _read_meta(name, cache_dir):
+    meta_path = Path(cache_dir) / f"{name}.json"
+    if not meta_path.exists():
+        return None
+    with open(meta_path) as fh:
+        return json.load(fh)
+
+
+def _to_arrow(df):
+    """
+    Convert a DataFrame to an Arrow table, coercing mixed-type object columns.
+
+    Excel-sourced stages sometimes hold ints and strings in the same object
+    column, which Arrow cannot type. Those columns are stored as strings with
+    missing values left as nulls.
+    """
+    try:
+        return pa.Table.from_pandas(df)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        pass
+
+    df = df.copy()
+    for col in df.columns[df.dtypes == object]:
+        try:
+            pa.array(df[col], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # stays object dtype (not pandas' string dtype) so it reads back as object
+            df[col] = df[col].map(str, na_action="ignore").astype(object)
+    return pa.Table.from_pandas(df)
+
+
+def _restore_object_columns(df, schema):
+    """
+    Return text columns that were object dtype when written as object again.
+
+    Under pandas 3, Arrow string columns come back as pandas' string dtype;
+    a stage read from the cache should have the same dtypes as the frame
+    that was written (missing values as None, as in the pickle).
+    """
+    written = {
+        c["name"] for c in (schema.pandas_metadata or {}).get("columns", [])
+        if c.get("numpy_type") == "object"
+    }
+    for col in df.columns:
+        if str(col) in written and df[col].dtype != object and pd.api.types.is_string_dtype(df[col]):
+            df[col] = df[col].astype(object).where(df[col].notna(), None)
+    return df
+
+
+def write_stage(df, name, key=None, cache_dir=CACHE_DIR, fmt="feather", extra=None):
+    """
+    Write a DataFrame to the columnar cache.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Stage dataset to store.
+    name : str
+        Cache entry name (e.g. 'raw_cbeds').
+    key : str, optional
+        Cache key from ``cache_key``. Entries without a key are never
+        considered fresh by ``cached_stage``.
+    cache_dir : str or pathlib.Path, optional
+        Cache folder. Defaults to ``data/cache``.
+    fmt : {'feather', 'parquet'}, optional
+        Storage format. Feather is written uncompressed so it can be
+        memory-mapped; Parquet is smaller on disk. Defaults to 'feather'.
+    extra : dict, optional
+        Additional fields stored in the JSON sidecar.
+
+    Returns
+    -------
+    pathlib.Path
+        Path of the written data file.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown cache format '{fmt}'. Use one of {list(FORMATS)}.")
+
+    data_path, meta_path = _stage_paths(name, cache_dir, fmt)
+    data_path.parent.mkdir(parents=True, exist_ok=True)
+
+    table = _to_arrow(df)
+    if fmt == "feather":
+        feather.write_feather(table, data_path, compression="uncompressed")
+    else:
+        pq.write_table(table, data_path)
+
+    meta = {
+        "name": name,
+        "key": key,
+        "format": fmt,
+        "rows": int(len(df)),
+        "columns": [str(c) for c in df.columns],
+    }
+    meta.update(extra or {})
+    with open(meta_path, "w") as fh:
+        json.dump(meta, fh, indent=2)
+
+    return data_path
+
+
+def stage_columns(name, cache_dir=CACHE_DIR):
+    """
+    Return the column names of a cached stage without reading any data.
+    """
+    meta = _read_meta(name, cache_dir)
+    if meta is None:
+        raise FileNotFoundError(f"No cache entry named '{name}' in {cache_dir}")
+    return meta["columns"]
+
+
+def read_stage(name, columns=None, cache_dir=CACHE_DIR, memory_map=True):
+    """
+    Read a cached stage, optionally limited to a subset of columns.
+
+    Parameters
+    ----------
+    name : str
+        Cache entry name.
+    columns : list of str, optional
+        Columns to load. Only these columns are read from disk. Defaults to
+        all columns.
+    cache_dir : str or pathlib.Path, optional
+        Cache folder. Defaults to ``data/cache``.
+    memory_map : bool, optional
+        Memory-map the file instead of reading it into a buffer. Defaults to
+        True.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The cached dataset (or the requested columns of it), with the original
+        row index restored.
+    """
+    meta = _read_meta(name, cache_dir)
+    if meta is None:
+        raise FileNotFoundError(f"No cache entry named '{name}' in {cache_dir}")
+
+    data_path, _ = _stage_paths(name, cache_dir, meta["format"])
+
+    if columns is not None:
+        missing = [c for c in columns if c not in meta["columns"]]
+        if missing:
+            raise KeyError(f"Columns not in cache entry '{name}': {missing}")
+
+        if meta["format"] == "feather":
+            with pa.memory_map(str(data_path)) as source:
+                schema = pa.ipc.open_file(source).schema
+        else:
+            schema = pq.read_schema(data_path)
+
+        # keep the stored index columns so the row labels survive pruning
+        index_cols = [
+            c for c in (schema.pandas_metadata or {}).get("index_columns", [])
+            if isinstance(c, str)
+        ]
+        columns = list(columns) + index_cols
+
+    if meta["format"] == "feather":
+        table = feather.read_table(data_path, columns=columns, memory_map=memory_map)
+    else:
+        table = pq.read_table(data_path, columns=columns, memory_map=memory_map)
+
+    return _restore_object_columns(table.to_pandas(), table.schema)
+
+
+# --- Cached stages -------------------------------------------------------------
+
+
+def is_fresh(name, key, cache_dir=CACHE_DIR):
+    """
+    Return True if a cache entry exists and was written with ``key``.
+    """
+    meta = _read_meta(name, cache_dir)
+    if meta is None or key is None or meta.get("key") != key:
+        return False
+    data_path, _ = _stage_paths(name, cache_dir, meta["format"])
+    return data_path.exists()
+
+
+def cached_stage(
+    name,
+    build,
+    sources=(),
+    params=None,
+    columns=None,
+    cache_dir=CACHE_DIR,
+    fmt="feather",
+):
+    """
+    Return a stage dataset from the cache, rebuilding it when stale.
+
+    Parameters
+    ----------
+    name : str
+        Cache entry name.
+    build : callable
+        Zero-argument function returning the stage DataFrame. Called only when
+        the cache entry is missing or its key no longer matches.
+    sources : iterable of str or pathlib.Path, optional
+        Source files the stage depends on.
+    params : dict, optional
+        Parameters that affect the build (filters, year, column lists...).
+    columns : list of str, optional
+        Columns to return. The full stage is always cached.
+    cache_dir : str or pathlib.Path, optional
+        Cache folder. Defaults to ``data/cache``.
+    fmt : {'feather', 'parquet'}, optional
+        Storage format used when (re)building. Defaults to 'feather'.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The stage dataset (or the requested columns of it).
+
+    Examples
+    --------
+    >>> df_acgr = cached_stage(
+    ...     "raw_acgr",
+    ...     lambda: load_cde_txt(ca_doe / "acgr21.txt", filters=ACGR_FILTERS),
+    ...     sources=[ca_doe / "acgr21.txt"],
+    ...     params={"filters": ACGR_FILTERS},
+    ... )
+    """
+    key = cache_key(sources, params)
+    if not is_fresh(name, key, cache_dir):
+        write_stage(build(), name, key=key, cache_dir=cache_dir, fmt=fmt)
+    return read_stage(name, columns=columns, cache_dir=cache_dir)
+
+
+def _pickle_entry(pkl_path):
+    """
+    Cache entry name for a pickle: its file name plus a hash of its full path,
+    so same-named pickles in different folders get separate entries.
+    """
+    path = Path(pkl_path).resolve()
+    return f"{path.stem}_{hashlib.sha256(str(path).encode('utf-8')).hexdigest()[:12]}"
+
+
+def _pickle_key(pkl_path, cache_dir):
+    """
+    Content hash of a pickle, reusing the stored hash if size/mtime match.
+    """
+    stat = Path(pkl_path).stat()
+    meta = _read_meta(_pickle_entry(pkl_path), cache_dir)
+    if (
+        meta is not None
+        and meta.get("source_size") == stat.st_size
+        and meta.get("source_mtime_ns") == stat.st_mtime_ns
+    ):
+        return meta.get("key"), stat
+    return cache_key([pkl_path]), stat
+
+
+def read_pickle_columns(pkl_path, columns=None, cache_dir=CACHE_DIR):
+    """
+    Read a stage pickle through the columnar cache.
+
+    The first call (or the first call after the pickle changes) loads the
+    pickle once and writes it to the cache. Later calls only read the
+    requested columns from the memory-mapped cache file.
+
+    Parameters
+    ----------
+    pkl_path : str or pathlib.Path
+        Pickle written by an earlier pipeline stage (e.g.
+        ``data/raw_pickle/raw_cbeds.pkl``).
+    columns : list of str, optional
+        Columns to return, using the names stored in the pickle. Defaults to
+        all columns.
+    cache_dir : str or pathlib.Path, optional
+        Cache folder. Defaults to ``data/cache``.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The pickled DataFrame, or the requested columns of it.
+    """
+    name = _pickle_entry(pkl_path)
+    key, stat = _pickle_key(pkl_path, cache_dir)
+
+    if not is_fresh(name, key, cache_dir):
+        write_stage(
+            pd.read_pickle(pkl_path),
+            name,
+            key=key,
+            cache_dir=cache_dir,
+            extra={
+                "source": str(pkl_path),
+                "source_size": stat.st_size,
+                "source_mtime_ns": stat.st_mtime_ns,
+            },
+        )
+
+    return read_stage(name, columns=columns, cache_dir=cache_dir)
+
+
+def pickle_columns(pkl_path, cache_dir=CACHE_DIR):
+    """
+    Return the column names of a stage pickle, caching it if needed.
+    """
+    name = _pickle_entry(pkl_path)
+    key, _ = _pickle_key(pkl_path, cache_dir)
+    if not is_fresh(name, key, cache_dir):
+        read_pickle_columns(pkl_path, columns=[], cache_dir=cache_dir)
+    return stage_columns(name, cache_dir)
@@ -0,0 +1,309 @@
+"""
+Risk cutoff selection: threshold sweep, calibration and the saved cutoff.
+
+Every page and the batch scorer call a school "At Risk" when the forest's
+probability is above 0.5, and ``evaluate_pr`` reports only that cutoff. An
+early-warning system usually works the other way round: catch a given share
+of low-graduation schools, or flag no more schools than staff can follow up.
+This engine picks the cutoff from that goal:
+
+1. **Out-of-fold scores**: the final forest's settings are cross-validated
+   on the training rows, so every training school gets a score from a model
+   that never saw it.
+2. **Sweep**: precision, recall, F1 and alert volume for *every* distinct
+   threshold come from one descending sort and cumulative sums of the
+   labels (O(n log n), no per-threshold loop).
+3. **Calibration**: isotonic or Platt (sigmoid) mapping from forest scores
+   to observed at-risk rates, fitted on the same out-of-fold scores.
+4. **Choice**: the highest cutoff reaching a target recall, the lowest one
+   within an alert budget (share of schools flagged), or the best F1.
+
+The cutoff and calibration are saved as plain numbers and arrays to
+``models/risk_threshold.pkl`` together with the model file's SHA-256. The
+app (``utils.thresholds``) only compares probabilities with the saved cutoff
+and interpolates the calibration, and falls back to 0.5 if the model changes.
+
+Usage (from ``code_library/``):
+
+    python thresholds.py                          # best F1, isotonic calibration
+    python thresholds.py --target-recall 0.85
+    python thresholds.py --alert-budget 0.25 --calibration sigmoid
+    python thresholds.py --target-recall 0.9 --dry-run
+"""
+
+import argparse
+import hashlib
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.isotonic import IsotonicRegression
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import StratifiedKFold, cross_val_predict
+
+from modeling import MODEL_PATH, MODELS_DIR, RANDOM_STATE, RF_PARAMS, load_final_split, score_metrics
+
+THRESHOLD_PATH = MODELS_DIR / "risk_threshold.pkl"
+
+CALIBRATIONS = ["isotonic", "sigmoid", "none"]
+
+
+# --- Sweep -----------------------------------------------------------------------
+
+
+def threshold_sweep(y_true, y_score):
+    """
+    Precision, recall, F1 and alert volume at every distinct threshold.
+
+    A school is flagged when its score is above ``threshold`` (the same rule
+    as ``score_metrics``). Each threshold sits halfway between two adjacent
+    distinct scores, so it is stable to small changes in the scores.
+
+    Parameters
+    ----------
+    y_true : array-like
+        True labels (1 = at risk).
+    y_score : array-like
+        Predicted probabilities for class 1.
+
+    Returns
+    -------
+    pandas.DataFrame
+        'threshold', 'alerts', 'alert_rate', 'tp', 'fp', 'precision',
+        'recall' and 'f1', from the highest threshold (no alerts) down to one
+        that flags every school.
+    """
+    y_true = np.asarray(y_true, dtype=np.int64)
+    y_score = np.asarray(y_score, dtype=np.float64)
+    n = len(y_true)
+
+    order = np.argsort(-y_score, kind="stable")
+    y_sorted, s_sorted = y_true[order], y_score[order]
+    # last position of each group of tied scores
+    ends = np.r_[np.flatnonzero(np.diff(s_sorted) != 0), n - 1]
+
+    tp = np.r_[0, np.cumsum(y_sorted)[ends]]
+    alerts = np.r_[0, ends + 1]
+    fp = alerts - tp
+    positives = max(int(y_true.sum()), 1)
+
+    # flag groups 0..k: cut between group k's score and the next lower one
+    scores = s_sorted[ends]
+    cuts = np.r_[scores[0], (scores[:-1] + scores[1:]) / 2, np.nextafter(scores[-1], -np.inf)]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        precision = np.where(alerts > 0, tp / alerts, 1.0)
+        recall = tp / positives
+        f1 = np.where(tp > 0, 2 * tp / (alerts + positives), 0.0)
+
+    return pd.DataFrame(
+        {
+            "threshold": cuts,
+            "alerts": alerts,
+            "alert_rate": alerts / n,
+            "tp": tp,
+            "fp": fp,
+            "precision": precision,
+            "recall": recall,
+            "f1": f1,
+        }
+    )
+
+
+def choose_threshold(sweep, target_recall=None, alert_budget=None):
+    """
+    Pick one row of ``threshold_sweep``.
+
+    Parameters
+    ----------
+    sweep : pandas.DataFrame
+        Output of ``threshold_sweep``.
+    target_recall : float, optional
+        Highest threshold (fewest alerts) whose recall is at least this.
+    alert_budget : float, optional
+        Lowest threshold (best recall) that flags at most this share of
+        schools (0–1).
+
+    Returns
+    -------
+    (pandas.Series, str)
+        The chosen row and a short description of the rule. With neither
+        option, the row with the best F1.
+    """
+    if target_recall is not None and alert_budget is not None:
+        raise ValueError("Choose the threshold by target_recall or alert_budget, not both.")
+
+    if target_recall is not None:
+        ok = sweep[sweep["recall"] >= target_recall]
+        # recall only grows as the threshold drops, so the last row reaches 1.0
+        return ok.iloc[0], f"recall ≥ {target_recall:.2f}"
+    if alert_budget is not None:
+        ok = sweep[sweep["alert_rate"] <= alert_budget]
+        return ok.iloc[-1], f"alerts ≤ {alert_budget:.0%} of schools"
+    return sweep.loc[sweep["f1"].idxmax()], "best F1"
+
+
+# --- Calibration -----------------------------------------------------------------
+
+
+def fit_calibration(y_true, y_score, method="isotonic"):
+    """
+    Fit a score -> at-risk rate mapping, stored as plain numbers.
+
+    Returns
+    -------
+    dict or None
+        {'method': 'isotonic', 'x', 'y'} (interpolation knots) or
+        {'method': 'sigmoid', 'coef', 'intercept'}; None for 'none'.
+    """
+    y_true = np.asarray(y_true)
+    y_score = np.asarray(y_score, dtype=np.float64)
+
+    if method == "isotonic":
+        iso = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds="clip").fit(y_score, y_true)
+        return {
+            "method": "isotonic",
+            "x": np.asarray(iso.X_thresholds_, dtype=np.float64),
+            "y": np.asarray(iso.y_thresholds_, dtype=np.float64),
+        }
+    if method == "sigmoid":
+        # Platt scaling: logistic regression on the score alone
+        lr = LogisticRegression(C=1e6).fit(y_score.reshape(-1, 1), y_true)
+        return {"method": "sigmoid", "coef": float(lr.coef_[0, 0]), "intercept": float(lr.intercept_[0])}
+    if method == "none":
+        return None
+    raise ValueError(f"Unknown calibration '{method}'. Use one of {CALIBRATIONS}.")
+
+
+def apply_calibration(calibration, y_score):
+    """
+    Calibrated probabilities (same rule as the app's ``RiskThreshold``).
+    """
+    y_score = np.asarray(y_score, dtype=np.float64)
+    if calibration is None:
+        return y_score
+    if calibration["method"] == "isotonic":
+        return np.interp(y_score, calibration["x"], calibration["y"])
+    return 1.0 / (1.0 + np.exp(-(calibration["coef"] * y_score + calibration["intercept"])))
+
+
+def brier(y_true, y_proba):
+    return float(np.mean((np.asarray(y_proba) - np.asarray(y_true)) ** 2))
+
+
+# --- Scores ----------------------------------------------------------------------
+
+
+def out_of_fold_scores(X_train, y_train, folds=5, n_jobs=-1):
+    """
+    Class-1 probabilities for every training row from the final forest's
+    settings, each from the fold that held the row out.
+    """
+    cv = StratifiedKFold(n_splits=folds, shuffle=True, random_state=RANDOM_STATE)
+    model = RandomForestClassifier(**dict(RF_PARAMS, n_jobs=n_jobs))
+    return cross_val_predict(model, X_train, y_train, cv=cv, method="predict_proba")[:, 1]
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def select_threshold(target_recall=None, alert_budget=None, calibration="isotonic",
+                     folds=5, model_path=MODEL_PATH, n_jobs=-1):
+    """
+    Full run: out-of-fold scores, sweep, calibration and the chosen cutoff,
+    checked on the holdout split with the saved model.
+
+    Returns
+    -------
+    artifact : dict
+        What ``save_threshold`` writes: 'threshold', 'rule', 'calibration',
+        'model_sha256', 'metrics' ('oof' and 'holdout') and 'created'.
+    sweep : pandas.DataFrame
+        Out-of-fold ``threshold_sweep``.
+    """
+    X_train, X_test, y_train, y_test = load_final_split()
+    oof = out_of_fold_scores(X_train, y_train.to_numpy(), folds, n_jobs)
+
+    sweep = threshold_sweep(y_train, oof)
+    row, rule = choose_threshold(sweep, target_recall, alert_budget)
+    threshold = float(row["threshold"])
+    cal = fit_calibration(y_train, oof, calibration)
+
+    model = joblib.load(model_path)
+    test_proba = model.predict_proba(X_test)[:, 1]
+    holdout = {
+        **score_metrics(y_test, test_proba, threshold),
+        "Alert rate": float((test_proba > threshold).mean()),
+        "Brier": brier(y_test, test_proba),
+        "Brier (calibrated)": brier(y_test, apply_calibration(cal, test_proba)),
+    }
+
+    artifact = {
+        "threshold": threshold,
+        "rule": rule,
+        "calibration": cal,
+        "model_sha256": file_sha256(model_path),
+        "metrics": {
+            "oof": {
+                "Precision": float(row["precision"]),
+                "Recall": float(row["recall"]),
+                "F1-Score": float(row["f1"]),
+                "Alert rate": float(row["alert_rate"]),
+            },
+            "holdout": {k: float(v) for k, v in holdout.items()},
+        },
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+    return artifact, sweep
+
+
+def save_threshold(artifact, path=THRESHOLD_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    joblib.dump(artifact, path)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Choose and save the EWS risk cutoff.")
+    goal = parser.add_mutually_exclusive_group()
+    goal.add_argument("--target-recall", type=float, default=None, help="share of at-risk schools to catch")
+    goal.add_argument("--alert-budget", type=float, default=None, help="max share of schools flagged (0-1)")
+    parser.add_argument("--calibration", choices=CALIBRATIONS, default="isotonic")
+    parser.add_argument("--folds", type=int, default=5, help="CV folds for the out-of-fold scores")
+    parser.add_argument("--model", type=Path, default=MODEL_PATH, help="model the cutoff is for")
+    parser.add_argument("--output", type=Path, default=THRESHOLD_PATH)
+    parser.add_argument("--sweep-out", type=Path, default=None, help="save the full sweep (.csv)")
+    parser.add_argument("--dry-run", action="store_true", help="report without saving")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    artifact, sweep = select_threshold(
+        args.target_recall, args.alert_budget, args.calibration, args.folds, args.model
+    )
+    print(f"✅ Swept {len(sweep):,} thresholds in {time.perf_counter() - start:.1f}s\n")
+
+    metrics = pd.DataFrame(artifact["metrics"]).T
+    with pd.option_context("display.width", 160, "display.precision", 3):
+        print(metrics.to_string())
+    print(f"\nℹ️ Risk cutoff {artifact['threshold']:.4f} ({artifact['rule']}), "
+          f"calibration: {args.calibration}")
+
+    if args.sweep_out:
+        sweep.to_csv(args.sweep_out, index=False)
+        print(f"[saved] {args.sweep_out}")
+    if not args.dry_run:
+        print(f"[saved] {save_threshold(artifact, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
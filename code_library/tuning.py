@@ -0,0 +1,419 @@
+"""
+Successive-halving / Hyperband hyperparameter search.
+
+Each trial is one configuration for one model family. The families are the
+notebook's Random Forest, sklearn Gradient Boosting, XGBoost and LightGBM,
+and the base settings match notebooks 03 and 05. The resource is the number
+of trees. Every rung scores all live trials on a validation split taken
+from the training rows (the test split stays untouched). The best
+``1 / eta`` of the trials move to the next rung with ``eta`` times more
+trees.
+
+A promoted trial is *grown*, not refit: forests and sklearn boosting use
+``warm_start``, XGBoost continues from its booster (``xgb_model``) and
+LightGBM from its model (``init_model``). Fits in a rung run in a process
+pool across all cores. No new rung or fit is started once the wall-clock
+budget is spent.
+
+Every finished fit is appended to ``<study>.jsonl`` and its model saved
+under ``<study>/models``, both in ``data/cache/tuning``. Re-running the
+same study skips fits already recorded and grows saved models from where
+they stopped, so an interrupted search resumes.
+
+Usage (from ``code_library/``):
+
+    python tuning.py --budget 600                   # Hyperband over all installed families
+    python tuning.py --families rf gb --mode sha --budget 120 --study rf_gb
+    python tuning.py --study rf_gb --budget 120     # resume / extend the same study
+"""
+
+import argparse
+import json
+import math
+import os
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.metrics import average_precision_score
+
+from modeling import RANDOM_STATE, RF_PARAMS, load_final_split, split_xy
+from stage_cache import CACHE_DIR
+
+TUNING_DIR = CACHE_DIR / "tuning"
+
+# family -> (fixed settings, search space, (min trees, max trees))
+SPACES = {
+    "rf": (
+        dict(RF_PARAMS, n_jobs=1),
+        {
+            "max_depth": [None, 8, 12, 16],
+            "min_samples_leaf": [1, 2, 3, 5, 8],
+            "max_features": ["sqrt", 0.5, 0.8],
+            "class_weight": ["balanced_subsample", "balanced", None],
+        },
+        (25, 400),
+    ),
+    "gb": (
+        dict(learning_rate=0.05, max_depth=3, random_state=RANDOM_STATE),
+        {
+            "learning_rate": [0.02, 0.05, 0.1],
+            "max_depth": [2, 3, 4],
+            "subsample": [0.7, 0.85, 1.0],
+            "min_samples_leaf": [1, 5, 10],
+        },
+        (25, 300),
+    ),
+    "xgb": (
+        dict(max_depth=4, learning_rate=0.05, subsample=0.8, colsample_bytree=0.8,
+             eval_metric="logloss", random_state=RANDOM_STATE, n_jobs=1),
+        {
+            "max_depth": [3, 4, 6],
+            "learning_rate": [0.03, 0.05, 0.1],
+            "subsample": [0.7, 0.8, 1.0],
+            "colsample_bytree": [0.6, 0.8, 1.0],
+            "min_child_weight": [1, 3, 5],
+        },
+        (25, 400),
+    ),
+    "lgbm": (
+        dict(learning_rate=0.05, max_depth=-1, subsample=0.9, subsample_freq=1,
+             colsample_bytree=0.9, class_weight="balanced", random_state=RANDOM_STATE,
+             n_jobs=1, verbose=-1),
+        {
+            "num_leaves": [15, 31, 63],
+            "learning_rate": [0.03, 0.05, 0.1],
+            "subsample": [0.7, 0.9, 1.0],
+            "colsample_bytree": [0.6, 0.8, 1.0],
+            "min_child_samples": [5, 10, 20],
+        },
+        (25, 400),
+    ),
+}
+
+
+def available_families(families=None):
+    """
+    Requested families whose packages are installed (with a note otherwise).
+    """
+    out = []
+    for family in families or list(SPACES):
+        module = {"xgb": "xgboost", "lgbm": "lightgbm"}.get(family)
+        if module:
+            try:
+                __import__(module)
+            except ImportError:
+                print(f"ℹ️ {module} not installed; skipping '{family}'.")
+                continue
+        out.append(family)
+    return out
+
+
+# --- Schedules -------------------------------------------------------------------
+
+
+def rung_resources(min_resource, max_resource, eta):
+    """
+    Trees per rung: ``min_resource * eta**i``, capped at ``max_resource``.
+    """
+    resources = [min_resource]
+    while resources[-1] < max_resource:
+        resources.append(min(resources[-1] * eta, max_resource))
+    return resources
+
+
+def brackets(min_resource, max_resource, eta=3, mode="hyperband"):
+    """
+    (bracket id, starting configurations, rung resources) per bracket.
+
+    'sha' is a single successive-halving bracket starting at the smallest
+    resource. 'hyperband' adds brackets that start fewer configurations at
+    larger resources, hedging against early rungs that rank trials badly.
+    """
+    resources = rung_resources(min_resource, max_resource, eta)
+    s_max = len(resources) - 1
+    out = []
+    for s in range(s_max, -1 if mode == "hyperband" else s_max - 1, -1):
+        n = int(math.ceil((s_max + 1) / (s + 1) * eta ** s))
+        out.append((s, n, resources[s_max - s:]))
+    return out
+
+
+def sample_configs(family, n, seed, bracket):
+    """
+    ``n`` random configurations, reproducible for a given (seed, family,
+    bracket), so a resumed study regenerates the same trials.
+    """
+    _, space, _ = SPACES[family]
+    rng = np.random.default_rng([seed, zlib.crc32(family.encode()), bracket])
+    configs = []
+    for _ in range(n):
+        configs.append({k: v[rng.integers(len(v))] for k, v in space.items()})
+    return configs
+
+
+# --- Fitting (worker side) -------------------------------------------------------
+
+# validation data held by each worker process (set once by _init_worker)
+_worker_data = None
+
+
+def _init_worker(data):
+    global _worker_data
+    _worker_data = data
+
+
+def _new_model(family, params, n_trees, y_fit):
+    fixed, _, _ = SPACES[family]
+    params = {**fixed, **params}
+    if family == "rf":
+        return RandomForestClassifier(**dict(params, n_estimators=n_trees, warm_start=True))
+    if family == "gb":
+        return GradientBoostingClassifier(**dict(params, n_estimators=n_trees, warm_start=True))
+    if family == "xgb":
+        from xgboost import XGBClassifier
+
+        return XGBClassifier(
+            **dict(params, n_estimators=n_trees, scale_pos_weight=len(y_fit) / y_fit.sum())
+        )
+    from lightgbm import LGBMClassifier
+
+    return LGBMClassifier(**dict(params, n_estimators=n_trees))
+
+
+def _grow(family, model, params, n_trees, X, y):
+    """
+    Fit a new model with ``n_trees`` trees, or add trees to ``model``.
+    """
+    if model is None:
+        model = _new_model(family, params, n_trees, y)
+        model.fit(X, y)
+        return model
+
+    if model.n_estimators == n_trees:
+        # saved by a fit that finished but was never logged (interrupted study)
+        return model
+
+    if family in ("rf", "gb"):
+        # warm_start: only the extra trees are fitted
+        model.set_params(n_estimators=n_trees)
+        model.fit(X, y)
+        return model
+
+    extra = n_trees - model.n_estimators
+    grown = _new_model(family, params, extra, y)
+    if family == "xgb":
+        grown.fit(X, y, xgb_model=model.get_booster())
+    else:
+        grown.fit(X, y, init_model=model.booster_)
+    grown.set_params(n_estimators=n_trees)
+    return grown
+
+
+def _run_fit(task):
+    """
+    Grow one trial to the rung's resource and score it on the validation split.
+    """
+    trial, family, params, n_trees, model_dir = task
+    X_fit, y_fit, X_val, y_val = _worker_data
+    model_path = Path(model_dir) / f"{trial}.pkl"
+    model = joblib.load(model_path) if model_path.exists() else None
+    if model is not None and getattr(model, "n_estimators", 0) > n_trees:
+        model = None   # saved model is past this rung; refit from scratch
+    grown_from = model.n_estimators if model is not None else 0
+
+    start = time.perf_counter()
+    model = _grow(family, model, params, n_trees, X_fit, y_fit)
+    fit_s = time.perf_counter() - start
+    score = average_precision_score(y_val, model.predict_proba(X_val)[:, 1])
+
+    joblib.dump(model, model_path)
+    return {
+        "trial": trial,
+        "family": family,
+        "params": params,
+        "n_trees": n_trees,
+        "grown_from": grown_from,
+        "score": float(score),
+        "fit_s": fit_s,
+    }
+
+
+# --- Study -----------------------------------------------------------------------
+
+
+def _read_results(path):
+    if not path.exists():
+        return {}
+    done = {}
+    with open(path) as fh:
+        for line in fh:
+            if line.strip():
+                rec = json.loads(line)
+                done[(rec["trial"], rec["n_trees"])] = rec
+    return done
+
+
+def validation_split(features=None, val_size=0.25):
+    """
+    Notebook 05's training rows, split again (stratified) into fit and
+    validation parts. The test split is never used for tuning.
+    """
+    X_train, _, y_train, _ = load_final_split(features)
+    X_fit, X_val, y_fit, y_val = split_xy(X_train, y_train, test_size=val_size)
+    return (
+        X_fit.to_numpy(dtype=np.float64),
+        y_fit.to_numpy(),
+        X_val.to_numpy(dtype=np.float64),
+        y_val.to_numpy(),
+    )
+
+
+def run_study(
+    study="default",
+    families=None,
+    mode="hyperband",
+    eta=3,
+    budget=600.0,
+    seed=RANDOM_STATE,
+    jobs=None,
+    features=None,
+    tuning_dir=TUNING_DIR,
+):
+    """
+    Run (or resume) a search and return its leaderboard.
+
+    Parameters
+    ----------
+    study : str, optional
+        Study name; results go to ``<tuning_dir>/<study>.jsonl``.
+    families : list of str, optional
+        Keys of ``SPACES``. Defaults to every installed family.
+    mode : {'hyperband', 'sha'}, optional
+        Hyperband brackets or a single successive-halving bracket.
+    eta : int, optional
+        Keep the best ``1 / eta`` of trials per rung. Defaults to 3.
+    budget : float, optional
+        Wall-clock seconds; no new fit starts after this. Defaults to 600.
+    seed : int, optional
+        Seed for configuration sampling (keep it to resume a study).
+    jobs : int, optional
+        Worker processes. Defaults to the number of CPU cores.
+    features : list of str, optional
+        Model columns. Defaults to ``models/top_features.pkl``.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Best validation PR-AUC per trial (at its largest resource), best
+        first.
+    """
+    start = time.perf_counter()
+    tuning_dir = Path(tuning_dir)
+    results_path = tuning_dir / f"{study}.jsonl"
+    model_dir = tuning_dir / study / "models"
+    model_dir.mkdir(parents=True, exist_ok=True)
+
+    done = _read_results(results_path)
+    if done:
+        print(f"ℹ️ Resuming '{study}': {len(done):,} fits already recorded.")
+
+    data = validation_split(features)
+    jobs = jobs or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(data,))
+
+    def over_budget():
+        return time.perf_counter() - start > budget
+
+    try:
+        for family in available_families(families):
+            _, _, (min_trees, max_trees) = SPACES[family]
+            for bracket, n_configs, resources in brackets(min_trees, max_trees, eta, mode):
+                trials = {
+                    f"{family}-b{bracket}-{k}": params
+                    for k, params in enumerate(sample_configs(family, n_configs, seed, bracket))
+                }
+                for rung, n_trees in enumerate(resources):
+                    if over_budget():
+                        print("⚠️ Budget spent; stopping (re-run the study to resume).")
+                        return leaderboard(results_path)
+
+                    scores = {}
+                    pending = set()
+                    for trial, params in trials.items():
+                        if (trial, n_trees) in done:
+                            scores[trial] = done[(trial, n_trees)]["score"]
+                        else:
+                            pending.add(pool.submit(
+                                _run_fit, (trial, family, params, n_trees, str(model_dir))
+                            ))
+
+                    with open(results_path, "a") as fh:
+                        while pending:
+                            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                            for fut in finished:
+                                rec = dict(fut.result(), bracket=bracket, rung=rung)
+                                fh.write(json.dumps(rec, default=str) + "\n")
+                                fh.flush()
+                                done[(rec["trial"], n_trees)] = rec
+                                scores[rec["trial"]] = rec["score"]
+                            if over_budget():
+                                for fut in pending:
+                                    fut.cancel()
+                                print("⚠️ Budget spent; stopping (re-run the study to resume).")
+                                return leaderboard(results_path)
+
+                    # promote the best 1/eta; drop the saved models of the rest
+                    keep = max(1, len(trials) // eta)
+                    ranked = sorted(trials, key=lambda t: scores[t], reverse=True)
+                    for trial in ranked[keep:]:
+                        (model_dir / f"{trial}.pkl").unlink(missing_ok=True)
+                    if rung < len(resources) - 1:
+                        trials = {t: trials[t] for t in ranked[:keep]}
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+    return leaderboard(results_path)
+
+
+def leaderboard(results_path):
+    """
+    Best record per trial (at its largest resource), best score first.
+    """
+    results_path = Path(results_path)
+    if not results_path.exists():
+        return pd.DataFrame()
+    runs = pd.DataFrame(list(_read_results(results_path).values()))
+    top = runs.sort_values("n_trees").groupby("trial").tail(1)
+    top = top.sort_values(["score", "n_trees"], ascending=[False, False]).reset_index(drop=True)
+    return top[["trial", "family", "n_trees", "score", "fit_s", "params"]]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Successive-halving / Hyperband search over the EWS models.")
+    parser.add_argument("--study", default="default", help="study name (re-use to resume)")
+    parser.add_argument("--families", nargs="*", default=None, help=f"subset of {list(SPACES)}")
+    parser.add_argument("--mode", choices=["hyperband", "sha"], default="hyperband")
+    parser.add_argument("--eta", type=int, default=3, help="keep the best 1/eta per rung")
+    parser.add_argument("--budget", type=float, default=600, help="wall-clock seconds")
+    parser.add_argument("--seed", type=int, default=RANDOM_STATE)
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: all cores)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    board = run_study(
+        args.study, args.families, args.mode, args.eta, args.budget, args.seed, args.jobs
+    )
+    print(f"✅ Study '{args.study}' ran for {time.perf_counter() - start:.1f}s\n")
+    with pd.option_context("display.width", 200, "display.max_colwidth", 90, "display.precision", 4):
+        print(board.head(15).to_string(index=False))
+    print(f"\n[saved] {TUNING_DIR / (args.study + '.jsonl')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+"""
+Test setup: make the flat ``code_library`` modules and the app's ``utils``
+package importable, the same way they are when run from their folders.
+"""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+for path in (ROOT / "code_library", ROOT / "app"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
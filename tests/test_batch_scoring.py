@@ -0,0 +1,68 @@
+"""
+Tests for statewide batch scoring (``app/utils/batch_scoring.py``).
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from utils.batch_scoring import score_schools
+from utils.explanations import row_hashes
+from utils.inference import CompiledForest
+from utils.thresholds import RiskThreshold
+
+FEATURES = ["f0", "f1", "f2", "f3"]
+
+
+@pytest.fixture(scope="module")
+def schools():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(size=(60, 4)), columns=FEATURES)
+    y = (df["f0"] - df["f2"] > 0).astype(int)
+    df.insert(0, "cdscode", [f"{i:014d}" for i in range(len(df))])
+    model = RandomForestClassifier(n_estimators=20, random_state=0).fit(df[FEATURES], y)
+    return df, CompiledForest.from_sklearn(model)
+
+
+def _store(df, model_hash="m1"):
+    # stand-in TreeSHAP values that rank f3 first for every stored school
+    values = pd.DataFrame(0.0, index=pd.Index(df["cdscode"], name="cdscode"), columns=FEATURES)
+    values["f3"] = 0.5
+    values.insert(0, "row_hash", row_hashes(df, FEATURES))
+    return values, {"model_hash": model_hash, "base_value": 0.4, "features": FEATURES}
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_top_features_use_stored_shap_where_valid(schools, jobs):
+    df, engine = schools
+    store, meta = _store(df.iloc[:40])
+    scoring = df.copy()
+    scoring.loc[5, "f1"] += 1.0          # changed since the store was built
+
+    scores = score_schools(
+        scoring, engine=engine, risk=RiskThreshold(), chunk_size=16, jobs=jobs,
+        explanations=(store, meta, "m1"),
+    ).set_index("cdscode")
+
+    method = scores["contribution_method"]
+    shap_rows = [c for c in df["cdscode"][:40] if c != df.loc[5, "cdscode"]]
+    assert (method[shap_rows] == "TreeSHAP").all()
+    assert (scores.loc[shap_rows, "top_feature_1"] == "f3").all()
+    assert (method.drop(shap_rows) == "Saabas").all()
+
+    # Saabas rows carry the compiled forest's path contributions
+    saabas = scoring.set_index("cdscode").loc[method.drop(shap_rows).index]
+    _, contrib = engine.contributions(saabas)
+    np.testing.assert_allclose(
+        scores.loc[saabas.index, "top_contribution_1"], contrib.max(axis=1)
+    )
+
+
+def test_store_for_another_model_is_ignored(schools):
+    df, engine = schools
+    store, meta = _store(df)
+    scores = score_schools(
+        df, engine=engine, risk=RiskThreshold(), jobs=1, explanations=(store, meta, "m2")
+    )
+    assert (scores["contribution_method"] == "Saabas").all()
@@ -0,0 +1,65 @@
+"""
+Tests for the counterfactual search (``app/utils/counterfactual.py``).
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from utils import counterfactual
+from utils.counterfactual import RESULT_COLS, counterfactuals_for_schools
+from utils.inference import CompiledForest
+from utils.registry import load_school_data
+
+FEATURES = ["chronicabsenteeismrate", "still_enrolled_rate", "stu_tch_ratio"]
+
+
+@pytest.fixture(scope="module")
+def schools():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {
+            "chronicabsenteeismrate": rng.uniform(0, 90, 300),
+            "still_enrolled_rate": rng.uniform(0, 40, 300),
+            "stu_tch_ratio": rng.uniform(10, 35, 300),
+        }
+    )
+    y = ((df["chronicabsenteeismrate"] > 40) | (df["still_enrolled_rate"] > 25)).astype(int)
+    df.insert(0, "cdscode", [f"{i:014d}" for i in range(len(df))])
+    model = RandomForestClassifier(n_estimators=25, random_state=0).fit(df[FEATURES], y)
+    return df, CompiledForest.from_sklearn(model)
+
+
+def test_solutions_reach_the_threshold(schools):
+    df, engine = schools
+    results = counterfactuals_for_schools(df.iloc[:40], engine=engine, jobs=1, threshold=0.5)
+
+    _, proba = engine.predict(df.iloc[:40])
+    assert results["cdscode"].nunique() == (proba[:, 1] > 0.5).sum()
+    solved = results.dropna(subset=["cost"])
+    assert len(solved)
+    assert (solved["new_risk_probability"] <= 0.5).all()
+    assert (solved["risk_probability"] > 0.5).all()
+    # cheapest solution first within each school
+    assert (solved.groupby("cdscode")["cost"].diff().dropna() >= 0).all()
+
+
+def test_no_at_risk_schools(schools):
+    df, engine = schools
+    results = counterfactuals_for_schools(df, engine=engine, jobs=1, threshold=1.0)
+    assert results.empty
+    assert list(results.columns) == ["cdscode"] + RESULT_COLS
+
+
+@pytest.mark.parametrize("drop_ids", [False, True])
+def test_main_without_at_risk_schools(tmp_path, capsys, drop_ids):
+    data = load_school_data()
+    if drop_ids:
+        data = data.drop(columns=["cdscode"])
+    src, out = tmp_path / "schools.pkl", tmp_path / "cf.parquet"
+    data.to_pickle(src)
+
+    counterfactual.main(["--input", str(src), "--output", str(out), "--threshold", "0.99999", "--jobs", "1"])
+    assert "No at-risk schools" in capsys.readouterr().out
+    assert pd.read_parquet(out).empty
@@ -0,0 +1,43 @@
+"""
+Tests for compact dtype planning (``dtype_optimizer.py``).
+"""
+
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+
+from dtype_optimizer import optimize_dtypes, plan_dtypes
+
+
+def test_non_negative_integers_stay_signed():
+    df = pd.DataFrame({"year": [2019, 2020, 2021], "count": [0, 5, 200], "enroll": ["10", "0", "7"]})
+    plan = plan_dtypes(df)
+    assert plan == {"year": np.dtype(np.int16), "count": np.dtype(np.int16), "enroll": np.dtype(np.int8)}
+
+    out = optimize_dtypes(df)
+    # differences and -1 sentinels must not wrap around
+    assert out["year"].diff().tolist()[1:] == [1, 1]
+    assert (out["count"] - out["count"].max()).min() == -200
+    assert (out["enroll"] - 1).tolist() == [9, -1, 6]
+
+
+def test_floats_narrow_only_on_exact_round_trip():
+    df = pd.DataFrame(
+        {
+            "halves": [0.5, 1.25, np.nan],           # exact in float32
+            "rate": [0.1, 0.2, 0.333333],            # not exact in float32
+        }
+    )
+    assert plan_dtypes(df) == {"halves": np.dtype(np.float32)}
+    pdt.assert_frame_equal(optimize_dtypes(df).astype(np.float64), df)
+
+    # lossy narrowing is opt-in
+    assert plan_dtypes(df, float_rtol=1e-6)["rate"] == np.dtype(np.float32)
+
+
+def test_codes_with_leading_zeros_stay_text():
+    df = pd.DataFrame({"countycode": ["01", "19", "01", "01"], "value": ["*", "3.5", "4", "N/A"]})
+    plan = plan_dtypes(df)
+    assert plan["countycode"] == "category"
+    assert plan["value"] == np.dtype(np.float32)
+    assert optimize_dtypes(df)["value"].isna().tolist() == [True, False, False, True]
@@ -0,0 +1,63 @@
+"""
+Tests for the vectorized bootstrap (``evaluation.py``).
+
+Each bootstrap replicate is a row of draw counts, so it must agree with
+sklearn's metrics computed with those counts as ``sample_weight``.
+"""
+
+import numpy as np
+import pytest
+from sklearn.metrics import average_precision_score, f1_score, precision_score, recall_score
+
+from evaluation import bootstrap_counts, bootstrap_metrics, weighted_average_precision
+
+
+@pytest.fixture
+def scored():
+    rng = np.random.default_rng(0)
+    y = rng.integers(0, 2, 150)
+    # rounded so there are many tied scores, as with forest probabilities
+    score = np.round(np.clip(0.3 * y + rng.random(150) * 0.7, 0, 1), 2)
+    return y, score
+
+
+def test_bootstrap_counts_sum_to_n():
+    counts = bootstrap_counts(50, 20, np.random.default_rng(0))
+    assert counts.shape == (20, 50)
+    assert (counts.sum(axis=1) == 50).all()
+
+
+def test_weighted_average_precision_matches_sklearn(scored):
+    y, score = scored
+    W = bootstrap_counts(len(y), 25, np.random.default_rng(1))
+
+    order = np.argsort(-score, kind="stable")
+    s_sorted = score[order]
+    ends = np.r_[np.flatnonzero(np.diff(s_sorted) != 0), len(s_sorted) - 1]
+    ap = weighted_average_precision(y[order].astype(float), W[:, order], ends)
+
+    expected = [average_precision_score(y, score, sample_weight=w) for w in W]
+    np.testing.assert_allclose(ap, expected, rtol=1e-12)
+
+
+@pytest.mark.parametrize("threshold", [0.5, 0.3])
+def test_bootstrap_metrics_match_sklearn(scored, threshold):
+    y, score = scored
+    reps = bootstrap_metrics(y, score, n_boot=30, threshold=threshold, seed=7, chunk=12)
+
+    # same draws as bootstrap_metrics: one generator, consumed chunk by chunk
+    rng = np.random.default_rng(7)
+    W = np.vstack([bootstrap_counts(len(y), k, rng) for k in (12, 12, 6)])
+    pred = (score > threshold).astype(int)
+    expected = np.array(
+        [
+            [
+                precision_score(y, pred, sample_weight=w, zero_division=0),
+                recall_score(y, pred, sample_weight=w, zero_division=0),
+                f1_score(y, pred, sample_weight=w, zero_division=0),
+                average_precision_score(y, score, sample_weight=w),
+            ]
+            for w in W
+        ]
+    )
+    np.testing.assert_allclose(reps.to_numpy(), expected, rtol=1e-12, atol=1e-12)
@@ -0,0 +1,45 @@
+"""
+Tests for the top-N feature sweep (``feature_selection.py``).
+"""
+
+import numpy as np
+import pandas as pd
+
+import feature_selection as fs
+
+
+def _frames():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(240, 6)), columns=[f"f{i}" for i in range(6)])
+    y = (X["f0"] + X["f1"] + 0.3 * rng.normal(size=240) > 0).astype(int).to_numpy()
+    return X[:180], X[180:], y[:180], y[180:]
+
+
+def test_choose_n_takes_smallest_n_within_tolerance():
+    curve = pd.DataFrame({"N": [3, 5, 7, 9], "PR-AUC": [0.60, 0.695, 0.70, 0.69]})
+    assert fs.choose_n(curve, tolerance=0.01) == 5
+    assert fs.choose_n(curve, tolerance=0.0) == 7
+    assert fs.choose_n(curve, tolerance=0.2) == 3
+
+
+def test_sweep_top_n_caches_every_fit(tmp_path, monkeypatch):
+    monkeypatch.setattr(fs, "SELECTION_RF", dict(n_estimators=10, random_state=0, n_jobs=1))
+    dataset = tmp_path / "features.pkl"
+    dataset.write_bytes(b"synthetic")
+    X_fit, X_val, y_fit, y_val = _frames()
+    ranking = ["f0", "f1", "f2", "f3", "f4", "f5"]
+    kwargs = dict(n_values=[1, 2, 4, 6], dataset=dataset, jobs=1, cache_dir=tmp_path / "cache")
+
+    first = fs.sweep_top_n(ranking, X_fit, y_fit, X_val, y_val, **kwargs)
+    assert first["N"].tolist() == [1, 2, 4, 6]
+    assert not first["cached"].any()
+    # the two informative features carry the signal
+    assert fs.choose_n(first, tolerance=0.05) <= 2
+
+    second = fs.sweep_top_n(ranking, X_fit, y_fit, X_val, y_val, **kwargs)
+    assert second["cached"].all()
+    assert second["PR-AUC"].tolist() == first["PR-AUC"].tolist()
+
+    # a different validation split is a different fit
+    other_seed = fs.sweep_top_n(ranking, X_fit, y_fit, X_val, y_val, seed=1, **kwargs)
+    assert not other_seed["cached"].any()
@@ -0,0 +1,323 @@
+"""
+Tests for the vectorized cleaners and the streaming reader in ``helper.py``.
+
+The cleaners were rewritten from row loops; each is checked against a copy
+of the original loop on hand-written and randomly generated exports.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from helper import clean_calschls_safety, clean_safety_by_connectedness, load_cde_txt, save_stage
+
+
+# --- load_cde_txt ----------------------------------------------------------------
+
+
+CDE_TEXT = (
+    "CountyCode\tAggregateLevel\tSchoolName\tCohortStudents\n"
+    "01\tS\tAlpha High\t120\n"
+    "01\tD\tAlameda Unified\t900\n"
+    "19\tS\tBeta High\t*\n"
+)
+
+
+@pytest.fixture
+def cde_file(tmp_path):
+    path = tmp_path / "acgr.txt"
+    path.write_text(CDE_TEXT, encoding="latin1")
+    return path
+
+
+def test_load_cde_txt_streaming_matches_full_read(cde_file):
+    full = load_cde_txt(cde_file)
+    expected = full[full["AggregateLevel"].str.strip() == "S"][["SchoolName", "CohortStudents"]]
+    expected = expected.assign(CohortStudents=pd.to_numeric(expected["CohortStudents"], errors="coerce"))
+
+    result = load_cde_txt(
+        cde_file,
+        filters={"AggregateLevel": "S"},
+        usecols=["SchoolName", "CohortStudents"],
+        numeric_cols=["CohortStudents"],
+        chunksize=1,
+    )
+    pdt.assert_frame_equal(result, expected)
+
+
+@pytest.mark.parametrize("text", [CDE_TEXT, CDE_TEXT.splitlines(keepends=True)[0]])
+def test_load_cde_txt_no_matching_rows(tmp_path, text):
+    path = tmp_path / "acgr.txt"
+    path.write_text(text, encoding="latin1")
+    result = load_cde_txt(path, filters={"AggregateLevel": "X"}, usecols=["SchoolName", "CountyCode"])
+    assert result.empty
+    assert list(result.columns) == ["SchoolName", "CountyCode"]
+
+
+# --- save_stage ------------------------------------------------------------------
+
+
+def test_save_stage_narrows_dtypes_without_changing_values(tmp_path):
+    df = pd.DataFrame(
+        {
+            "cdscode": ["01611190130229", "01611190130237", "19647330000000", "19647330000001"],
+            "county": ["Alameda", "Alameda", "Los Angeles", "Alameda"],
+            "cohortstudents": [120.0, 95.0, 300.0, 41.0],
+            "latitude": ["37.764958", "37.896661", "34.05", None],
+            "rate": [0.1, 0.25, np.nan, 0.7],
+        }
+    )
+    path = tmp_path / "01_combined_eda_dataset.pkl"
+    save_stage(df, path)
+    saved = pd.read_pickle(path)
+
+    assert saved["cdscode"].tolist() == df["cdscode"].tolist()
+    assert saved["county"].dtype == "category"
+    assert saved["cohortstudents"].dtype == np.int16
+    # 0.1 is not exact in float32, so 'rate' keeps float64
+    assert saved["rate"].dtype == np.float64
+    np.testing.assert_array_equal(saved["latitude"], pd.to_numeric(df["latitude"]))
+    np.testing.assert_array_equal(saved["cohortstudents"], df["cohortstudents"])
+
+
+# --- clean_calschls_safety -------------------------------------------------------
+
+
+def _old_clean_calschls_safety(df_raw, years="2017-2019", level_filter="All"):
+    """
+    The original row-by-row parser, kept as the reference implementation.
+    """
+
+    def _clean_val(x):
+        if pd.isna(x):
+            return np.nan
+        x = str(x).strip().replace("%", "")
+        if x in {"N/A", "S", ""}:
+            return np.nan
+        try:
+            return float(x)
+        except ValueError:
+            return np.nan
+
+    rows = []
+    region = None
+    for _, row in df_raw.iterrows():
+        values = [str(v).strip() for v in row if pd.notna(v)]
+        if not values:
+            continue
+        line = "\t".join(values)
+
+        if line.endswith("Percent") and not line.startswith("Grade Level"):
+            region = line.replace("Percent", "").strip()
+            continue
+
+        if line.startswith("Grade 9") or line.startswith("Grade 11"):
+            match = re.match(r"Grade\s+(9|11)\s+(.*)", line)
+            if not match or region is None:
+                continue
+            grade = int(match.group(1))
+            rest = match.group(2)
+            parts = re.split(r"\t+|\s{2,}", rest)
+            if len(parts) < 5:
+                parts = rest.split()
+            vals = (parts + [""] * 5)[:5]
+            vs, s, n, u, vu = map(_clean_val, vals)
+            rows.append(
+                {
+                    "geography": region,
+                    "geo_type": "County" if "County" in region else "State",
+                    "grade": grade,
+                    "very_safe_pct": vs,
+                    "safe_pct": s,
+                    "neither_pct": n,
+                    "unsafe_pct": u,
+                    "very_unsafe_pct": vu,
+                    "years": years,
+                    "level_of_safety_filter": level_filter,
+                }
+            )
+
+    df_clean = pd.DataFrame(rows)
+    if not df_clean.empty:
+        df_clean["geo_type"] = pd.Categorical(
+            df_clean["geo_type"], categories=["State", "County"], ordered=True
+        )
+        df_clean = df_clean.sort_values(["geo_type", "geography", "grade"]).reset_index(drop=True)
+    return df_clean
+
+
+def assert_same_safety(raw):
+    expected = _old_clean_calschls_safety(raw)
+    result = clean_calschls_safety(raw)
+    if expected.empty:
+        assert result.empty
+        return
+    pdt.assert_frame_equal(result, expected, check_dtype=False)
+
+
+VALUES = ["27.4%", "5%", "S", "N/A", "", "12", "0.5%", "100%"]
+REGIONS = ["California Percent", "Alameda County Percent", "Fresno County Percent"]
+SEPARATORS = ["\t", "  ", " ", "\t\t", "   "]
+
+
+def _random_row(rng, n_cols):
+    kind = rng.integers(0, 6)
+    if kind == 0:
+        cells = [str(rng.choice(REGIONS))]
+    elif kind == 1:
+        cells = ["Grade Level", "Very Safe", "Percent"]
+    elif kind <= 4:
+        grade = f"Grade {rng.choice(['9', '11'])}"
+        vals = list(rng.choice(VALUES, size=rng.integers(2, 7)))
+        if rng.random() < 0.5:
+            # everything in one cell, with mixed separators
+            sep = str(rng.choice(SEPARATORS))
+            cells = [grade + sep + sep.join(vals)]
+        else:
+            # one value per cell, some cells missing
+            cells = [grade] + [v if rng.random() > 0.2 else np.nan for v in vals]
+    else:
+        cells = [str(rng.choice(["Notes", "Source: CalSCHLS", "Grade 10 1% 2%"]))]
+    cells = cells[:n_cols]
+    return cells + [np.nan] * (n_cols - len(cells))
+
+
+def _random_export(rng):
+    n_cols = int(rng.integers(1, 8))
+    rows = [_random_row(rng, n_cols) for _ in range(int(rng.integers(1, 25)))]
+    return pd.DataFrame(rows, dtype=object)
+
+
+def test_calschls_safety_well_formed():
+    raw = pd.DataFrame(
+        [
+            ["California Percent", np.nan, np.nan, np.nan, np.nan, np.nan],
+            ["Grade Level", "Very Safe", "Safe", "Neither", "Unsafe", "Very Unsafe"],
+            ["Grade 9", "20%", "40%", "25%", "10%", "5%"],
+            ["Grade 11", "18%", "42%", "S", "N/A", "4%"],
+            ["Alameda County Percent", np.nan, np.nan, np.nan, np.nan, np.nan],
+            ["Grade 9", "21%", "39%", "24%", "11%", "5%"],
+        ],
+        dtype=object,
+    )
+    result = clean_calschls_safety(raw)
+    assert result["geography"].tolist() == ["California", "California", "Alameda County"]
+    assert np.isnan(result.loc[1, "neither_pct"])  # 'S' -> NaN
+    assert_same_safety(raw)
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        "Grade 9 10% 20% 30% 40% 5%",     # single spaces only
+        "Grade 11 10%  20% 30%",           # too few values
+        "Grade 9\t10%\t20%",               # short tab-separated row
+    ],
+)
+def test_calschls_safety_short_rows(line):
+    raw = pd.DataFrame(
+        [["Alameda County Percent", np.nan], [line, np.nan], ["Grade 11", "1%"]],
+        dtype=object,
+    )
+    assert_same_safety(raw)
+
+
+def test_calschls_safety_matches_row_loop_on_random_exports():
+    rng = np.random.default_rng(0)
+    for _ in range(300):
+        assert_same_safety(_random_export(rng))
+
+
+# --- clean_safety_by_connectedness -----------------------------------------------
+
+
+def _old_clean_safety_by_connectedness(df_raw):
+    """
+    The original region-by-region parser, kept as the reference implementation.
+    """
+    df = df_raw.dropna(how="all").dropna(axis=1, how="all").copy()
+    df.reset_index(drop=True, inplace=True)
+
+    region_rows = []
+    for i in range(len(df)):
+        row_str = str(df.iloc[i, 0]).strip()
+        if "County" in row_str or row_str == "California":
+            region_rows.append(i)
+
+    records = []
+    for idx in region_rows:
+        region = str(df.iloc[idx, 0]).strip()
+        sub_df = df.iloc[idx + 2 : idx + 5].copy()
+        sub_df.columns = df.iloc[idx + 1].tolist()
+        sub_df["Geography"] = region
+        records.append(sub_df)
+
+    df_clean = pd.concat(records, ignore_index=True)
+    if "Percent" in df_clean.columns:
+        df_clean.drop(columns=["Percent"], inplace=True, errors="ignore")
+
+    for col in ["Very Safe", "Safe", "Neither Safe nor Unsafe", "Unsafe", "Very Unsafe"]:
+        df_clean[col] = (
+            df_clean[col]
+            .astype(str)
+            .str.replace("%", "", regex=False)
+            .replace({"S": np.nan, "N/A": np.nan, "nan": np.nan})
+            .astype(float)
+        )
+    df_clean["Safety_Positive"] = df_clean["Very Safe"] + df_clean["Safe"]
+
+    df_clean = df_clean[
+        [
+            "Geography",
+            "Level of School Connectedness",
+            "Very Safe",
+            "Safe",
+            "Neither Safe nor Unsafe",
+            "Unsafe",
+            "Very Unsafe",
+            "Safety_Positive",
+        ]
+    ].rename(columns={"Level of School Connectedness": "Connectedness"})
+    df_clean["Connectedness"] = pd.Categorical(
+        df_clean["Connectedness"], categories=["High", "Medium", "Low"], ordered=True
+    )
+    return df_clean
+
+
+CONNECTEDNESS_HEADER = [
+    "Level of School Connectedness", "Very Safe", "Safe",
+    "Neither Safe nor Unsafe", "Unsafe", "Very Unsafe",
+]
+
+
+def _random_connectedness_export(rng, percent_col):
+    header = CONNECTEDNESS_HEADER + (["Percent"] if percent_col else [])
+    rows = [["Perceptions of School Safety"] + [np.nan] * (len(header) - 1)]
+    regions = ["California"] + [f"{name} County" for name in ["Alameda", "Fresno", "Kern", "Yolo"]]
+    for region in rng.choice(regions, size=rng.integers(1, 5), replace=False):
+        rows.append([region] + [np.nan] * (len(header) - 1))
+        rows.append(list(header))
+        for level in ["High", "Medium", "Low"]:
+            values = list(rng.choice(["27.4%", "S", "N/A", "3%", "41.0%"], size=5))
+            rows.append([level] + values + (["Percent"] if percent_col else []))
+        if rng.random() < 0.3:
+            rows.append([np.nan] * len(header))   # blank spacer row
+    if rng.random() < 0.5:
+        # export cut off inside the last block
+        rows = rows[: len(rows) - int(rng.integers(1, 3))]
+    raw = pd.DataFrame(rows, dtype=object)
+    raw.insert(2, "blank", np.nan)                # an all-empty column
+    return raw
+
+
+def test_connectedness_matches_region_loop_on_random_exports():
+    rng = np.random.default_rng(1)
+    for i in range(100):
+        raw = _random_connectedness_export(rng, percent_col=bool(i % 2))
+        pdt.assert_frame_equal(
+            clean_safety_by_connectedness(raw),
+            _old_clean_safety_by_connectedness(raw),
+        )
@@ -0,0 +1,74 @@
+"""
+Tests for ICE curves (``app/utils/ice.py``).
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from utils.ice import feature_grid, ice_surface
+from utils.inference import CompiledForest
+
+FEATURES = ["chronicabsenteeismrate", "still_enrolled_rate", "stu_tch_ratio"]
+
+
+@pytest.fixture(scope="module")
+def engine_and_schools():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(
+        {
+            "chronicabsenteeismrate": rng.uniform(0, 90, 200),
+            "still_enrolled_rate": rng.uniform(0, 40, 200),
+            "stu_tch_ratio": rng.uniform(10, 35, 200),
+        }
+    )
+    y = (X["chronicabsenteeismrate"] + X["still_enrolled_rate"] > 50).astype(int)
+    model = RandomForestClassifier(n_estimators=15, random_state=0).fit(X, y)
+    return CompiledForest.from_sklearn(model), X.iloc[:37]
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 50, 100_000])
+def test_ice_surface_matches_per_school_curves(engine_and_schools, chunk_rows):
+    engine, X = engine_and_schools
+    seen = []
+    predict_proba = engine.predict_proba
+
+    def recording_predict_proba(rows):
+        seen.append(len(rows))
+        return predict_proba(rows)
+
+    engine.predict_proba = recording_predict_proba
+    try:
+        surface = ice_surface(engine, X, n_points=9, chunk_rows=chunk_rows)
+    finally:
+        del engine.predict_proba
+
+    # never more than chunk_rows grid rows at once (or one school's grid)
+    assert max(seen) <= max(chunk_rows, 9)
+    for j, feature in enumerate(FEATURES):
+        grid, probs = surface[feature]
+        np.testing.assert_array_equal(grid, feature_grid(feature, 9))
+        assert probs.shape == (len(X), 9)
+        for i in (0, 17, len(X) - 1):
+            rows = np.repeat(X.to_numpy()[[i]], len(grid), axis=0)
+            rows[:, j] = grid
+            np.testing.assert_allclose(probs[i], predict_proba(rows)[:, 1])
+
+
+def test_ice_surface_memory_is_bounded_by_chunk_rows(engine_and_schools):
+    import tracemalloc
+
+    engine, X = engine_and_schools
+    many = engine.to_array(X.sample(4000, replace=True, random_state=0))
+    full_grid_bytes = len(many) * 25 * many.shape[1] * 8
+
+    tracemalloc.start()
+    try:
+        ice_surface(engine, many, n_points=25, chunk_rows=500)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # the output curves (2.4 MB for three features) are kept; the grid matrix for
+    # all schools at once (2.4 MB) must never be
+    assert peak < 2 * full_grid_bytes
@@ -0,0 +1,67 @@
+"""
+Tests for the array-compiled forest (``app/utils/inference.py``).
+
+The compiled traversal must reproduce sklearn's ``predict_proba`` and
+``predict`` for single rows and batches, with and without missing values.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from utils.inference import CompiledForest
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(400, 6)), columns=[f"f{i}" for i in range(6)])
+    y = ((X["f0"] + X["f1"] * X["f2"] + rng.normal(scale=0.5, size=400)) > 0).astype(int)
+    return X, y
+
+
+def _fit(X, y, **params):
+    return RandomForestClassifier(n_estimators=40, random_state=0, **params).fit(X, y)
+
+
+@pytest.mark.parametrize("params", [{}, {"max_depth": 3}, {"min_samples_leaf": 5}])
+def test_matches_sklearn(data, params):
+    X, y = data
+    model = _fit(X, y, **params)
+    engine = CompiledForest.from_sklearn(model)
+
+    np.testing.assert_allclose(engine.predict_proba(X), model.predict_proba(X), rtol=0, atol=1e-12)
+    labels, proba = engine.predict(X)
+    np.testing.assert_array_equal(labels, model.predict(X))
+    # single-row path
+    np.testing.assert_allclose(
+        engine.predict_proba(X.iloc[[7]]), model.predict_proba(X.iloc[[7]]), rtol=0, atol=1e-12
+    )
+
+
+def test_matches_sklearn_with_missing_values(data):
+    X, y = data
+    X = X.copy()
+    rng = np.random.default_rng(1)
+    X = X.mask(rng.random(X.shape) < 0.15)
+    model = _fit(X, y)
+    engine = CompiledForest.from_sklearn(model)
+
+    np.testing.assert_allclose(engine.predict_proba(X), model.predict_proba(X), rtol=0, atol=1e-12)
+    row = X[X.isna().any(axis=1)].iloc[[0]]
+    np.testing.assert_allclose(engine.predict_proba(row), model.predict_proba(row), rtol=0, atol=1e-12)
+
+    _, proba, _ = engine.predict_with_uncertainty(X)
+    np.testing.assert_allclose(proba, model.predict_proba(X), rtol=0, atol=1e-12)
+    bias, contrib = engine.contributions(X)
+    np.testing.assert_allclose(bias + contrib.sum(axis=1), proba[:, 1], rtol=0, atol=1e-12)
+
+
+def test_contributions_add_up_to_proba(data):
+    X, y = data
+    engine = CompiledForest.from_sklearn(_fit(X, y))
+    bias, contrib = engine.contributions(X.iloc[:20])
+    np.testing.assert_allclose(
+        bias + contrib.sum(axis=1), engine.predict_proba(X.iloc[:20])[:, 1], rtol=0, atol=1e-12
+    )
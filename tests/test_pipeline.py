@@ -0,0 +1,49 @@
+"""
+Tests for the incremental notebook runner (``pipeline.py``).
+"""
+
+import pipeline
+
+
+def _tasks(tmp_path):
+    (tmp_path / "raw_acgr.pkl").write_bytes(b"acgr")
+    (tmp_path / "combined.pkl").write_bytes(b"combined")
+    return {
+        # raw downloads not on disk and one raw pickle missing
+        "ingest": {
+            "notebook": "00_data_collection.ipynb",
+            "inputs": [tmp_path / "acgr21.txt"],
+            "outputs": [tmp_path / "raw_acgr.pkl", tmp_path / "raw_staff_edu.pkl"],
+        },
+        "prepare": {
+            "notebook": "01_data_preparation.ipynb",
+            "inputs": [tmp_path / "raw_acgr.pkl"],
+            "outputs": [tmp_path / "combined.pkl"],
+        },
+        "model": {
+            "notebook": "05_modeling_counties_reduced.ipynb",
+            "inputs": [tmp_path / "combined.pkl"],
+            "outputs": [tmp_path / "model.pkl"],
+        },
+    }
+
+
+def test_unavailable_ingest_does_not_block_downstream(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, "load_state", lambda: {})
+    status = pipeline.run_pipeline(dry_run=True, tasks=_tasks(tmp_path))
+    assert status == {"ingest": "unavailable", "prepare": "stale", "model": "pending"}
+
+
+def test_tasks_settled_late_in_a_pass_ready_their_dependents(tmp_path, monkeypatch):
+    tasks = _tasks(tmp_path)
+    # 'a_report' sorts before 'prepare' but depends on it
+    tasks["a_report"] = {
+        "notebook": "06_final_dataset_preparation.ipynb",
+        "inputs": [tmp_path / "combined.pkl"],
+        "outputs": [],
+    }
+    (tmp_path / "raw_acgr.pkl").unlink()   # 'prepare' falls back to its outputs
+    monkeypatch.setattr(pipeline, "load_state", lambda: {})
+    status = pipeline.run_pipeline(dry_run=True, tasks=tasks)
+    assert status["prepare"] == "skipped"
+    assert status["a_report"] == "stale"
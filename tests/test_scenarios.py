@@ -0,0 +1,22 @@
+"""
+Tests for the Monte-Carlo scenario summary (``utils/scenarios.py``).
+"""
+
+import numpy as np
+import pytest
+
+from utils.scenarios import ScenarioSummary
+
+
+@pytest.mark.parametrize("threshold", [0.5, 0.3, 0.37])
+def test_histogram_at_risk_bins_match_at_risk_count(threshold):
+    summary = ScenarioSummary([], threshold=threshold)
+    rng = np.random.default_rng(0)
+    # probabilities on and around the threshold and the bin edges
+    p = np.concatenate([rng.random(5_000), np.linspace(0, 1, 51), [threshold] * 7])
+    summary.update(np.empty((len(p), 0)), p)
+
+    start, end, count, at_risk = summary.histogram()
+    assert count.sum() == len(p)
+    assert count[at_risk].sum() == summary.at_risk == (p > threshold).sum()
+    assert threshold in start and np.all(end - start > 1e-6)
@@ -0,0 +1,69 @@
+"""
+Tests for the integer-keyed school table join (``school_join.py``).
+"""
+
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+
+from school_join import build_school_table, decode_cdscode, encode_cdscode
+
+
+def _frames(rng, n=60):
+    codes = [f"{c:02d}{d:05d}{s:07d}" for c, d, s in zip(
+        rng.integers(1, 58, n), rng.integers(10000, 99999, n), rng.integers(0, 9999999, n)
+    )]
+    codes = list(dict.fromkeys(codes))
+    base = pd.DataFrame(
+        {
+            "cdscode": codes,
+            "county": rng.choice(["Alameda", "Fresno", "Kern"], len(codes)),
+            "enroll_total": rng.integers(50, 3000, len(codes)),
+        }
+    )
+
+    def source(cols, frac):
+        keep = rng.random(len(codes)) < frac
+        keys = [c for c, k in zip(codes, keep) if k] + ["99999999999999"]   # one unmatched key
+        out = {"cdscode": keys}
+        for col in cols:
+            out[col] = rng.random(len(keys))
+        return pd.DataFrame(out).sample(frac=1, random_state=0)
+
+    acgr = source(["grad_rate", "cohort"], 0.8)
+    frpm = source(["frpm_pct"], 0.5)
+    safety = pd.DataFrame({"county": ["Alameda", "Kern"], "very_safe_pct": [31.0, 27.5]})
+    return base, acgr, frpm, safety
+
+
+def test_matches_merge_chain_with_unique_keys():
+    base, acgr, frpm, safety = _frames(np.random.default_rng(0))
+
+    expected = (
+        base.merge(acgr, on="cdscode", how="left")
+        .merge(frpm, on="cdscode", how="left")
+        .merge(safety, on="county", how="left")
+    )
+    table, report = build_school_table(
+        base, {"acgr": acgr, "frpm": frpm, "safety": (safety, "county")}
+    )
+
+    pdt.assert_frame_equal(table, expected)
+    assert report["duplicate_keys"].tolist() == [0, 0, 0]
+    assert report.loc[0, "matched"] == expected["grad_rate"].notna().sum()
+
+
+def test_numeric_source_keys_and_duplicates():
+    base = pd.DataFrame({"cdscode": ["01611190130229", "19647330000000"]})
+    # numeric codes lose their leading zero; the second row repeats a key
+    src = pd.DataFrame({"cdscode": [1611190130229, 1611190130229], "value": [1.0, 2.0]})
+    table, report = build_school_table(base, {"src": src})
+    assert table["value"].tolist()[0] == 1.0
+    assert np.isnan(table["value"].tolist()[1])
+    assert report.loc[0, "duplicate_keys"] == 1
+
+
+def test_cdscode_round_trip():
+    codes = pd.Series(["01611190130229", None, "bad"])
+    assert decode_cdscode(encode_cdscode(codes)).tolist()[0] == "01611190130229"
+    assert decode_cdscode(encode_cdscode(codes)).isna().tolist() == [False, True, True]
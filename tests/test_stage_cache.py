@@ -0,0 +1,85 @@
+"""
+Tests for the columnar stage cache (``stage_cache.py``).
+"""
+
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+
+from stage_cache import cached_stage, pickle_columns, read_pickle_columns
+
+
+def _stage_frame(offset=0):
+    index = pd.Index([10, 20, 30], name="row")
+    return pd.DataFrame(
+        {
+            # object text, as in pickles written before pandas 3
+            "Cdscode": pd.Series(["01611190130229", None, "19647330000000"], index=index, dtype=object),
+            "Level": pd.Categorical(["S", "D", "S"]),
+            "Value": np.array([1.5, np.nan, 3.0]) + offset,
+            "RowNumber": np.array([1, 2, 3], dtype=np.int64),
+        },
+        index=index,
+    )
+
+
+def test_read_pickle_columns_matches_read_pickle(tmp_path):
+    pkl = tmp_path / "raw_cbeds.pkl"
+    df = _stage_frame()
+    df.to_pickle(pkl)
+    cache = tmp_path / "cache"
+
+    cached = read_pickle_columns(pkl, cache_dir=cache)
+    pdt.assert_frame_equal(cached, pd.read_pickle(pkl))
+    assert cached.dtypes.to_dict() == df.dtypes.to_dict()
+    # cached read, limited to some columns: same dtypes, index kept
+    pdt.assert_frame_equal(
+        read_pickle_columns(pkl, columns=["Value", "Cdscode"], cache_dir=cache),
+        df[["Value", "Cdscode"]],
+    )
+    assert pickle_columns(pkl, cache_dir=cache) == list(df.columns)
+
+
+def test_same_file_name_in_two_folders(tmp_path):
+    cache = tmp_path / "cache"
+    paths = []
+    for i, folder in enumerate(["2021", "2022"]):
+        (tmp_path / folder).mkdir()
+        path = tmp_path / folder / "raw_enroll.pkl"
+        _stage_frame(offset=100 * i).to_pickle(path)
+        paths.append(path)
+
+    first = [read_pickle_columns(p, cache_dir=cache) for p in paths]
+    entries = sorted(cache.glob("*.json"))
+    assert len(entries) == 2
+    stamps = [e.stat().st_mtime_ns for e in entries]
+
+    # reading again neither mixes the two up nor rewrites either entry
+    second = [read_pickle_columns(p, cache_dir=cache) for p in paths]
+    for path, a, b in zip(paths, first, second):
+        pdt.assert_frame_equal(a, pd.read_pickle(path))
+        pdt.assert_frame_equal(b, pd.read_pickle(path))
+    assert [e.stat().st_mtime_ns for e in entries] == stamps
+
+
+def test_cached_stage_rebuilds_when_params_change(tmp_path):
+    calls = []
+
+    def build():
+        calls.append(1)
+        return _stage_frame()
+
+    cache = tmp_path / "cache"
+    cached_stage("acgr", build, params={"year": 2021}, cache_dir=cache)
+    cached_stage("acgr", build, params={"year": 2021}, cache_dir=cache)
+    assert len(calls) == 1
+    cached_stage("acgr", build, params={"year": 2022}, cache_dir=cache)
+    assert len(calls) == 2
+
+
+def test_mixed_object_column_reads_back_as_object(tmp_path):
+    pkl = tmp_path / "raw_mixed.pkl"
+    pd.DataFrame({"code": pd.Series([1, "A", None], dtype=object)}).to_pickle(pkl)
+    result = read_pickle_columns(pkl, cache_dir=tmp_path / "cache")
+    assert result["code"].dtype == object
+    assert result["code"].tolist() == ["1", "A", None]
@@ -0,0 +1,56 @@
+"""
+Tests for the risk cutoff sweep and calibration (``code_library/thresholds.py``)
+and the app's ``RiskThreshold``, which applies what it saves.
+"""
+
+import numpy as np
+import pytest
+from sklearn.isotonic import IsotonicRegression
+
+from modeling import score_metrics
+from thresholds import apply_calibration, choose_threshold, fit_calibration, threshold_sweep
+from utils.thresholds import RiskThreshold
+
+
+@pytest.fixture
+def scored():
+    rng = np.random.default_rng(0)
+    y = rng.integers(0, 2, 200)
+    score = np.round(np.clip(0.35 * y + rng.random(200) * 0.65, 0, 1), 2)
+    return y, score
+
+
+def test_sweep_matches_score_metrics_at_every_threshold(scored):
+    y, score = scored
+    sweep = threshold_sweep(y, score)
+    assert sweep["alerts"].iloc[0] == 0 and sweep["alerts"].iloc[-1] == len(y)
+
+    for row in sweep.itertuples():
+        expected = score_metrics(y, score, row.threshold)
+        assert row.alerts == (score > row.threshold).sum()
+        assert row.recall == pytest.approx(expected["Recall"])
+        assert row.f1 == pytest.approx(expected["F1-Score"])
+        if row.alerts:
+            assert row.precision == pytest.approx(expected["Precision"])
+
+
+def test_choose_threshold(scored):
+    y, score = scored
+    sweep = threshold_sweep(y, score)
+    row, _ = choose_threshold(sweep, target_recall=0.9)
+    assert row["recall"] >= 0.9
+    # the next higher cutoff misses the target
+    assert sweep.loc[row.name - 1, "recall"] < 0.9
+    row, _ = choose_threshold(sweep, alert_budget=0.25)
+    assert row["alert_rate"] <= 0.25 < sweep.loc[row.name + 1, "alert_rate"]
+
+
+@pytest.mark.parametrize("method", ["isotonic", "sigmoid", "none"])
+def test_app_applies_the_saved_calibration(scored, method):
+    y, score = scored
+    cal = fit_calibration(y, score, method)
+    grid = np.linspace(0, 1, 101)
+    np.testing.assert_allclose(RiskThreshold(0.4, cal).calibrate(grid), apply_calibration(cal, grid))
+    if method == "isotonic":
+        iso = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds="clip").fit(score, y)
+        np.testing.assert_allclose(apply_calibration(cal, grid), iso.predict(grid))
@@ -0,0 +1,72 @@
+"""
+Tests for the successive-halving search (``tuning.py``): an interrupted
+study resumes by growing the saved models, without repeating fits.
+"""
+
+import concurrent.futures
+import json
+
+import joblib
+import numpy as np
+import pytest
+
+import tuning
+
+# one family, 5 -> 10 trees, eta=2: a single bracket of 2 trials and 2 rungs
+TINY_SPACES = {
+    "rf": (
+        dict(random_state=0, n_jobs=1),
+        {"max_depth": [3, 4, 5], "min_samples_leaf": [1, 2, 3]},
+        (5, 10),
+    ),
+}
+
+
+def _split():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(200, 4))
+    y = (X[:, 0] + 0.5 * rng.normal(size=200) > 0.5).astype(int)
+    return X[:150], y[:150], X[150:], y[150:]
+
+
+def _records(path):
+    return [json.loads(line) for line in path.read_text().splitlines() if line.strip()]
+
+
+def test_interrupted_study_resumes_without_refitting(tmp_path, monkeypatch):
+    monkeypatch.setattr(tuning, "SPACES", TINY_SPACES)
+    monkeypatch.setattr(tuning, "validation_split", lambda features=None: _split())
+    kwargs = dict(study="tiny", families=["rf"], mode="sha", eta=2, jobs=1, tuning_dir=tmp_path)
+
+    # interrupt the study while the second rung is running: its fit is
+    # submitted (and may save a model) but is never logged
+    real_wait = concurrent.futures.wait
+    calls = []
+
+    def interrupting_wait(fs, **kw):
+        calls.append(len(fs))
+        if len(calls) > 1:
+            raise KeyboardInterrupt
+        return real_wait(fs, return_when=concurrent.futures.ALL_COMPLETED)
+
+    monkeypatch.setattr(tuning, "wait", interrupting_wait)
+    with pytest.raises(KeyboardInterrupt):
+        tuning.run_study(**kwargs)
+    first = _records(tmp_path / "tiny.jsonl")
+    assert sorted(r["n_trees"] for r in first) == [5, 5]
+
+    monkeypatch.setattr(tuning, "wait", real_wait)
+    board = tuning.run_study(**kwargs)
+
+    records = _records(tmp_path / "tiny.jsonl")
+    fits = [(r["trial"], r["n_trees"]) for r in records]
+    assert len(fits) == len(set(fits)) == 3
+    # the promoted trial grew from its saved rung-1 model
+    final = [r for r in records if r["n_trees"] == 10]
+    assert len(final) == 1 and final[0]["grown_from"] > 0
+
+    saved = list((tmp_path / "tiny" / "models").glob("*.pkl"))
+    assert [p.stem for p in saved] == [final[0]["trial"]]
+    model = joblib.load(saved[0])
+    assert model.n_estimators == len(model.estimators_) == 10
+    assert board.set_index("trial").loc[final[0]["trial"], "n_trees"] == 10